@@ -3,7 +3,14 @@ import json
 import csv
 import logging
 import sys
-from tree_sitter import Language, Parser
+import time
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from dependency_cache import DependencyCache
+from dependency_artifact import write_artifact, artifact_path_for, load_dependencies, remove_artifact
+# Process-pool workers import only source_parsers (no config, output or exit at import)
+from source_parsers import LANGUAGE_MAP, parse_source_file, scan_chunk
 
 # === FIX: Add project root FIRST so we can import config_loader ===
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -59,255 +66,31 @@ else:
     OUTPUT_JSON = os.path.join(PROJECT_PATH, "app_dependencies.json")
     OUTPUT_CSV = os.path.join(PROJECT_PATH, "app_dependencies.csv")
     print(OUTPUT_JSON)
-
-# === LANGUAGE DETECTION ===
-LANGUAGE_MAP = {
-    '.py': 'python',
-    '.java': 'java',
-    '.js': 'javascript',
-    '.ts': 'typescript',
-    '.tsx': 'typescript',
-    '.jsx': 'javascript',
-    '.cs': 'csharp',
-    '.go': 'go',
-    '.php': 'php',
-    '.cpp': 'cpp',
-    '.cc': 'cpp',
-    '.cxx': 'cpp',
-    '.c': 'c',
+OUTPUT_ARTIFACT = artifact_path_for(OUTPUT_JSON)
+# binary = memory-mappable .depgraph directory read by report.py; json/csv are exports
+OUTPUT_FORMATS = tuple(_conf.get('dependency_formats') or ('binary', 'json', 'csv'))
+CACHE_PATH = _conf.get('dependency_cache_path') or os.path.join(PROJECT_PATH, "app_dependencies.cache.sqlite")
+
+DEFAULT_EXCLUDE_DIRS = {
+    "venv",
+    "__pycache__",
+    ".git",
+    ".github",
+    ".vscode",
+    "node_modules",
+    "env",
+    "dist",
+    "build",
+    "target",
+    "bin",
+    "obj",
 }
 
-# === LANGUAGE PARSERS ===
-PARSERS = {}
-
-def get_parser(language):
-    """Lazy-load Tree-sitter parser for given language."""
-    if language in PARSERS:
-        return PARSERS[language]
-    
-    try:
-        lang = None
-        if language == 'python':
-            import tree_sitter_python as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'java':
-            import tree_sitter_java as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'javascript':
-            import tree_sitter_javascript as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'typescript':
-            import tree_sitter_typescript as ts_lang
-            # TypeScript has language_typescript function
-            lang = Language(ts_lang.language_typescript())
-        elif language == 'csharp':
-            import tree_sitter_c_sharp as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'go':
-            import tree_sitter_go as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'php':
-            import tree_sitter_php as ts_lang
-            # PHP has language_php function
-            lang = Language(ts_lang.language_php())
-        elif language == 'cpp':
-            import tree_sitter_cpp as ts_lang
-            lang = Language(ts_lang.language())
-        elif language == 'c':
-            import tree_sitter_c as ts_lang
-            lang = Language(ts_lang.language())
-        else:
-            logger.warning("⚠️ Unsupported language: %s", language)
-            return None
-        
-        if lang is None:
-            logger.warning("⚠️ Failed to load language for: %s", language)
-            return None
-            
-        parser = Parser(lang)
-        PARSERS[language] = parser
-        logger.info("✅ Loaded parser for %s", language)
-        return parser
-    except (ImportError, AttributeError) as e:
-        logger.warning("⚠️ Tree-sitter parser not available for %s: %s", language, e)
-        return None
-
-
-
-def get_node_text(node, code_bytes):
-    """Extract text content for any Tree-sitter node."""
-    return code_bytes[node.start_byte:node.end_byte].decode("utf8", errors="ignore")
-
-
-def extract_dependencies_generic(node, code_bytes, language, seen=None):
-    """
-    Recursively find all unique function call dependencies for any language.
-    - Deduplicates repeated calls
-    - Preserves order of first occurrence
-    """
-    if seen is None:
-        seen = set()
-    deps = []
-    
-    # Function call node types vary by language
-    call_node_types = {
-        'python': 'call',
-        'java': 'method_invocation',
-        'javascript': 'call_expression',
-        'typescript': 'call_expression',
-        'csharp': 'invocation_expression',
-        'go': 'call_expression',
-        'php': 'object_creation_expression',  # or method call
-        'cpp': 'call_expression',
-        'c': 'call_expression',
-    }
-    
-    call_type = call_node_types.get(language, 'call')
-    
-    if node.type == call_type:
-        try:
-            # Extract function name based on language specifics
-            func_name = None
-            if language == 'python':
-                func_node = node.child_by_field_name("function")
-                if func_node:
-                    func_name = get_node_text(func_node, code_bytes).strip()
-            elif language == 'java':
-                # method_invocation: object.method()
-                for child in node.children:
-                    if child.type == 'identifier':
-                        func_name = get_node_text(child, code_bytes).strip()
-                        break
-            elif language in ('javascript', 'typescript', 'cpp', 'c', 'go'):
-                # call_expression: func()
-                func_node = node.child_by_field_name("function")
-                if func_node:
-                    func_name = get_node_text(func_node, code_bytes).strip()
-            elif language == 'csharp':
-                # invocation_expression
-                for child in node.children:
-                    if child.type in ('identifier', 'member_access_expression'):
-                        func_name = get_node_text(child, code_bytes).strip()
-                        break
-            
-            if func_name and func_name not in seen:
-                seen.add(func_name)
-                deps.append(func_name)
-        except Exception as e:
-            logger.warning("⚠️ Error extracting call in %s: %s", language, e)
-    
-    # Recursively process children
-    for child in node.children:
-        deps.extend(extract_dependencies_generic(child, code_bytes, language, seen))
-    
-    return deps
-
-
-def find_function_defs_generic(node, code_bytes, language):
-    """
-    Recursively find all function/method definitions for any language.
-    Returns list of (function_name, node) tuples.
-    """
-    functions = []
-    
-    # Function definition node types vary by language
-    def_node_types = {
-        'python': 'function_definition',
-        'java': 'method_declaration',
-        'javascript': 'function_declaration',
-        'typescript': 'function_declaration',
-        'csharp': 'method_declaration',
-        'go': 'function_declaration',
-        'php': 'function_declaration',
-        'cpp': 'function_definition',
-        'c': 'function_definition',
-    }
-    
-    def_type = def_node_types.get(language, 'function_definition')
-    
-    if node.type == def_type:
-        try:
-            func_name = None
-            if language in ('python', 'javascript', 'typescript', 'go', 'php'):
-                name_node = node.child_by_field_name("name")
-                if name_node:
-                    func_name = get_node_text(name_node, code_bytes).strip()
-            elif language == 'java':
-                # method_declaration: modifiers type name params body
-                for child in node.children:
-                    if child.type == 'identifier':
-                        func_name = get_node_text(child, code_bytes).strip()
-                        break
-            elif language == 'csharp':
-                # method_declaration
-                for child in node.children:
-                    if child.type == 'identifier':
-                        func_name = get_node_text(child, code_bytes).strip()
-                        break
-            elif language in ('cpp', 'c'):
-                # function_definition: decl body
-                decl = node.child_by_field_name("declarator")
-                if decl:
-                    func_name = get_node_text(decl, code_bytes).strip()
-                    # Remove type prefixes and trailing ( for C/C++
-                    if '(' in func_name:
-                        func_name = func_name[:func_name.index('(')].strip()
-            
-            if func_name:
-                functions.append((func_name, node))
-        except Exception as e:
-            logger.warning("⚠️ Error extracting function def in %s: %s", language, e)
-    
-    # Recursively process children
-    for child in node.children:
-        functions.extend(find_function_defs_generic(child, code_bytes, language))
-    
-    return functions
-
-
-def build_dependency_graph_generic(code, language):
-    """
-    Build dependency graph for code in any supported language.
-    Returns dict: {function_name: [dependencies]}
-    """
-    parser = get_parser(language)
-    if not parser:
-        logger.warning("⚠️ Parser unavailable for %s; skipping", language)
-        return {}
-    
-    try:
-        code_bytes = bytes(code, "utf8")
-        tree = parser.parse(code_bytes)
-        root = tree.root_node
-        graph = {}
-        
-        for func_name, func_node in find_function_defs_generic(root, code_bytes, language):
-            deps = extract_dependencies_generic(func_node, code_bytes, language)
-            graph[func_name] = deps
-        
-        return graph
-    except Exception as e:
-        logger.exception("⚠️ Error building dependency graph for %s: %s", language, e)
-        return {}
-
 
 def scan_files_by_language(base_path, exclude_dirs=None):
     """Recursively scan for source files by supported extensions."""
     if exclude_dirs is None:
-        exclude_dirs = {
-            "venv",
-            "__pycache__",
-            ".git",
-            ".github",
-            ".vscode",
-            "node_modules",
-            "env",
-            "dist",
-            "build",
-            "target",
-            "bin",
-            "obj",
-        }
+        exclude_dirs = DEFAULT_EXCLUDE_DIRS
 
     source_files = {}
     for root, dirs, files in os.walk(base_path):
@@ -322,11 +105,268 @@ def scan_files_by_language(base_path, exclude_dirs=None):
     return source_files
 
 
+def _chunk_files(files_by_lang, chunk_size):
+    """Split files into (language, [paths]) chunks, in serial processing order."""
+    chunks = []
+    for language, file_list in sorted(files_by_lang.items()):
+        for i in range(0, len(file_list), chunk_size):
+            chunks.append((language, file_list[i:i + chunk_size]))
+    return chunks
+
+
+def _parse_pending(files_by_lang, workers, chunk_size):
+    """Yield (language, file_path, deps) for every file; deps is None for skipped files."""
+    if workers <= 1:
+        for language, file_list in sorted(files_by_lang.items()):
+            logger.info("\n🔄 Processing %d %s file(s)...", len(file_list), language.upper())
+            for file_path, deps in scan_chunk((language, file_list)):
+                yield language, file_path, deps
+        return
+
+    chunks = _chunk_files(files_by_lang, chunk_size)
+    logger.info("🔄 Processing %d chunk(s) with %d worker(s)...", len(chunks), workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order, which keeps the merge deterministic
+        for (language, _), results in zip(chunks, pool.map(scan_chunk, chunks)):
+            for file_path, deps in results:
+                yield language, file_path, deps
+
+
+def scan_dependencies(files_by_lang, workers=1, chunk_size=64, cache=None):
+    """
+    Parse every file in files_by_lang and return (all_dependencies, processed, skipped).
+    With workers > 1 the files are split across a process pool; results are merged
+    in the same order as the serial scan so the output is identical.
+    When a DependencyCache is given, unchanged files are served from it and only
+    the remaining files are parsed.
+    """
+    results = {}
+    processed = 0
+    skipped = 0
+
+    if cache is not None:
+        pending = {}
+        for language, file_list in sorted(files_by_lang.items()):
+            for file_path in file_list:
+                deps = cache.lookup(file_path, language)
+                if deps is None:
+                    pending.setdefault(language, []).append(file_path)
+                else:
+                    results[file_path] = deps
+                    processed += 1
+        logger.info("📦 Cache: %d hit(s), %d file(s) to parse", cache.hits, sum(len(f) for f in pending.values()))
+    else:
+        pending = files_by_lang
+
+    for language, file_path, deps in _parse_pending(pending, workers, chunk_size):
+        if deps is None:
+            skipped += 1
+            continue
+        results[file_path] = deps
+        processed += 1
+        if cache is not None:
+            cache.store(file_path, language, deps)
+        if processed % 10 == 0:
+            logger.info("⏳ Processed %d file(s)...", processed)
+
+    # Rebuild in serial scan order so cached and parsed entries interleave deterministically
+    all_dependencies = {}
+    for language, file_list in sorted(files_by_lang.items()):
+        for file_path in file_list:
+            if file_path in results:
+                all_dependencies[file_path] = results[file_path]
+    return all_dependencies, processed, skipped
+
+
+def save_outputs(all_dependencies, formats=OUTPUT_FORMATS):
+    """
+    Write the dependency map in the requested formats (binary, json, csv).
+    The artifact is written last, so it is at least as new as the JSON;
+    without 'binary' an old artifact is removed so readers fall back to the JSON.
+    """
+    if 'json' in formats:
+        with open(OUTPUT_JSON, "w", encoding="utf8") as jf:
+            json.dump(all_dependencies, jf, indent=2, ensure_ascii=False)
+        logger.info("📦 Saved JSON → %s", OUTPUT_JSON)
+
+    if 'csv' in formats:
+        with open(OUTPUT_CSV, "w", newline="", encoding="utf8") as cf:
+            writer = csv.writer(cf)
+            writer.writerow(["File", "Function", "Dependencies"])
+            for file, funcs in all_dependencies.items():
+                if funcs:
+                    for func_name, deps in funcs.items():
+                        writer.writerow([file, func_name, ", ".join(deps)])
+                else:
+                    writer.writerow([file, "(no functions)", ""])
+        logger.info("📊 Saved CSV → %s", OUTPUT_CSV)
+
+    if 'binary' in formats:
+        write_artifact(all_dependencies, OUTPUT_ARTIFACT)
+    else:
+        remove_artifact(OUTPUT_JSON)
+
+
+def changed_files_from_csv(csv_path):
+    """Read the FileChanged column of a git_diff.py report (or one path per line for plain text)."""
+    files = []
+    with open(csv_path, "r", encoding="utf8", errors="ignore", newline="") as f:
+        if csv_path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                value = (row.get("FileChanged") or row.get("file_changed") or "").strip()
+                if value:
+                    files.append(value)
+        else:
+            files = [line.strip() for line in f if line.strip()]
+    return list(dict.fromkeys(files))
+
+
+def _git_toplevel(path):
+    """Return the root of the git work tree containing path, or None."""
+    start = path if os.path.isdir(path) else os.path.dirname(path)
+    try:
+        out = subprocess.run(["git", "-C", start, "rev-parse", "--show-toplevel"],
+                             capture_output=True, text=True, check=True)
+        return os.path.normpath(out.stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def changed_files_from_git(base_path, commit_range):
+    """Files touched in a commit range (e.g. 'abc123..HEAD'), relative to the repo root."""
+    repo_root = _git_toplevel(base_path)
+    if not repo_root:
+        raise RuntimeError("Not a git work tree: %s" % base_path)
+    out = subprocess.run(["git", "-C", repo_root, "diff", "--name-only", commit_range],
+                         capture_output=True, text=True, check=True)
+    return [line.strip() for line in out.stdout.splitlines() if line.strip()]
+
+
+def resolve_changed_paths(changed_files, base_path):
+    """
+    Map repo-relative paths (as written by git_diff.py) onto files under base_path.
+    Returns {abs_path: language}; unsupported extensions, excluded folders and
+    files outside base_path are dropped.
+    """
+    repo_root = _git_toplevel(base_path) or (base_path if os.path.isdir(base_path) else os.path.dirname(base_path))
+    base = os.path.normpath(os.path.abspath(base_path))
+    resolved = {}
+    for rel in changed_files:
+        path = rel if os.path.isabs(rel) else os.path.join(repo_root, rel)
+        path = os.path.normpath(os.path.abspath(path))
+        if os.path.isdir(base_path):
+            if not path.startswith(os.path.join(base, "")):
+                continue
+            parts = os.path.relpath(path, base).split(os.sep)[:-1]
+            if any(p in DEFAULT_EXCLUDE_DIRS for p in parts):
+                continue
+        elif path != base:
+            continue
+        language = LANGUAGE_MAP.get(os.path.splitext(path)[1].lower())
+        if language:
+            resolved[path] = language
+    return resolved
+
+
+def scan_key(path, base_path):
+    """The key a full scan of base_path gives path (os.path.join(root, file) under os.walk)."""
+    if not os.path.isdir(base_path):
+        return base_path
+    return os.path.join(base_path, os.path.relpath(path, os.path.abspath(base_path)))
+
+
+def _scan_order(all_dependencies, base_path):
+    """all_dependencies re-ordered like a full scan of base_path (language, then walk order)."""
+    ordered = {}
+    for language, file_list in sorted(scan_files_by_language(base_path).items()):
+        for file_path in file_list:
+            if file_path in all_dependencies:
+                ordered[file_path] = all_dependencies[file_path]
+    for key, deps in all_dependencies.items():
+        ordered.setdefault(key, deps)
+    return ordered
+
+
+def patch_dependencies(all_dependencies, changed_paths, cache=None, base_path=None):
+    """
+    Re-parse only changed_paths ({abs_path: language}) and patch all_dependencies in place.
+    Existing keys are matched by normalised path so the original key spelling is kept;
+    deleted files are removed. New files get the key a full scan of base_path
+    would give them and the map is put back in full-scan order.
+    Returns (updated, removed) counts.
+    """
+    key_for = {os.path.normpath(os.path.abspath(k)): k for k in all_dependencies}
+    updated = removed = 0
+    added = False
+    for path, language in changed_paths.items():
+        key = key_for.get(path) or (scan_key(path, base_path) if base_path else path)
+        if not os.path.exists(path):
+            if all_dependencies.pop(key, None) is not None:
+                removed += 1
+            if cache is not None:
+                cache.discard(key)
+            continue
+        deps = cache.lookup(key, language) if cache is not None else None
+        if deps is None:
+            try:
+                deps = parse_source_file(path, language)
+            except Exception as e:
+                logger.warning("⚠️ Skipping %s: %s", path, e)
+                continue
+            if cache is not None:
+                cache.store(key, language, deps)
+        added = added or key not in all_dependencies
+        all_dependencies[key] = deps
+        updated += 1
+    if added and base_path and os.path.isdir(base_path):
+        ordered = _scan_order(all_dependencies, base_path)
+        all_dependencies.clear()
+        all_dependencies.update(ordered)
+    return updated, removed
+
+
 # === MAIN ===
 if __name__ == "__main__":
-    logger.info("🔍 Scanning path: %s", app_deps)
+    arg_parser = argparse.ArgumentParser(description="Build function dependency graph for the configured project_path")
+    arg_parser.add_argument("--workers", type=int, default=int(_conf.get('pipeline_workers', 1)),
+                            help="Number of worker processes for parsing (1 = serial)")
+    arg_parser.add_argument("--cache", default=CACHE_PATH, help="Incremental parse cache (SQLite) path")
+    arg_parser.add_argument("--no-cache", action="store_true", help="Re-parse every file and ignore the cache")
+    arg_parser.add_argument("--changed-files", default=None,
+                            help="Only re-parse files listed in this git_diff CSV (FileChanged column) or text file")
+    arg_parser.add_argument("--commit-range", default=None,
+                            help="Only re-parse files touched in this git commit range, e.g. abc123..HEAD")
+    arg_parser.add_argument("--formats", default=",".join(OUTPUT_FORMATS),
+                            help="Comma-separated outputs to write: binary, json, csv")
+    args = arg_parser.parse_args()
+    args.formats = {f.strip().lower() for f in args.formats.split(",") if f.strip()}
+
+    # === PARTIAL RESCAN (only files touched by a push) ===
+    existing = load_dependencies(OUTPUT_JSON) if (args.changed_files or args.commit_range) else {}
+    if (args.changed_files or args.commit_range) and not existing:
+        logger.warning("⚠️ No existing dependency artifact at %s; running a full scan instead", OUTPUT_JSON)
+    elif existing:
+        start = time.perf_counter()
+        changed = []
+        if args.changed_files:
+            changed.extend(changed_files_from_csv(args.changed_files))
+        if args.commit_range:
+            changed.extend(changed_files_from_git(app_deps, args.commit_range))
+        changed_paths = resolve_changed_paths(changed, app_deps)
+        logger.info("🩹 Partial rescan: %d changed file(s), %d in scope", len(changed), len(changed_paths))
+
+        if hasattr(existing, "to_dict"):
+            existing = existing.to_dict()
+        cache = None if args.no_cache else DependencyCache(args.cache)
+        updated, removed = patch_dependencies(existing, changed_paths, cache, app_deps)
+        if cache is not None:
+            cache.close()
+        if updated or removed:
+            save_outputs(existing, args.formats)
+        logger.info("✅ Patched %d file(s), removed %d in %.2fs", updated, removed, time.perf_counter() - start)
+        exit(0)
 
-    all_dependencies = {}
+    logger.info("🔍 Scanning path: %s", app_deps)
 
     # Case 1: Single file
     if os.path.isfile(app_deps):
@@ -350,28 +390,18 @@ if __name__ == "__main__":
         logger.error("❌ Invalid path. Please provide a valid file or folder.")
         exit(1)
 
-    processed = 0
-    skipped = 0
-    
-    # Process files by language
-    for language, file_list in sorted(files_by_lang.items()):
-        logger.info("\n🔄 Processing %d %s file(s)...", len(file_list), language.upper())
-        
-        for file_path in file_list:
-            try:
-                with open(file_path, "r", encoding="utf8", errors="ignore") as f:
-                    code = f.read()
-                
-                deps = build_dependency_graph_generic(code, language)
-                all_dependencies[file_path] = deps or {}
-                processed += 1
-                
-                if processed % 10 == 0:
-                    logger.info("⏳ Processed %d file(s)...", processed)
-                    
-            except Exception as e:
-                logger.warning("⚠️ Skipping %s: %s", file_path, e)
-                skipped += 1
+    cache = None if args.no_cache else DependencyCache(args.cache)
+
+    start = time.perf_counter()
+    all_dependencies, processed, skipped = scan_dependencies(files_by_lang, workers=max(1, args.workers), cache=cache)
+    elapsed = time.perf_counter() - start
+    logger.info("⚡ Parsed %d file(s) in %.2fs (%.1f files/sec, %d worker(s))",
+                processed, elapsed, processed / elapsed if elapsed > 0 else 0.0, max(1, args.workers))
+
+    if cache is not None:
+        if os.path.isdir(app_deps):
+            cache.evict_missing([p for files in files_by_lang.values() for p in files], root=app_deps)
+        cache.close()
 
     # === SAVE RESULTS ===
     logger.info("\n✅ Finished scanning %d file(s) (%d skipped).", processed, skipped)
@@ -381,22 +411,7 @@ if __name__ == "__main__":
         logger.warning("⚠️ No dependencies detected.")
         exit(0)
 
-    # Save JSON
-    with open(OUTPUT_JSON, "w", encoding="utf8") as jf:
-        json.dump(all_dependencies, jf, indent=2, ensure_ascii=False)
-    logger.info("📦 Saved JSON → %s", OUTPUT_JSON)
-
-    # Save CSV
-    with open(OUTPUT_CSV, "w", newline="", encoding="utf8") as cf:
-        writer = csv.writer(cf)
-        writer.writerow(["File", "Function", "Dependencies"])
-        for file, funcs in all_dependencies.items():
-            if funcs:
-                for func_name, deps in funcs.items():
-                    writer.writerow([file, func_name, ", ".join(deps)])
-            else:
-                writer.writerow([file, "(no functions)", ""])
-    logger.info("📊 Saved CSV → %s", OUTPUT_CSV)
+    save_outputs(all_dependencies, args.formats)
 
     # === PRINT SAMPLE OUTPUT ===
     logger.info("\n📘 Sample Output:")
@@ -0,0 +1,130 @@
+"""
+Harvest commits from many repositories in one run.
+
+Each repo is synced incrementally by git_dif_full.find_and_write_commits into
+its own partition (<output_dir>/repo=<owner>__<name>/userstory_commit_report.csv,
+with its own sync state). All repos share one pooled GitHubClient (session,
+response cache, global rate-limit pause); each draws from its own
+RequestBudget so a large repo cannot starve the others.
+
+Repos come from --repos, --repos_file (one owner/name per line) or the
+config key "repos" (list of "owner/name" or {"owner", "name", "local_repo"}).
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+from github_client import GitHubClient, RequestBudget
+from commit_store import partition_path
+from git_dif_full import find_and_write_commits, _load_config_fallback
+
+logger = logging.getLogger(__name__)
+
+# Authenticated REST limit; split across the repos of a batch by default
+GITHUB_HOURLY_LIMIT = 5000
+
+
+def parse_repos(entries):
+    """Normalise repo entries to [{"owner", "name", "local_repo"}], dropping duplicates."""
+    repos = {}
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            owner, name, local_repo = entry.get("owner"), entry.get("name"), entry.get("local_repo")
+        else:
+            entry = str(entry).strip()
+            if not entry or entry.startswith("#"):
+                continue
+            owner, _, name = entry.partition("/")
+            local_repo = None
+        if not owner or not name:
+            logger.warning("Skipping malformed repo entry: %r", entry)
+            continue
+        repos[f"{owner}/{name}".lower()] = {"owner": owner, "name": name, "local_repo": local_repo}
+    return list(repos.values())
+
+
+def harvest_repo(repo, output_dir, client, latest=0, full=False, parquet=False):
+    """Sync one repo into its partition; returns (repo_key, seconds, requests made)."""
+    started = time.time()
+    output_file = partition_path(output_dir, repo["owner"], repo["name"])
+    find_and_write_commits(repo["owner"], repo["name"], output_file, latest, client,
+                           full=full, local_repo=repo.get("local_repo"), parquet=parquet)
+    return f"{repo['owner']}/{repo['name']}", time.time() - started, client.requests_made
+
+
+def harvest(repos, output_dir, client, max_repos=4, budget_per_hour=None, latest=0, full=False, parquet=False):
+    """
+    Harvest repos concurrently (max_repos at a time). Returns {repo_key: error}
+    for the repos that failed; the others are unaffected by a failure.
+    """
+    if not repos:
+        logger.warning("No repositories to harvest")
+        return {}
+    budget_per_hour = budget_per_hour or max(60, GITHUB_HOURLY_LIMIT // len(repos))
+    logger.info("🚚 Harvesting %d repos (%d at a time, %d requests/hour each) → %s",
+                len(repos), max_repos, budget_per_hour, output_dir)
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_repos)) as pool:
+        futures = {
+            pool.submit(harvest_repo, repo, output_dir, client.with_budget(RequestBudget(budget_per_hour)),
+                        latest, full, parquet): f"{repo['owner']}/{repo['name']}"
+            for repo in repos
+        }
+        for future in as_completed(futures):
+            repo_key = futures[future]
+            try:
+                _, seconds, requests_made = future.result()
+                logger.info("✅ %s done in %.1fs (%d API requests)", repo_key, seconds, requests_made)
+            except Exception as e:
+                failures[repo_key] = e
+                logger.exception("❌ %s failed: %s", repo_key, e)
+    logger.info("🏁 Batch finished: %d ok, %d failed", len(repos) - len(failures), len(failures))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Harvest commits from many GitHub repositories into a partitioned report.")
+    parser.add_argument("--repos", default=None, help="Comma-separated owner/name list")
+    parser.add_argument("--repos_file", default=None, help="File with one owner/name per line")
+    parser.add_argument("--output_dir", default=None, help="Root directory of the partitioned output")
+    parser.add_argument("--max_repos", type=int, default=None, help="Repositories harvested concurrently")
+    parser.add_argument("--budget_per_hour", type=int, default=None, help="API requests per repo per hour")
+    parser.add_argument("--latest", type=int, default=0, help="If set, process the most recent N commits per repo.")
+    parser.add_argument("--full", action="store_true", help="Ignore the last synced commits and rebuild every partition")
+
+    args = parser.parse_args(argv)
+
+    cfg = _load_config_fallback() or {}
+    entries = []
+    if args.repos:
+        entries.extend(args.repos.split(","))
+    if args.repos_file:
+        with open(args.repos_file, "r", encoding="utf-8") as f:
+            entries.extend(f.read().splitlines())
+    if not entries:
+        entries = cfg.get('repos') or []
+    repos = parse_repos(entries)
+
+    output_dir = args.output_dir or cfg.get('batch_output_dir')
+    if not output_dir:
+        output_file = cfg.get('output_file') or ""
+        output_dir = os.path.join(os.path.dirname(output_file), "commits")
+    max_repos = args.max_repos or cfg.get('batch_max_repos', 4)
+
+    # One pooled session for every repo: size the pool for all concurrent detail fetches
+    client = GitHubClient.from_config(dict(cfg, github_pool_size=max_repos * cfg.get('github_max_workers', 8)))
+    failures = harvest(repos, output_dir, client, max_repos=max_repos,
+                       budget_per_hour=args.budget_per_hour or cfg.get('github_repo_budget_per_hour'),
+                       latest=args.latest, full=args.full, parquet=cfg.get('parquet_outputs', False))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass cursor extraction vs the recursive two-pass reference.
+Uses the test_multilang_pipeline.py samples scaled up (default 1000x).
+
+    python bench_dependency_extraction.py --scale 1000
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from test_multilang_pipeline import TEST_SAMPLES
+from source_parsers import get_parser, walk_dependency_graph, find_function_defs_generic, extract_dependencies_generic
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dependency extraction engines")
+    parser.add_argument("--scale", type=int, default=1000, help="Repeat each sample this many times")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    print(f"{'language':12} {'recursive (s)':>14} {'single-pass (s)':>16} {'speedup':>8}")
+    for lang, sample in TEST_SAMPLES.items():
+        ts_parser = get_parser(lang)
+        if ts_parser is None:
+            print(f"{lang:12} parser unavailable")
+            continue
+        code_bytes = bytes(sample['code'] * args.scale, "utf8")
+        root = ts_parser.parse(code_bytes).root_node
+
+        def recursive():
+            old_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(max(old_limit, 100000))
+            try:
+                graph = {}
+                for func_name, func_node in find_function_defs_generic(root, code_bytes, lang):
+                    graph[func_name] = extract_dependencies_generic(func_node, code_bytes, lang)
+                return graph
+            finally:
+                sys.setrecursionlimit(old_limit)
+
+        t_old, g_old = _best_of(recursive, args.repeat)
+        t_new, g_new = _best_of(lambda: walk_dependency_graph(root, code_bytes, lang), args.repeat)
+        status = "" if list(g_old.items()) == list(g_new.items()) else "  MISMATCH"
+        print(f"{lang:12} {t_old:14.3f} {t_new:16.3f} {t_old / t_new if t_new else 0:7.1f}x{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark: report.py step 4 (test-result aggregation), legacy lambdas vs results_aggregation,
+plus the chunked streaming path report.py uses for CSV results. Writes a synthetic
+test_results.csv (default 10M rows) unless --csv points at an existing one.
+Streaming runs first so its peak RSS is not inflated by the in-memory runs.
+
+    python bench_test_aggregation.py --rows 10000000 --cases 5000
+"""
+import os
+import sys
+import time
+import resource
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from results_aggregation import aggregate_tests
+from report import aggregate_test_results, TESTS_CHUNK_ROWS
+
+
+def write_synthetic_results(path, rows, cases, seed=7):
+    """test_results.csv with TestCaseID, TestName, Status, Timestamp columns."""
+    rng = np.random.default_rng(seed)
+    case_ids = rng.integers(0, cases, rows)
+    names = np.array([f"test_case_{i}" for i in range(cases)] + [f"test_case_{i}_renamed" for i in range(cases)], dtype=object)
+    statuses = np.array(["passed", "failed", "PASS", "fail", "error", "skipped"], dtype=object)
+    start = np.datetime64("2024-01-01T00:00:00")
+    df = pd.DataFrame({
+        "TestCaseID": np.char.add("TC-", case_ids.astype(str)),
+        "TestName": names[case_ids + cases * (rng.random(rows) < 0.2)],
+        "Status": statuses[rng.integers(0, len(statuses), rows)],
+        "Timestamp": (start + rng.integers(0, 365 * 24 * 3600, rows).astype("timedelta64[s]")).astype(str),
+    })
+    df.to_csv(path, index=False)
+
+
+def legacy_aggregate_tests(tests_df):
+    """The original report.py step 4, kept verbatim for comparison."""
+    tests_df['status_norm'] = tests_df['status'].astype(str).str.lower().str.strip()
+    tests_df['status_norm'] = tests_df['status_norm'].replace(
+        {'passed':'pass','failed':'fail','ok':'pass','error':'fail'}
+    )
+
+    timestamp_col = next((c for c in tests_df.columns if any(k in c.lower() for k in ['time','date'])), None)
+    if timestamp_col:
+        tests_df[timestamp_col] = pd.to_datetime(tests_df[timestamp_col], errors='coerce')
+
+    agg_counts = (tests_df.groupby('test_case_id', dropna=False)
+                  .agg(total_no_of_Passed=('status_norm', lambda s: (s=='pass').sum()),
+                       total_no_of_Failed=('status_norm', lambda s: (s=='fail').sum()))
+                  .reset_index())
+
+    def choose_test_name(group):
+        vals = group['test_name'].dropna()
+        if vals.empty: return pd.NA
+        mode = vals.mode()
+        return mode.iloc[0] if not mode.empty else vals.iloc[-1]
+
+    names = (
+    tests_df.groupby('test_case_id', dropna=False)
+    .apply(lambda g: choose_test_name(g), include_groups=False)
+    .reset_index(name='test_name')
+)
+
+    agg_tests = agg_counts.merge(names, on='test_case_id', how='left')
+
+    if timestamp_col:
+        last = (tests_df.sort_values(timestamp_col)
+                .groupby('test_case_id', dropna=False)
+                .last()
+                .reset_index())
+        last_small = last[['test_case_id','status_norm',timestamp_col]].rename(
+            columns={'status_norm':'last_status', timestamp_col:'last_execution_date'})
+        agg_tests = agg_tests.merge(last_small, on='test_case_id', how='left')
+    return agg_tests
+
+
+def _load(path):
+    tests_df = pd.read_csv(path, dtype=str, on_bad_lines="skip")
+    return tests_df.rename(columns={"TestCaseID": "test_case_id", "TestName": "test_name", "Status": "status"})
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark test-result aggregation")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Synthetic result rows")
+    parser.add_argument("--cases", type=int, default=5000, help="Distinct test cases")
+    parser.add_argument("--csv", default=None, help="Use this test_results.csv instead of generating one")
+    parser.add_argument("--chunk-rows", type=int, default=TESTS_CHUNK_ROWS, help="Rows per chunk when streaming")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the vectorized path")
+    args = parser.parse_args(argv)
+
+    path = args.csv
+    tmp_dir = None
+    if not path:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "test_results.csv")
+        start = time.perf_counter()
+        write_synthetic_results(path, args.rows, args.cases)
+        print(f"generated {args.rows:,} rows in {time.perf_counter() - start:.1f}s → {path}")
+
+    try:
+        rss_before = _peak_rss_mb()
+        start = time.perf_counter()
+        state, _, _ = aggregate_test_results(path, chunksize=args.chunk_rows)
+        print(f"streaming:  {time.perf_counter() - start:.2f}s ({state.rows:,} rows, {len(state.cases):,} test cases, "
+              f"peak RSS {_peak_rss_mb():.0f} MB, +{_peak_rss_mb() - rss_before:.0f} MB)")
+
+        start = time.perf_counter()
+        tests_df = _load(path)
+        print(f"read_csv: {time.perf_counter() - start:.2f}s ({len(tests_df):,} rows)")
+
+        start = time.perf_counter()
+        new = aggregate_tests(tests_df.copy())
+        t_new = time.perf_counter() - start
+        print(f"vectorized: {t_new:.2f}s ({len(new):,} test cases, peak RSS {_peak_rss_mb():.0f} MB)")
+
+        if not args.skip_legacy:
+            start = time.perf_counter()
+            old = legacy_aggregate_tests(tests_df.copy())
+            t_old = time.perf_counter() - start
+            # Legacy ties on identical timestamps are sort-order dependent, so compare ties-free columns
+            cols = ['test_case_id', 'total_no_of_Passed', 'total_no_of_Failed', 'test_name', 'last_execution_date']
+            status = "" if old[cols].equals(new[cols]) else "  MISMATCH"
+            print(f"legacy:     {t_old:.2f}s  speedup {t_old / t_new if t_new else 0:.1f}x{status}")
+    finally:
+        if tmp_dir:
+            os.remove(path)
+            os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Persistence helpers for the commit report CSV (userstory_commit_report.csv).
+
+- Per-repo sync state (high-water mark = newest processed commit sha)
+- UpsertCsvWriter: rows keyed on (CommitSHA, FileChanged); new keys are appended
+  immediately, changed rows replace the old ones, duplicates are never written
+- Partitioned layout for batch harvesting: <base>/repo=<owner>__<name>/<report>.csv
+"""
+import os
+import csv
+import glob
+import json
+import sqlite3
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FIELDNAMES = ["UserStoryID", "CommitSHA", "Author", "Message", "FileChanged", "ChangedFunctions", "Language"]
+KEY_FIELDS = ("CommitSHA", "FileChanged")
+
+
+PARTITION_PREFIX = "repo="
+PARTITION_FILE = "userstory_commit_report.csv"
+
+
+def partition_path(base_dir, owner, name):
+    """CSV path of one repo's partition under base_dir."""
+    return os.path.join(base_dir, f"{PARTITION_PREFIX}{owner}__{name}", PARTITION_FILE)
+
+
+def list_partitions(base_dir, repos=None):
+    """
+    [("owner/name", csv_path)] for the partitions under base_dir, sorted by
+    repo; repos (iterable of "owner/name") restricts the result.
+    """
+    wanted = {r.lower() for r in repos} if repos else None
+    found = []
+    for path in sorted(glob.glob(os.path.join(base_dir, PARTITION_PREFIX + "*", PARTITION_FILE))):
+        owner, _, name = os.path.basename(os.path.dirname(path))[len(PARTITION_PREFIX):].partition("__")
+        repo = f"{owner}/{name}"
+        if wanted is None or repo.lower() in wanted:
+            found.append((repo, path))
+    return found
+
+
+def sync_state_path_for(output_file):
+    """userstory_commit_report.csv -> userstory_commit_report.sync.json"""
+    return os.path.splitext(output_file)[0] + ".sync.json"
+
+
+def load_sync_state(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read sync state %s: %s; starting fresh", path, e)
+        return {}
+
+
+def save_sync_state(path, state):
+    """Write the sync state atomically (tmp file + rename)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _row_key(row):
+    return tuple((row.get(k) or "") for k in KEY_FIELDS)
+
+
+def _row_fingerprint(row, fieldnames):
+    return hash(tuple((row.get(k) or "") for k in fieldnames))
+
+
+class UpsertCsvWriter:
+    """
+    CSV writer keyed on (CommitSHA, FileChanged).
+
+    Existing keys are indexed once on open, in a temporary SQLite file rather
+    than in memory, so a long report history costs disk, not RAM. writerow()
+    appends and flushes rows with new keys straight away, skips exact repeats,
+    and records rows that change an existing key in the index; those updates
+    (and any duplicates already present in the file) are folded in with a
+    single streaming rewrite on close(). With parquet=True, close() also
+    refreshes the table_io parquet copy.
+    """
+
+    LOAD_BATCH = 10000
+
+    def __init__(self, path, fieldnames=FIELDNAMES, parquet=False):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.parquet = parquet
+        self.appended = 0
+        self.updated = 0
+        self.skipped = 0
+        self._compact = False
+        self._rows = 0  # data rows in the file, i.e. the row number of the next append
+
+        out_dir = os.path.dirname(path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+        fd, self._index_path = tempfile.mkstemp(prefix="commit_keys_", suffix=".sqlite")
+        os.close(fd)
+        self._index = sqlite3.connect(self._index_path)
+        self._index.execute("PRAGMA journal_mode = OFF")  # throwaway index, removed on close()
+        self._index.execute("PRAGMA synchronous = OFF")
+        # last_row: row number of the key's latest occurrence; updated: JSON of a queued replacement row
+        self._index.execute("""
+            CREATE TABLE keys (
+                sha TEXT, file TEXT, fingerprint INTEGER, last_row INTEGER, updated TEXT,
+                PRIMARY KEY (sha, file)
+            ) WITHOUT ROWID
+        """)
+
+        has_rows = os.path.exists(path) and os.path.getsize(path) > 0
+        if has_rows:
+            self._load_index()
+
+        self._file = open(path, mode="a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+        if not has_rows:
+            self._writer.writeheader()
+
+    def _load_index(self):
+        sql = ("INSERT INTO keys (sha, file, fingerprint, last_row) VALUES (?, ?, ?, ?)"
+               " ON CONFLICT (sha, file) DO UPDATE SET fingerprint = excluded.fingerprint, last_row = excluded.last_row")
+        batch = []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                batch.append((*_row_key(row), _row_fingerprint(row, self.fieldnames), self._rows))
+                self._rows += 1
+                if len(batch) >= self.LOAD_BATCH:
+                    self._index.executemany(sql, batch)
+                    batch = []
+        self._index.executemany(sql, batch)
+        keys = self._index.execute("SELECT count(*) FROM keys").fetchone()[0]
+        self._compact = keys < self._rows  # duplicate keys already in the file
+
+    def writerow(self, row):
+        key = _row_key(row)
+        fingerprint = _row_fingerprint(row, self.fieldnames)
+        found = self._index.execute("SELECT fingerprint, updated FROM keys WHERE sha = ? AND file = ?", key).fetchone()
+        if found is None:
+            self._writer.writerow(row)
+            self._file.flush()
+            self._index.execute("INSERT INTO keys (sha, file, fingerprint, last_row) VALUES (?, ?, ?, ?)",
+                                (*key, fingerprint, self._rows))
+            self._rows += 1
+            self.appended += 1
+        elif found[0] != fingerprint:
+            if found[1] is None:
+                self.updated += 1
+            self._index.execute("UPDATE keys SET fingerprint = ?, updated = ? WHERE sha = ? AND file = ?",
+                                (fingerprint, json.dumps({k: row.get(k) for k in self.fieldnames}), *key))
+        else:
+            self.skipped += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        try:
+            if self.updated or self._compact:
+                self._rewrite()
+        finally:
+            self._index.close()
+            os.remove(self._index_path)
+        if self.parquet:
+            from table_io import mirror_csv, parquet_is_current  # project root module
+            if self.appended or self.updated or self._compact or not parquet_is_current(self.path):
+                mirror_csv(self.path, dtype=str, on_bad_lines="skip")
+        logger.info("💾 %s: %d appended, %d updated, %d unchanged",
+                    self.path, self.appended, self.updated, self.skipped)
+
+    def _rewrite(self):
+        """Replace updated rows in place and drop duplicate keys (the latest occurrence keeps its position)."""
+        tmp = self.path + ".tmp"
+        with open(self.path, newline="", encoding="utf-8") as src, \
+                open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            for row_no, row in enumerate(csv.DictReader(src)):
+                last_row, updated = self._index.execute(
+                    "SELECT last_row, updated FROM keys WHERE sha = ? AND file = ?", _row_key(row)).fetchone()
+                if last_row == row_no:
+                    writer.writerow(json.loads(updated) if updated is not None else row)
+        os.replace(tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,200 @@
+"""
+Compact, memory-mappable storage for the {file: {function: [deps]}} map.
+
+An artifact is a directory (app_dependencies.depgraph/) of NumPy arrays:
+
+    strings.npy            uint8   UTF-8 bytes of every interned string
+    string_offsets.npy     int64   string id -> byte range in strings.npy
+    file_names.npy         int32   file index -> string id
+    file_func_offsets.npy  int64   file index -> range in func_names.npy
+    func_names.npy         int32   function index -> string id
+    func_dep_offsets.npy   int64   function index -> range in dep_names.npy
+    dep_names.npy          int32   string ids of the dependencies, in order
+    meta.json              format version and counts
+
+Every string is stored once, and the file -> function -> dependency nesting is
+two CSR levels, so loading is a handful of np.load(mmap_mode='r') calls and
+files are only decoded when they are looked up.
+"""
+import os
+import json
+import shutil
+import logging
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = ".depgraph"
+
+_ARRAYS = ('strings', 'string_offsets', 'file_names', 'file_func_offsets',
+           'func_names', 'func_dep_offsets', 'dep_names')
+
+
+def artifact_path_for(json_path):
+    """app_dependencies.json -> app_dependencies.depgraph"""
+    return os.path.splitext(json_path)[0] + ARTIFACT_SUFFIX
+
+
+def write_artifact(all_dependencies, path):
+    """Write a {file: {function: [deps]}} mapping as a binary artifact directory."""
+    string_ids = {}
+    blobs = []
+    offsets = [0]
+
+    def intern(value):
+        idx = string_ids.get(value)
+        if idx is None:
+            idx = string_ids[value] = len(blobs)
+            data = value.encode("utf8")
+            blobs.append(data)
+            offsets.append(offsets[-1] + len(data))
+        return idx
+
+    file_names, file_func_offsets = [], [0]
+    func_names, func_dep_offsets = [], [0]
+    dep_names = []
+    for file_path, funcs in all_dependencies.items():
+        file_names.append(intern(file_path))
+        for func, deps in (funcs or {}).items():
+            func_names.append(intern(func))
+            dep_names.extend(intern(d) for d in deps)
+            func_dep_offsets.append(len(dep_names))
+        file_func_offsets.append(len(func_names))
+
+    arrays = {
+        'strings': np.frombuffer(b"".join(blobs), dtype=np.uint8),
+        'string_offsets': np.asarray(offsets, dtype=np.int64),
+        'file_names': np.asarray(file_names, dtype=np.int32),
+        'file_func_offsets': np.asarray(file_func_offsets, dtype=np.int64),
+        'func_names': np.asarray(func_names, dtype=np.int32),
+        'func_dep_offsets': np.asarray(func_dep_offsets, dtype=np.int64),
+        'dep_names': np.asarray(dep_names, dtype=np.int32),
+    }
+
+    # Write next to the target and swap in, so readers never see a half-written artifact
+    tmp_path = path.rstrip("/\\") + ".tmp"
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_path, name + ".npy"), arr)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf8") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "files": len(file_names),
+            "functions": len(func_names),
+            "edges": len(dep_names),
+            "strings": len(blobs),
+        }, f, indent=2)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    logger.info("📦 Saved binary artifact → %s (%d files, %d functions, %d strings)",
+                path, len(file_names), len(func_names), len(blobs))
+
+
+class DependencyArtifact(Mapping):
+    """
+    Read-only, memory-mapped view of a dependency artifact.
+
+    Behaves like the JSON mapping ({file: {function: [deps]}}), but only the
+    file names are decoded up front; each file's function map is built when
+    it is accessed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError("Unsupported dependency artifact version: %s" % self.meta.get("format_version"))
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode='r'))
+        self._buf = self.strings.tobytes() if len(self.strings) else b""
+        self._offsets = self.string_offsets.tolist()
+        self._file_index = {self.string(int(sid)): i for i, sid in enumerate(self.file_names)}
+        self._recent = OrderedDict()  # small LRU of decoded files; report lookups hit the same files repeatedly
+
+    def string(self, sid):
+        """Decode an interned string by id."""
+        return self._buf[self._offsets[sid]:self._offsets[sid + 1]].decode("utf8")
+
+    def functions(self, file_index):
+        """Build the {function: [deps]} dict for one file index."""
+        strings = self.string
+        start, end = int(self.file_func_offsets[file_index]), int(self.file_func_offsets[file_index + 1])
+        dep_offsets = self.func_dep_offsets[start:end + 1].tolist()
+        dep_ids = self.dep_names[dep_offsets[0]:dep_offsets[-1]].tolist()
+        base = dep_offsets[0]
+        result = {}
+        for i, sid in enumerate(self.func_names[start:end].tolist()):
+            result[strings(sid)] = [strings(d) for d in dep_ids[dep_offsets[i] - base:dep_offsets[i + 1] - base]]
+        return result
+
+    def __getitem__(self, file_path):
+        funcs = self._recent.get(file_path)
+        if funcs is None:
+            funcs = self.functions(self._file_index[file_path])
+            self._recent[file_path] = funcs
+            if len(self._recent) > 256:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(file_path)
+        return funcs
+
+    def __contains__(self, file_path):
+        return file_path in self._file_index
+
+    def __iter__(self):
+        return iter(self._file_index)
+
+    def __len__(self):
+        return len(self._file_index)
+
+    def to_dict(self):
+        """Materialise the full mapping (for JSON export)."""
+        return {file_path: self.functions(i) for file_path, i in self._file_index.items()}
+
+
+def artifact_is_current(json_path):
+    """True if json_path's artifact exists and is at least as new as the JSON (or there is no JSON)."""
+    meta = os.path.join(artifact_path_for(json_path), "meta.json")
+    if not os.path.exists(meta):
+        return False
+    return not os.path.exists(json_path) or os.path.getmtime(meta) >= os.path.getmtime(json_path)
+
+
+def dependencies_source(json_path):
+    """The path load_dependencies(json_path) reads: the artifact when current, else the JSON."""
+    return artifact_path_for(json_path) if artifact_is_current(json_path) else json_path
+
+
+def remove_artifact(json_path):
+    """Delete json_path's artifact (when a run stops writing it, so it cannot go stale)."""
+    artifact = artifact_path_for(json_path)
+    if os.path.isdir(artifact):
+        shutil.rmtree(artifact)
+        logger.info("Removed binary artifact %s (not in the output formats)", artifact)
+
+
+def load_dependencies(json_path):
+    """
+    Load the dependency map for json_path, preferring the binary artifact
+    next to it when it is at least as new as the JSON file, else the JSON.
+    """
+    artifact = artifact_path_for(json_path)
+    if artifact_is_current(json_path):
+        try:
+            deps = DependencyArtifact(artifact)
+            logger.info("📦 Loaded binary artifact %s (%d files)", artifact, len(deps))
+            return deps
+        except Exception as e:
+            logger.warning("⚠️ Could not read %s (%s); falling back to JSON", artifact, e)
+    if os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf8") as f:
+            return json.load(f)
+    return {}
@@ -0,0 +1,169 @@
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+from importlib import metadata
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction logic changes output, so old cache entries are ignored
+EXTRACTOR_VERSION = "1"
+
+# pip distribution that provides each Tree-sitter grammar
+GRAMMAR_PACKAGES = {
+    'python': 'tree-sitter-python',
+    'java': 'tree-sitter-java',
+    'javascript': 'tree-sitter-javascript',
+    'typescript': 'tree-sitter-typescript',
+    'csharp': 'tree-sitter-c-sharp',
+    'go': 'tree-sitter-go',
+    'php': 'tree-sitter-php',
+    'cpp': 'tree-sitter-cpp',
+    'c': 'tree-sitter-c',
+}
+
+_GRAMMAR_VERSIONS = {}
+
+
+def _dist_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "missing"
+
+
+def grammar_version(language):
+    """Version tag for a language: grammar package + tree-sitter runtime + extractor."""
+    if language not in _GRAMMAR_VERSIONS:
+        pkg = GRAMMAR_PACKAGES.get(language, language)
+        _GRAMMAR_VERSIONS[language] = "%s==%s;tree-sitter==%s;extractor=%s" % (
+            pkg, _dist_version(pkg), _dist_version('tree-sitter'), EXTRACTOR_VERSION)
+    return _GRAMMAR_VERSIONS[language]
+
+
+def file_digest(path):
+    """SHA-1 of the file contents."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DependencyCache:
+    """
+    Persistent per-file cache of {function: [deps]} maps, stored in SQLite.
+
+    Entries are keyed by file path and validated against the content hash and
+    grammar version. A matching (mtime, size) skips re-hashing, so a warm scan
+    of an unchanged tree only needs one stat() per file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_deps (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER,
+                digest TEXT,
+                grammar TEXT,
+                deps TEXT
+            )
+        """)
+        self._entries = {
+            row[0]: row[1:]
+            for row in self.conn.execute("SELECT path, mtime_ns, size, digest, grammar, deps FROM file_deps")
+        }
+        self._pending = {}   # path -> (mtime_ns, size, digest) for misses awaiting store()
+        self._dirty = {}     # path -> row to upsert on save()
+        self.hits = 0
+        self.misses = 0
+        logger.info("📦 Loaded %d cached file(s) from %s", len(self._entries), path)
+
+    def lookup(self, file_path, language):
+        """Return the cached deps for file_path, or None if it must be re-parsed."""
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        grammar = grammar_version(language)
+        entry = self._entries.get(file_path)
+        if entry and entry[3] == grammar:
+            mtime_ns, size, digest, _, deps = entry
+            if mtime_ns == st.st_mtime_ns and size == st.st_size:
+                self.hits += 1
+                return json.loads(deps)
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+        if entry and entry[3] == grammar and entry[2] == digest:
+            # Touched but not modified: refresh the stat fingerprint only
+            self._entries[file_path] = (st.st_mtime_ns, st.st_size, digest, grammar, entry[4])
+            self._dirty[file_path] = (file_path,) + self._entries[file_path]
+            self.hits += 1
+            return json.loads(entry[4])
+
+        self._pending[file_path] = (st.st_mtime_ns, st.st_size, digest)
+        self.misses += 1
+        return None
+
+    def store(self, file_path, language, deps):
+        """Record freshly parsed deps for a file previously missed by lookup()."""
+        fingerprint = self._pending.pop(file_path, None)
+        if fingerprint is None:
+            try:
+                st = os.stat(file_path)
+                fingerprint = (st.st_mtime_ns, st.st_size, file_digest(file_path))
+            except OSError:
+                return
+        row = fingerprint + (grammar_version(language), json.dumps(deps, ensure_ascii=False))
+        self._entries[file_path] = row
+        self._dirty[file_path] = (file_path,) + row
+
+    def discard(self, file_path):
+        """Drop a single entry (e.g. for a deleted file)."""
+        self._pending.pop(file_path, None)
+        self._dirty.pop(file_path, None)
+        if self._entries.pop(file_path, None) is not None:
+            self.conn.execute("DELETE FROM file_deps WHERE path = ?", (file_path,))
+
+    def evict_missing(self, live_paths, root=None):
+        """
+        Remove entries for files that are no longer present.
+        Only entries under root (when given) are considered, so caches shared by
+        several projects are not wiped by a scan of one of them.
+        """
+        live = set(live_paths)
+        prefix = os.path.join(os.path.abspath(root), "") if root else None
+        stale = [
+            p for p in self._entries
+            if p not in live and (prefix is None or os.path.abspath(p).startswith(prefix))
+        ]
+        for p in stale:
+            self.discard(p)
+        if stale:
+            logger.info("🧹 Evicted %d stale cache entr(ies)", len(stale))
+        return len(stale)
+
+    def save(self):
+        """Flush pending writes to disk."""
+        if self._dirty:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO file_deps (path, mtime_ns, size, digest, grammar, deps) VALUES (?,?,?,?,?,?)",
+                list(self._dirty.values()))
+            self._dirty.clear()
+        self.conn.commit()
+
+    def close(self):
+        self.save()
+        self.conn.close()
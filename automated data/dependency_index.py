@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Reverse call-graph index (callee -> callers) over app_dependencies.json.
+
+Function and file names are interned into string tables and the edges are
+kept in CSR form (offset + target arrays), so transitive impact queries are
+a breadth-first walk over integer arrays instead of a scan of the JSON.
+
+    python dependency_index.py --deps app_dependencies.json --function calculate_total --max-depth 3
+"""
+import sys
+import time
+import argparse
+import logging
+from array import array
+
+from dependency_artifact import load_dependencies
+
+logger = logging.getLogger(__name__)
+
+_QUALIFIER_SEPARATORS = ('::', '->', '.')
+
+
+def short_name(name):
+    """
+    Normalise a call or definition name to its bare identifier.
+    e.g. 'self.helper' -> 'helper', 'Foo::bar' -> 'bar', '* processData' -> 'processData'
+    """
+    s = str(name).strip()
+    for sep in _QUALIFIER_SEPARATORS:
+        if sep in s:
+            s = s.rsplit(sep, 1)[1]
+    s = s.lstrip('*& ').strip()
+    if ' ' in s:
+        s = s.split()[-1]
+    return s
+
+
+def _csr(pairs, n_rows):
+    """Build (offsets, targets) arrays from (row, target) pairs; targets keep insertion order per row."""
+    counts = [0] * (n_rows + 1)
+    for row, _ in pairs:
+        counts[row + 1] += 1
+    for i in range(n_rows):
+        counts[i + 1] += counts[i]
+    offsets = array('i', counts)
+    targets = array('i', bytes(4 * len(pairs)))
+    fill = list(counts[:-1])
+    for row, target in pairs:
+        targets[fill[row]] = target
+        fill[row] += 1
+    return offsets, targets
+
+
+class ReverseDependencyIndex:
+    """
+    Callee -> caller index across every file in a dependency map.
+
+    Nodes are function definitions (file, function). Calls are resolved by
+    bare name, since the extracted graph does not carry import information.
+    """
+
+    def __init__(self, names, files, node_file, node_func, node_short, caller_offsets, callers, def_offsets, defs):
+        self.names = names                    # interned short/definition names
+        self.files = files                    # interned file paths
+        self.node_file = node_file            # node id -> file id
+        self.node_func = node_func            # node id -> name id of the definition
+        self.node_short = node_short          # node id -> name id of the bare definition name
+        self.caller_offsets = caller_offsets  # name id -> slice into callers
+        self.callers = callers                # caller node ids grouped by callee name id
+        self.def_offsets = def_offsets        # name id -> slice into defs
+        self.defs = defs                      # node ids grouped by short definition name id
+        self._name_ids = {n: i for i, n in enumerate(names)}
+
+    @classmethod
+    def build(cls, all_dependencies):
+        """Build the index from a {file: {function: [deps]}} mapping (dict or DependencyArtifact)."""
+        names, name_ids = [], {}
+        files = []
+
+        def intern(value):
+            idx = name_ids.get(value)
+            if idx is None:
+                idx = name_ids[value] = len(names)
+                names.append(value)
+            return idx
+
+        node_file, node_func, node_short = array('i'), array('i'), array('i')
+        call_pairs, def_pairs = [], []
+        for file_path, funcs in all_dependencies.items():
+            file_id = len(files)
+            files.append(file_path)
+            if not isinstance(funcs, dict):
+                continue
+            for func, deps in funcs.items():
+                node = len(node_file)
+                node_file.append(file_id)
+                node_func.append(intern(func))
+                node_short.append(intern(short_name(func)))
+                def_pairs.append((node_short[node], node))
+                seen = set()
+                for dep in deps or []:
+                    callee = intern(short_name(dep))
+                    if callee not in seen:
+                        seen.add(callee)
+                        call_pairs.append((callee, node))
+
+        caller_offsets, callers = _csr(call_pairs, len(names))
+        def_offsets, defs = _csr(def_pairs, len(names))
+        logger.info("🔁 Reverse index: %d function(s), %d call edge(s), %d file(s)",
+                    len(node_file), len(callers), len(files))
+        return cls(names, files, node_file, node_func, node_short, caller_offsets, callers, def_offsets, defs)
+
+    @classmethod
+    def from_json(cls, path):
+        """Build from app_dependencies.json, or from its binary .depgraph artifact when present."""
+        return cls.build(load_dependencies(path))
+
+    def _node(self, node):
+        return self.files[self.node_file[node]], self.names[self.node_func[node]]
+
+    def definitions(self, function):
+        """All (file, function) definitions matching a function name."""
+        name_id = self._name_ids.get(short_name(function))
+        if name_id is None:
+            return []
+        return [self._node(n) for n in self.defs[self.def_offsets[name_id]:self.def_offsets[name_id + 1]]]
+
+    def callers_of(self, function):
+        """Direct callers (file, function) of a function name."""
+        name_id = self._name_ids.get(short_name(function))
+        if name_id is None:
+            return []
+        return [self._node(n) for n in self.callers[self.caller_offsets[name_id]:self.caller_offsets[name_id + 1]]]
+
+    def impacted(self, functions, max_depth=None):
+        """
+        Every function transitively affected by a change to `functions`
+        (a name or an iterable of names).
+
+        Returns a list of (file, function, depth) ordered by depth, where depth 1
+        is a direct caller. Cycles are handled by visiting each node and each
+        callee name at most once; the changed functions themselves are excluded.
+        """
+        if isinstance(functions, str):
+            functions = [functions]
+        offsets, callers = self.caller_offsets, self.callers
+        name_seen = bytearray(len(self.names))
+        node_seen = bytearray(len(self.node_file))
+
+        frontier = []
+        for func in functions:
+            name_id = self._name_ids.get(short_name(func))
+            if name_id is not None and not name_seen[name_id]:
+                name_seen[name_id] = 1
+                frontier.append(name_id)
+                for node in self.defs[self.def_offsets[name_id]:self.def_offsets[name_id + 1]]:
+                    node_seen[node] = 1
+
+        results = []
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier = []
+            for name_id in frontier:
+                for node in callers[offsets[name_id]:offsets[name_id + 1]]:
+                    if node_seen[node]:
+                        continue
+                    node_seen[node] = 1
+                    results.append(self._node(node) + (depth,))
+                    callee = self.node_short[node]
+                    if not name_seen[callee]:
+                        name_seen[callee] = 1
+                        next_frontier.append(callee)
+            frontier = next_frontier
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query transitive impact of a changed function")
+    parser.add_argument("--deps", required=True, help="Path to app_dependencies.json")
+    parser.add_argument("--function", required=True, action="append", help="Changed function name (repeatable)")
+    parser.add_argument("--max-depth", type=int, default=None, help="Limit on caller hops")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = ReverseDependencyIndex.from_json(args.deps)
+    built = time.perf_counter()
+    impacted = index.impacted(args.function, max_depth=args.max_depth)
+    queried = time.perf_counter()
+
+    for file_path, func, depth in impacted:
+        print(f"{depth}\t{func}\t{file_path}")
+    print(f"\n{len(impacted)} impacted function(s); index built in {built - start:.3f}s, "
+          f"query took {(queried - built) * 1000:.2f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
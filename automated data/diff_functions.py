@@ -0,0 +1,93 @@
+"""
+Map unified-diff hunks onto the functions they modify.
+
+Hunk headers give new-file line numbers; the post-image source is parsed with
+the same Tree-sitter parsers as automated_pipeline.py (source_parsers.py) and each changed line is
+looked up in an interval index of function spans. Unlike the `^+def` regexes,
+this also reports functions whose bodies were edited.
+"""
+import re
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+
+
+def changed_lines(patch):
+    """
+    New-file line numbers touched by a patch, in one pass: every added line,
+    plus the line preceding each deletion.
+    """
+    lines = []
+    new_line = None
+    for line in patch.splitlines():
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            new_line = int(match.group(1)) if match else None
+            continue
+        if new_line is None or line.startswith("\\"):  # "\ No newline at end of file"
+            continue
+        if line.startswith("+"):
+            touched = new_line
+            new_line += 1
+        elif line.startswith("-"):
+            touched = max(new_line - 1, 1)
+        else:
+            new_line += 1
+            continue
+        if not lines or lines[-1] != touched:
+            lines.append(touched)
+    return lines
+
+
+class FunctionSpanIndex:
+    """
+    Interval index over (start_line, end_line, name) function spans.
+
+    Spans are sorted by start and each keeps a pointer to its enclosing span,
+    so innermost(line) is a bisect plus a short walk up the nesting chain.
+    """
+
+    def __init__(self, spans):
+        spans = sorted(spans, key=lambda s: (s[0], -s[1]))
+        self.starts = [s[0] for s in spans]
+        self.ends = [s[1] for s in spans]
+        self.names = [s[2] for s in spans]
+        self.parents = []
+        stack = []
+        for i, start in enumerate(self.starts):
+            while stack and self.ends[stack[-1]] < start:
+                stack.pop()
+            self.parents.append(stack[-1] if stack else -1)
+            stack.append(i)
+
+    def innermost(self, line):
+        """Name of the innermost function containing line, or None."""
+        i = bisect_right(self.starts, line) - 1
+        while i >= 0 and self.ends[i] < line:
+            i = self.parents[i]
+        return self.names[i] if i >= 0 else None
+
+    def functions_for_lines(self, lines):
+        """Innermost functions containing any of lines, in order of first appearance."""
+        found = {}
+        for line in lines:
+            name = self.innermost(line)
+            if name is not None:
+                found[name] = None
+        return list(found)
+
+
+def changed_functions(patch, source, language):
+    """
+    Functions in the post-image source touched by patch, or None when no
+    Tree-sitter parser is available for language.
+    """
+    from source_parsers import function_spans  # loads Tree-sitter, only needed in hunk mode
+
+    spans = function_spans(source, language)
+    if spans is None:
+        return None
+    return FunctionSpanIndex(spans).functions_for_lines(changed_lines(patch))
@@ -1,5 +1,4 @@
 import argparse
-import requests
 import re
 import csv
 import os
@@ -18,6 +17,11 @@ import sys, os
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(PROJECT_ROOT)
 
+from git_local import iter_local_commits, is_ancestor
+from github_client import GitHubClient
+from commit_store import (FIELDNAMES, UpsertCsvWriter, sync_state_path_for,
+                          load_sync_state, save_sync_state)
+
 
 
 def _load_config_fallback():
@@ -39,58 +43,75 @@ def _load_config_fallback():
 def find_and_write_commits(repo_owner: str = "lingeshloganathan",
                            repo_name: str = "python-testcase",
                            output_file: str = r"D:\data-learn\automated data\userstory_commit_report.csv",
-                           latest: int = 0):
-    headers = {"Accept": "application/vnd.github.v3+json"}
+                           latest: int = 0,
+                           client: GitHubClient = None,
+                           full: bool = False,
+                           local_repo: str = None,
+                           parquet: bool = False):
     logging.info(f"Fetching commits for {repo_owner}/{repo_name}")
+    if not local_repo:
+        client = client or GitHubClient.from_config(_load_config_fallback())
+
+    # High-water mark: newest commit already written for this repo
+    state_path = sync_state_path_for(output_file)
+    sync_state = load_sync_state(state_path)
+    repo_key = f"{repo_owner}/{repo_name}"
+    last_sha = None if full else sync_state.get(repo_key, {}).get("last_sha")
+    # A crawl that was interrupted resumes from its last fully written page
+    pending = None if full else sync_state.get(repo_key, {}).get("pending")
+    progress = {"fetched": 0, "reached_last": False, "head_sha": pending["head_sha"] if pending else None}
+    start_page = pending["page"] if pending else 1
+
+    def new_commits():
+        """Commits newer than last_sha, newest first, pulled lazily page by page."""
+        nonlocal last_sha
+        if local_repo:
+            logging.info(f"Using local git backend: {local_repo}")
+            if last_sha and not is_ancestor(local_repo, last_sha):
+                logging.warning(f"Last synced commit {last_sha} is not in HEAD's history; rescanning")
+                last_sha = None
+            rev_range = f"{last_sha}..HEAD" if last_sha else None
+            for commit in iter_local_commits(local_repo, rev_range=rev_range, max_count=latest):
+                progress["fetched"] += 1
+                progress["head_sha"] = progress["head_sha"] or commit["sha"]
+                yield commit
+            progress["reached_last"] = not latest or progress["fetched"] < latest
+            return
+
+        if pending:
+            logging.info(f"Resuming interrupted sync of {repo_key} at page {start_page}")
+        for page, commits in client.iter_commit_pages(repo_owner, repo_name, start_page=start_page):
+            print(f"{client.api_url}/repos/{repo_owner}/{repo_name}/commits page {page}")
+            for commit in commits:
+                if commit.get("sha") == last_sha:
+                    progress["reached_last"] = True
+                    return
+                if latest and progress["fetched"] >= latest:
+                    return
+                progress["fetched"] += 1
+                progress["head_sha"] = progress["head_sha"] or commit["sha"]
+                yield dict(commit, _page=page)
+        progress["reached_last"] = True  # history exhausted
+
+    if full and os.path.exists(output_file):
+        os.remove(output_file)  # --full rebuilds the report from scratch
+
+    # Streaming: pages are fetched lazily, with_files keeps at most 2 * max_workers commits
+    # in flight, and rows are upserted on (CommitSHA, FileChanged) as each commit arrives
+    with UpsertCsvWriter(output_file, FIELDNAMES, parquet=parquet) as writer:
+        checkpoint_page = start_page
+        # Commit details (files + patches) are fetched concurrently over the pooled session;
+        # local commits already carry their files
+        commits = new_commits() if local_repo else client.with_files(repo_owner, repo_name, new_commits())
+        for commit in commits:
+            page = commit.get("_page")
+            if page and page != checkpoint_page:
+                # Commits arrive in order, so every page before this one is fully written
+                writer.flush()
+                sync_state[repo_key] = {"last_sha": last_sha, "pending": {"page": page, "head_sha": progress["head_sha"]}}
+                save_sync_state(state_path, sync_state)
+                checkpoint_page = page
 
-    all_commits = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/commits"
-        print(url)
-        params = {"per_page": 100, "page": page}
-        response = requests.get(url, headers=headers, params=params)
-
-        try:
-            commits = response.json()
-        except Exception as e:
-            print("Error decoding JSON from GitHub response:", e)
-            break
-
-        # Debug: print API error messages
-        if isinstance(commits, dict) and "message" in commits:
-            print("GitHub API error:", commits["message"])
-            break
-
-        # stop when no more commits or an error message object is returned
-        if not commits:
-            break
-
-        all_commits.extend(commits)
-        page += 1
-        if latest and len(all_commits) >= latest:
-            break
-
-    print(f"Total commits fetched: {len(all_commits)}")
-    if all_commits and isinstance(all_commits[0], dict):
-        print("Sample commit keys:", list(all_commits[0].keys()))
-        print("Sample commit:", all_commits[0])
-
-    logging.info(f"\U0001F4E6 Total commits fetched: {len(all_commits)}")
-
-    fieldnames = ["UserStoryID", "CommitSHA", "Author", "Message", "FileChanged", "ChangedFunctions", "Language"]
-    file_exists = os.path.exists(output_file)
-
-    # Ensure the output directory exists
-    output_dir = os.path.dirname(output_file)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-
-    with open(output_file, mode="w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for commit in all_commits:
             sha = commit["sha"]
             author = commit["commit"]["author"]["name"]
             msg = commit["commit"]["message"].replace("\n", "\\n").strip()
@@ -101,9 +122,7 @@ def find_and_write_commits(repo_owner: str = "lingeshloganathan",
             if match:
                 user_story_id = match.group(1)
 
-            files_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/commits/{sha}"
-            details = requests.get(files_url, headers=headers).json()
-            files = details.get("files", [])
+            files = commit.get("files", [])
             print(f"Commit {sha} has {len(files)} files")
             for file in files:
                 filename = file["filename"]
@@ -177,6 +196,21 @@ def find_and_write_commits(repo_owner: str = "lingeshloganathan",
                     "ChangedFunctions": joined_functions,
                     "Language": language
                 })
+
+    print(f"Total commits fetched: {progress['fetched']}")
+    logging.info(f"\U0001F4E6 Total new commits fetched: {progress['fetched']}" +
+                 (f" (since {last_sha[:12]})" if last_sha else ""))
+
+    # Only advance the high-water mark when the walk reached it (or the start of history);
+    # a first run cut short by --latest leaves it unset so older commits still sync later
+    if progress["head_sha"] and progress["reached_last"]:
+        sync_state[repo_key] = {"last_sha": progress["head_sha"]}
+    elif last_sha:
+        sync_state[repo_key] = {"last_sha": last_sha}
+    else:
+        sync_state.pop(repo_key, None)  # also drops a pending page checkpoint
+    if sync_state or os.path.exists(state_path):
+        save_sync_state(state_path, sync_state)
     logging.info(f"\n✅ Data written/appended successfully to: {output_file}")
 
 
@@ -186,6 +220,8 @@ def main(argv=None):
     parser.add_argument("--repo_name", default=None, help="GitHub repo name")
     parser.add_argument("--output_file", default=None, help="CSV output file")
     parser.add_argument("--latest", type=int, default=0, help="If set, process the most recent N commits.")
+    parser.add_argument("--full", action="store_true", help="Ignore the last synced commit and rebuild the report")
+    parser.add_argument("--local_repo", default=None, help="Read commits from this local clone instead of the GitHub API")
 
     args = parser.parse_args(argv)
 
@@ -193,9 +229,13 @@ def main(argv=None):
     repo_owner = args.repo_owner or cfg.get('repo_owner') or 'lingeshloganathan'
     repo_name = args.repo_name or cfg.get('repo_name') or 'python-testcase'
     output_file = args.output_file or cfg.get('output_file')
+    local_repo = args.local_repo or cfg.get('local_repo_path')
     print(output_file)
 
-    find_and_write_commits(repo_owner, repo_name, output_file, args.latest)
+    # The API client (and its response cache) is only needed without a local clone
+    client = None if local_repo else GitHubClient.from_config(cfg)
+    find_and_write_commits(repo_owner, repo_name, output_file, args.latest, client,
+                           full=args.full, local_repo=local_repo, parquet=cfg.get('parquet_outputs', False))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,5 +1,4 @@
 import argparse
-import requests
 import re
 import csv
 import os
@@ -18,6 +17,72 @@ import sys, os
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(PROJECT_ROOT)
 
+from git_local import iter_local_commits, show_file
+from github_client import GitHubClient
+from commit_store import FIELDNAMES, UpsertCsvWriter
+from diff_functions import changed_functions
+
+
+EXT_MAP = {
+    '.py': 'python', '.js': 'javascript', '.ts': 'typescript',
+    '.java': 'java', '.cs': 'csharp', '.go': 'go', '.php': 'php',
+    '.cpp': 'cpp', '.c': 'c', '.h': 'c', '.jsx': 'javascript', '.tsx': 'typescript'
+}
+
+# Compiled once at import instead of per file
+_NOT_FUNCTIONS = ('if', 'for', 'while', 'switch', 'class')
+_PYTHON_DEF = re.compile(r"^\+def\s+([a-zA-Z_][a-zA-Z0-9_]*)", re.MULTILINE)
+_JAVA_PATTERNS = [
+    # Java: public/private/protected void/String/etc functionName(
+    re.compile(r"^\+\s*(public|private|protected)?\s+(static)?\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(", re.MULTILINE),
+    re.compile(r"^\+\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(", re.MULTILINE),
+]
+_JS_PATTERNS = [
+    re.compile(r"^\+\s*(export\s+)?(async\s+)?function\s+([a-zA-Z_][a-zA-Z0-9_]*)", re.MULTILINE),  # function declaration
+    re.compile(r"^\+\s*(export\s+)?(const|let|var)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(async\s*)?\(", re.MULTILINE),  # const func = ()
+    re.compile(r"^\+\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\(\s*.*?\s*\)\s*{", re.MULTILINE),  # arrow function or method
+]
+_CSHARP_PATTERNS = [
+    # C#: public/private void/string FunctionName()
+    re.compile(r"^\+\s*(public|private|protected)?\s+(static)?\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(", re.MULTILINE),
+]
+
+
+def extract_added_functions(patch, language):
+    """Names of functions whose definition line was added in patch (regex based)."""
+    added_functions = []
+    if not patch:
+        return added_functions
+
+    if language == 'python':
+        # Python: def function_name(
+        added_functions = _PYTHON_DEF.findall(patch)
+
+    elif language == 'java':
+        for pattern in _JAVA_PATTERNS:
+            for match in pattern.findall(patch):
+                func_name = match[-1] if isinstance(match, tuple) else match  # Last group is always the function name
+                if func_name and func_name.lower() not in _NOT_FUNCTIONS:
+                    added_functions.append(func_name)
+
+    elif language in ('javascript', 'typescript'):
+        for pattern in _JS_PATTERNS:
+            for match in pattern.findall(patch):
+                if isinstance(match, tuple):
+                    func_name = [m for m in match if m and not m in ('export', 'async', 'const', 'let', 'var')][-1]
+                else:
+                    func_name = match
+                if func_name and func_name.lower() not in _NOT_FUNCTIONS:
+                    added_functions.append(func_name)
+
+    elif language == 'csharp':
+        for pattern in _CSHARP_PATTERNS:
+            for match in pattern.findall(patch):
+                func_name = match[-1] if isinstance(match, tuple) else match
+                if func_name:
+                    added_functions.append(func_name)
+
+    return added_functions
 
 
 def _load_config_fallback():
@@ -41,161 +106,116 @@ def find_and_write_commits(user_story_id: str,
                            repo_name: str = "python-testcase",
                            output_file: str = r"D:\data-learn\automated data\userstory_commit_report.csv",
                            last_only: bool = False,
-                           latest: int = 0):
-    headers = {"Accept": "application/vnd.github.v3+json"}
+                           latest: int = 0,
+                           local_repo: str = None,
+                           client: GitHubClient = None,
+                           function_mode: str = "added",
+                           parquet: bool = False):
+    """
+    function_mode: "added" reports functions whose definition line was added
+    (regex over the patch); "hunks" maps hunk line ranges onto Tree-sitter
+    function spans of the post-image, so edits inside bodies count too.
+    parquet: also refresh the table_io parquet copy of output_file.
+    """
     logging.info(f"Searching commits for {user_story_id} in {repo_owner}/{repo_name}")
-
-    all_commits = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/commits"
-        print(url)
-        params = {"per_page": 100, "page": page}
-        response = requests.get(url, headers=headers, params=params)
-
-        try:
-            commits = response.json()
-        except Exception as e:
-            print("Error decoding JSON from GitHub response:", e)
-            break
-
-        # stop when no more commits or an error message object is returned
-        if not commits or (isinstance(commits, dict) and commits.get("message")):
-            break
-
-        all_commits.extend(commits)
-        page += 1
-        # If caller only requested a limited number of recent commits, stop when we have enough
-        if latest and len(all_commits) >= latest:
-            break
-
-    logging.info(f"📦 Total commits fetched: {len(all_commits)}")
-
-    fieldnames = ["UserStoryID", "CommitSHA", "Author", "Message", "FileChanged", "ChangedFunctions", "Language"]
-    file_exists = os.path.exists(output_file)
-
-    # Ensure the output directory exists
-    output_dir = os.path.dirname(output_file)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-
-    with open(output_file, mode="a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
+    if not local_repo:
+        client = client or GitHubClient.from_config(_load_config_fallback())
+
+    def load_post_image(sha, file):
+        if local_repo:
+            return show_file(local_repo, sha, file["filename"])
+        if file.get("status") == "removed" or not file.get("raw_url"):
+            return None
+        resp = client.get(file["raw_url"])
+        return resp.content if resp.status_code == 200 else None
+
+    if local_repo:
+        # Read commits and patches straight from a local clone (no API calls)
+        logging.info(f"Using local git backend: {local_repo}")
+        all_commits = iter_local_commits(local_repo, max_count=latest)
+    else:
+        def api_commits():
+            # Pages are fetched lazily as the writer consumes commits, so memory stays flat
+            fetched = 0
+            for page, commits in client.iter_commit_pages(repo_owner, repo_name):
+                for commit in commits:
+                    # If caller only requested a limited number of recent commits, stop when we have enough
+                    if latest and fetched >= latest:
+                        return
+                    fetched += 1
+                    yield commit
+            logging.info(f"📦 Total commits fetched: {fetched}")
+
+        all_commits = api_commits()
+
+    # Rows are upserted on (CommitSHA, FileChanged): processing the same story twice never duplicates them
+    with UpsertCsvWriter(output_file, FIELDNAMES, parquet=parquet) as writer:
+
+        def matching_commits():
+            for commit in all_commits:
+                msg = commit["commit"]["message"]
+                # If latest mode is enabled, process unconditionally (we'll still honor last_only later)
+                if latest:
+                    match_us = True
+                else:
+                    match_us = bool(re.match(rf"^{re.escape(user_story_id)}\b[:\s-]?", msg.strip(), re.IGNORECASE))
+                if match_us:
+                    yield commit
+                    # if only the most recent match is desired, stop after first match
+                    if last_only:
+                        return
 
         matched_any = False
-        for commit in all_commits:
+        # Commit details (files + patches) are fetched concurrently over the pooled session;
+        # local commits already carry their files
+        commits = matching_commits() if local_repo else client.with_files(repo_owner, repo_name, matching_commits())
+        for commit in commits:
+            matched_any = True
             msg = commit["commit"]["message"]
-            # If latest mode is enabled, process unconditionally (we'll still honor last_only later)
-            if latest:
-                match_us = True
-            else:
-                match_us = bool(re.match(rf"^{re.escape(user_story_id)}\b[:\s-]?", msg.strip(), re.IGNORECASE))
-
-            if match_us:
-                matched_any = True
-                sha = commit["sha"]
-                author = commit["commit"]["author"]["name"]
-                clean_msg = msg.replace("\n", "\\n").strip()
-
-                logging.info(f"Commit: {sha} Author: {author} Message: {clean_msg[:120]}...")
-
-                files_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/commits/{sha}"
-                details = requests.get(files_url, headers=headers).json()
-                files = details.get("files", [])
-
-                for file in files:
-                    filename = file["filename"]
-                    patch = file.get("patch", "")
-                    # detect language from file extension (basic)
-                    _, ext = os.path.splitext(filename.lower())
-                    ext_map = {
-                        '.py': 'python', '.js': 'javascript', '.ts': 'typescript',
-                        '.java': 'java', '.cs': 'csharp', '.go': 'go', '.php': 'php',
-                        '.cpp': 'cpp', '.c': 'c', '.h': 'c', '.jsx': 'javascript', '.tsx': 'typescript'
-                    }
-                    language = ext_map.get(ext, 'unknown')
-
+            sha = commit["sha"]
+            author = commit["commit"]["author"]["name"]
+            clean_msg = msg.replace("\n", "\\n").strip()
+
+            logging.info(f"Commit: {sha} Author: {author} Message: {clean_msg[:120]}...")
+
+            files = commit.get("files", [])
+
+            for file in files:
+                filename = file["filename"]
+                patch = file.get("patch", "")
+                # detect language from file extension (basic)
+                _, ext = os.path.splitext(filename.lower())
+                language = EXT_MAP.get(ext, 'unknown')
+
+                added_functions = None
+                if function_mode == "hunks" and language != 'unknown' and patch:
+                    # Exact functions touched by the hunks, from the post-image source
+                    source = load_post_image(sha, file)
+                    if source is not None:
+                        added_functions = changed_functions(patch, source, language)
+                if added_functions is None:
                     # Extract added function names based on language
-                    added_functions = []
-                    
-                    if language == 'python' and patch:
-                        # Python: def function_name(
-                        added_functions = re.findall(r"^\+def\s+([a-zA-Z_][a-zA-Z0-9_]*)", patch, flags=re.MULTILINE)
-                    
-                    elif language == 'java' and patch:
-                        # Java: public/private/protected void/String/etc functionName(
-                        java_patterns = [
-                            r"^\+\s*(public|private|protected)?\s+(static)?\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(",
-                            r"^\+\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\("
-                        ]
-                        for pattern in java_patterns:
-                            matches = re.findall(pattern, patch, flags=re.MULTILINE)
-                            for match in matches:
-                                if isinstance(match, tuple):
-                                    func_name = match[-1]  # Last group is always the function name
-                                else:
-                                    func_name = match
-                                if func_name and func_name.lower() not in ('if', 'for', 'while', 'switch', 'class'):
-                                    added_functions.append(func_name)
-                    
-                    elif language in ('javascript', 'typescript') and patch:
-                        # JavaScript/TypeScript patterns:
-                        # function name(), const name = (), export function name()
-                        js_patterns = [
-                            r"^\+\s*(export\s+)?(async\s+)?function\s+([a-zA-Z_][a-zA-Z0-9_]*)",  # function declaration
-                            r"^\+\s*(export\s+)?(const|let|var)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*(async\s*)?\(",  # const func = ()
-                            r"^\+\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*\(\s*.*?\s*\)\s*{",  # arrow function or method
-                        ]
-                        for pattern in js_patterns:
-                            matches = re.findall(pattern, patch, flags=re.MULTILINE)
-                            for match in matches:
-                                if isinstance(match, tuple):
-                                    func_name = [m for m in match if m and not m in ('export', 'async', 'const', 'let', 'var')][-1]
-                                else:
-                                    func_name = match
-                                if func_name and func_name.lower() not in ('if', 'for', 'while', 'switch', 'class'):
-                                    added_functions.append(func_name)
-                    
-                    elif language == 'csharp' and patch:
-                        # C#: public/private void/string FunctionName()
-                        csharp_patterns = [
-                            r"^\+\s*(public|private|protected)?\s+(static)?\s*(\w+)\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(",
-                        ]
-                        for pattern in csharp_patterns:
-                            matches = re.findall(pattern, patch, flags=re.MULTILINE)
-                            for match in matches:
-                                if isinstance(match, tuple):
-                                    func_name = match[-1]
-                                else:
-                                    func_name = match
-                                if func_name:
-                                    added_functions.append(func_name)
-
-                    # Remove duplicates while preserving order
-                    added_functions = list(dict.fromkeys(added_functions))
-
-                    joined_functions = ", ".join(added_functions) if added_functions else ""
-
-                    writer.writerow({
-                        "UserStoryID": user_story_id,
-                        "CommitSHA": sha,
-                        "Author": author,
-                        "Message": clean_msg,
-                        "FileChanged": filename,
-                        "ChangedFunctions": joined_functions,
-                        "Language": language
-                    })
-
-                # if only the most recent match is desired, stop after first match
-                if last_only:
-                    break
+                    added_functions = extract_added_functions(patch, language)
+
+                # Remove duplicates while preserving order
+                added_functions = list(dict.fromkeys(added_functions))
+
+                joined_functions = ", ".join(added_functions) if added_functions else ""
+
+                writer.writerow({
+                    "UserStoryID": user_story_id,
+                    "CommitSHA": sha,
+                    "Author": author,
+                    "Message": clean_msg,
+                    "FileChanged": filename,
+                    "ChangedFunctions": joined_functions,
+                    "Language": language
+                })
 
         # If latest mode is enabled, and we only wanted N recent commits, we can stop after writing
         if latest:
             # We processed up to `latest` commits (we collected that many). Inform and return.
-            logging.info(f"Processed latest {min(latest, len(all_commits))} commits for {repo_owner}/{repo_name}")
+            logging.info(f"Processed latest {latest} commits for {repo_owner}/{repo_name}")
             return
 
         if not matched_any:
@@ -213,6 +233,9 @@ def main(argv=None):
     parser.add_argument("--output_file", default=None, help="CSV output file")
     parser.add_argument("--last_only", action="store_true", help="Only write the most recent matching commit")
     parser.add_argument("--latest", type=int, default=0, help="If set, process the most recent N commits (no user_story filter)")
+    parser.add_argument("--local_repo", default=None, help="Read commits from this local clone instead of the GitHub API")
+    parser.add_argument("--function_mode", choices=("added", "hunks"), default=None,
+                        help="added: new definitions only (default); hunks: every function touched by the diff")
 
     args = parser.parse_args(argv)
 
@@ -239,9 +262,16 @@ def main(argv=None):
     repo_owner = args.repo_owner or cfg.get('repo_owner') or 'lingeshloganathan'
     repo_name = args.repo_name or cfg.get('repo_name') or 'python-testcase'
     output_file = args.output_file or cfg.get('output_file') 
+    local_repo = args.local_repo or cfg.get('local_repo_path')
     print(output_file)
 
-    find_and_write_commits(args.user_story_id, repo_owner, repo_name, output_file, args.last_only, args.latest)
+    # The API client (and its response cache) is only needed without a local clone
+    client = None if local_repo else GitHubClient.from_config(cfg)
+
+    function_mode = args.function_mode or cfg.get('function_mode') or "added"
+
+    find_and_write_commits(args.user_story_id, repo_owner, repo_name, output_file, args.last_only, args.latest, local_repo, client,
+                           function_mode=function_mode, parquet=cfg.get('parquet_outputs', False))
 
 
 if __name__ == '__main__':
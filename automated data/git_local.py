@@ -0,0 +1,134 @@
+"""
+Local git backend for git_diff.py / git_dif_full.py.
+
+Streams `git log -p` from a local clone and yields commits in the same shape
+as the GitHub REST API (`/commits` list item + `files` from `/commits/{sha}`),
+so the CSV writers work unchanged and no network access is needed.
+"""
+import subprocess
+import logging
+
+logger = logging.getLogger(__name__)
+
+_RS = "\x1e"  # starts each commit record
+_US = "\x1f"  # separates sha / author / message
+_LOG_FORMAT = "--format=" + _RS + "%H" + _US + "%an" + _US + "%B" + _US
+
+
+def _strip_prefix(path, prefix):
+    path = path.strip()
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+class _FileDiff:
+    __slots__ = ("old_path", "new_path", "header_path", "patch_lines", "in_hunks")
+
+    def __init__(self, header):
+        # "diff --git a/x b/y" -- only used when there is no ---/+++ pair (renames, mode changes)
+        rest = header[len("diff --git "):]
+        self.header_path = _strip_prefix(rest.split(" b/", 1)[1], "") if " b/" in rest else rest
+        self.old_path = None
+        self.new_path = None
+        self.patch_lines = []
+        self.in_hunks = False
+
+    def to_api(self):
+        if self.new_path and self.new_path != "/dev/null":
+            filename = self.new_path
+        elif self.old_path and self.old_path != "/dev/null":
+            filename = self.old_path
+        else:
+            filename = self.header_path
+        return {"filename": filename, "patch": "\n".join(self.patch_lines)}
+
+
+def _commit_record(sha, author, message, files):
+    return {
+        "sha": sha,
+        "commit": {"author": {"name": author}, "message": message},
+        "files": [f.to_api() for f in files],
+    }
+
+
+def iter_local_commits(repo_path, rev_range=None, max_count=0, paths=None):
+    """
+    Yield commits from a local clone, newest first, in GitHub API shape:
+    {"sha", "commit": {"author": {"name"}, "message"}, "files": [{"filename", "patch"}]}
+
+    rev_range: e.g. "abc123..HEAD" (default: HEAD)
+    max_count: stop after this many commits (0 = all)
+    """
+    cmd = ["git", "-C", repo_path, "-c", "core.quotepath=off", "log", "--no-color",
+           "--no-ext-diff", "-p", _LOG_FORMAT]
+    if max_count:
+        cmd.append("--max-count=%d" % max_count)
+    if rev_range:
+        cmd.append(rev_range)
+    if paths:
+        cmd.append("--")
+        cmd.extend(paths)
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            encoding="utf-8", errors="replace")
+    header = None       # accumulating "sha US author US message US" (message may span lines)
+    current = None      # (sha, author, message)
+    files = []
+    diff = None
+    try:
+        for raw in proc.stdout:
+            line = raw.rstrip("\n")
+            if line.startswith(_RS) or header is not None:
+                if line.startswith(_RS):
+                    if current is not None:
+                        yield _commit_record(*current, files)
+                    header, current, files, diff = line[1:], None, [], None
+                else:
+                    header += "\n" + line
+                if header.count(_US) >= 3:
+                    sha, author, message, _ = header.split(_US, 3)
+                    current = (sha, author, message.strip())
+                    header = None
+                continue
+
+            if line.startswith("diff --git "):
+                diff = _FileDiff(line)
+                files.append(diff)
+            elif diff is None:
+                continue
+            elif diff.in_hunks:
+                diff.patch_lines.append(line)
+            elif line.startswith("--- "):
+                diff.old_path = _strip_prefix(line[4:], "a/")
+            elif line.startswith("+++ "):
+                diff.new_path = _strip_prefix(line[4:], "b/")
+            elif line.startswith("@@"):
+                diff.in_hunks = True
+                diff.patch_lines.append(line)
+
+        if current is not None:
+            yield _commit_record(*current, files)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.terminate()
+        returncode = proc.wait()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if returncode not in (0, -15) and stderr:
+            logger.error("git log failed in %s: %s", repo_path, stderr.strip())
+
+
+def is_ancestor(repo_path, sha):
+    """True if sha exists in repo_path and is reachable from HEAD."""
+    result = subprocess.run(["git", "-C", repo_path, "merge-base", "--is-ancestor", sha, "HEAD"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def show_file(repo_path, sha, path):
+    """Contents of path at commit sha as bytes, or None if it does not exist there."""
+    result = subprocess.run(["git", "-C", repo_path, "show", f"{sha}:{path}"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return result.stdout if result.returncode == 0 else None
@@ -0,0 +1,255 @@
+"""
+Shared GitHub REST client for git_diff.py / git_dif_full.py.
+
+- One pooled requests.Session (keep-alive) instead of a new connection per call
+- Bounded concurrent fetching of /commits/{sha} details, yielded in input order
+- Honours rate-limit headers (Retry-After, X-RateLimit-Remaining/Reset) with backoff
+- Optional disk cache: immutable /commits/{sha} bodies are never refetched, other
+  endpoints are revalidated with If-None-Match (304s don't count against the rate limit)
+"""
+import os
+import re
+import json
+import copy
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
+
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.github.com"
+# Per-user cache directory (%LOCALAPPDATA% on Windows, $XDG_CACHE_HOME or ~/.cache elsewhere), not the source tree
+CACHE_DIR = os.path.join(os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+                         or os.path.join(os.path.expanduser("~"), ".cache"), "data-learn")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "github_responses.cache.sqlite")
+_FULL_SHA = re.compile(r"^[0-9a-f]{40}$")
+
+
+class RequestBudget:
+    """
+    Token bucket limiting one repo's share of the API rate limit.
+
+    Holds up to per_hour tokens and refills continuously; acquire() blocks
+    until a token is available.
+    """
+
+    def __init__(self, per_hour):
+        self.per_hour = max(1, int(per_hour))
+        self.tokens = float(self.per_hour)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.per_hour, self.tokens + (now - self.updated) * self.per_hour / 3600.0)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) * 3600.0 / self.per_hour
+                self.waited += delay
+            time.sleep(delay)
+
+
+class GitHubClient:
+    def __init__(self, token=None, api_url=API_URL, max_workers=8, max_retries=5,
+                 timeout=30, max_backoff=900, cache=None, pool_size=None):
+        self.api_url = (api_url or API_URL).rstrip("/")
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(self.max_workers, int(pool_size or 0)))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/vnd.github.v3+json"})
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+        # Shared by every with_budget() view, so one exhausted limit pauses all of them
+        self._rate_lock = threading.Lock()
+        self._rate_state = {"blocked_until": 0.0}
+        self.requests_made = 0
+        self.budget = None
+
+        self.cache = cache
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a client from config; github_cache_path = "" disables the response cache."""
+        cfg = cfg or {}
+        cache_path = cfg.get('github_cache_path', DEFAULT_CACHE_PATH)
+        cache = None
+        if cache_path:
+            cache = ResponseCache(cache_path, max_bytes=int(cfg.get('github_cache_max_mb', 256)) * 1024 * 1024)
+        return cls(token=cfg.get('github_token'),
+                   api_url=cfg.get('github_api_url') or API_URL,
+                   max_workers=cfg.get('github_max_workers', 8),
+                   cache=cache,
+                   pool_size=cfg.get('github_pool_size'))
+
+    def with_budget(self, budget):
+        """
+        A view of this client that shares its session, cache and rate-limit
+        state but draws every request from budget (a RequestBudget).
+        """
+        view = copy.copy(self)
+        view.budget = budget
+        view.requests_made = view.cache_hits = view.not_modified = 0
+        return view
+
+    # ---------- rate limiting ----------
+    def _wait_for_rate_limit(self):
+        with self._rate_lock:
+            delay = self._rate_state["blocked_until"] - time.time()
+        if delay > 0:
+            logger.warning("⏳ GitHub rate limit exhausted; sleeping %.0fs", delay)
+            time.sleep(min(delay, self.max_backoff))
+
+    def _note_rate_limit(self, resp):
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        reset = resp.headers.get("X-RateLimit-Reset")
+        if remaining == "0" and reset:
+            try:
+                with self._rate_lock:
+                    self._rate_state["blocked_until"] = max(self._rate_state["blocked_until"], float(reset) + 1)
+            except ValueError:
+                pass
+
+    def _retry_delay(self, resp, attempt):
+        """Seconds to wait before retrying resp, or None if it should not be retried."""
+        retry_after = resp.headers.get("Retry-After")
+        rate_limited = resp.status_code == 429 or (
+            resp.status_code == 403 and (retry_after or resp.headers.get("X-RateLimit-Remaining") == "0"))
+        if not rate_limited and resp.status_code < 500:
+            return None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        reset = resp.headers.get("X-RateLimit-Reset")
+        if resp.headers.get("X-RateLimit-Remaining") == "0" and reset:
+            try:
+                return min(max(0.0, float(reset) - time.time()) + 1, self.max_backoff)
+            except ValueError:
+                pass
+        return min(2 ** attempt + random.random(), self.max_backoff)
+
+    # ---------- requests ----------
+    def get(self, path, params=None, headers=None):
+        """GET an API path (or absolute URL) with pooled connections and rate-limit retries."""
+        url = path if path.startswith("http") else self.api_url + path
+        resp = None
+        for attempt in range(self.max_retries + 1):
+            if self.budget:
+                self.budget.acquire()
+            self._wait_for_rate_limit()
+            resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            self.requests_made += 1
+            self._note_rate_limit(resp)
+            delay = self._retry_delay(resp, attempt)
+            if delay is None or attempt == self.max_retries:
+                return resp
+            logger.warning("GitHub %s for %s; retrying in %.1fs", resp.status_code, url, delay)
+            time.sleep(delay)
+        return resp
+
+    def get_json(self, path, params=None, immutable=False):
+        """
+        GET and decode JSON, going through the response cache when one is set.
+
+        immutable=True marks responses that never change for this URL; cached
+        copies are returned without touching the network.
+        """
+        url = path if path.startswith("http") else self.api_url + path
+        key = url + ("?" + urlencode(sorted(params.items())) if params else "")
+        cached = self.cache.get(key) if self.cache else None
+        headers = None
+        if cached:
+            etag, cached_immutable, body = cached
+            if cached_immutable:
+                self.cache_hits += 1
+                return json.loads(body)
+            if etag:
+                headers = {"If-None-Match": etag}
+
+        resp = self.get(url, params=params, headers=headers)
+        if resp.status_code == 304 and cached:
+            self.not_modified += 1
+            return json.loads(cached[2])
+        try:
+            data = resp.json()
+        except ValueError as e:
+            logger.error("Error decoding JSON from GitHub response for %s: %s", path, e)
+            return None
+        if self.cache and resp.status_code == 200:
+            etag = resp.headers.get("ETag")
+            if immutable or etag:
+                self.cache.put(key, resp.content, etag=etag, immutable=immutable)
+        return data
+
+    def iter_commit_pages(self, owner, repo, per_page=100, start_page=1, params=None):
+        """Yield (page_number, [commit, ...]) from /repos/{owner}/{repo}/commits until exhausted."""
+        page = start_page
+        while True:
+            query = {"per_page": per_page, "page": page}
+            query.update(params or {})
+            commits = self.get_json(f"/repos/{owner}/{repo}/commits", params=query)
+            if isinstance(commits, dict) and commits.get("message"):
+                logger.error("GitHub API error: %s", commits["message"])
+                return
+            if not commits:
+                return
+            yield page, commits
+            page += 1
+
+    def get_commit(self, owner, repo, sha):
+        """Commit details (including files/patches) for one sha."""
+        # A full sha always names the same commit, so its details can be cached forever
+        details = self.get_json(f"/repos/{owner}/{repo}/commits/{sha}", immutable=bool(_FULL_SHA.match(sha)))
+        return details if isinstance(details, dict) else {}
+
+    def with_files(self, owner, repo, commits):
+        """
+        Yield each commit with its "files" list filled in from /commits/{sha}.
+
+        Detail requests run on a thread pool with at most 2 * max_workers in
+        flight, and results are yielded in input order. Commits that already
+        carry "files" (e.g. from the local git backend) pass straight through.
+        """
+        window = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for commit in commits:
+                if "files" in commit:
+                    window.append((commit, None))
+                else:
+                    window.append((commit, pool.submit(self.get_commit, owner, repo, commit["sha"])))
+                if len(window) >= 2 * self.max_workers:
+                    yield self._complete(*window.popleft())
+            while window:
+                yield self._complete(*window.popleft())
+
+    @staticmethod
+    def _complete(commit, future):
+        if future is None:
+            return commit
+        merged = dict(commit)
+        merged["files"] = future.result().get("files", [])
+        return merged
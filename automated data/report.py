@@ -1,6 +1,14 @@
 # report.py  — Full version with DB insert fixed
-import os, json, math, csv
+"""
+Regression-matrix report: commits x user stories x test results x dependencies.
+
+build_report() turns in-memory inputs into the report DataFrame with no I/O,
+so webhook.py and the training code can call it in-process; main() is the CLI
+that loads the configured files, builds the report and writes output_path.
+"""
+import os, io, json, csv, time
 import sys
+import argparse
 from pathlib import Path
 
 # Add project root to path so we can import model package
@@ -8,35 +16,30 @@ project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+import numpy as np
 import pandas as pd
-from model.db_connection import get_connection
+import psycopg2
+from psycopg2.extras import execute_values
+from model.db_connection import connection
+from table_io import read_table, write_table, append_table
+from dependency_artifact import load_dependencies, dependencies_source
+from commit_store import FIELDNAMES, list_partitions
+from results_aggregation import aggregate_tests, ResultsAggregateState, find_timestamp_column
+from report_state import (report_state_path_for, load_report_state, save_report_state,
+                          file_signature, cursor_valid, read_appended_csv, csv_columns)
 
 import logging
 
-# load centralized config and logging
-try:
-    import config_loader as cfg
-    cfg.setup_logging()
-    _conf = cfg.load_config()
-except Exception:
-    _conf = {}
-
-# ---------- CONFIG ----------
-output_file = _conf.get('output_file')
-tests_path = _conf.get('tests_path')
-app_deps_path = _conf.get('app_deps_path')
-todo_path = _conf.get('todo_path')
-output_path = _conf.get('output_path')
-if not output_file:
-    logging.error("output_file is not configured. Please set output_file in config_loader or _conf.")
-    sys.exit(1)
-if not output_path:
-    logging.error("output_path is not configured. Please set output_path in config_loader or _conf.")
-    sys.exit(1)
-output_status = output_path.replace(".csv", "_status.csv")
-
 logger = logging.getLogger(__name__)
 
+REPORT_COLUMNS = [
+ 'user_story_id','commit_sha','author','file_changed','changed_function',
+ 'dependent_function','language','test_case_id','test_name','total_no_of_Passed',
+ 'total_no_of_Failed','last_status','last_execution_date'
+]
+
+# Rows of test_results.csv held in memory at once while aggregating
+TESTS_CHUNK_ROWS = 500_000
 
 
 # ---------- HELPERS ----------
@@ -45,8 +48,8 @@ def read_any(path):
 
     # --- CSV FIX FOR BAD LINES ---
     if ext == ".csv":
-        # Use python engine and handle bad rows (warn or skip)
-        return pd.read_csv(
+        # Loads the parquet copy when one is current; skip malformed CSV rows
+        return read_table(
             path,
             dtype=str,
             on_bad_lines="skip"   # or "skip" to silently ignore malformed lines
@@ -62,6 +65,17 @@ def read_any(path):
     else:
         raise ValueError("Unsupported file type: " + ext)
 
+def read_commits(path, repos=None):
+    """Commit report from a CSV, or from a batch_harvest partition directory (optionally only some repos)."""
+    if not os.path.isdir(path):
+        return read_any(path)
+    partitions = list_partitions(path, repos)
+    logger.info("Reading %d commit partitions from %s", len(partitions), path)
+    frames = [read_any(p) for _, p in partitions]
+    if not frames:
+        return pd.DataFrame(columns=FIELDNAMES, dtype=str)
+    return pd.concat(frames, ignore_index=True)
+
 def split_funcs_cell(cell):
     if pd.isna(cell): return []
     s = str(cell).strip()
@@ -113,120 +127,14 @@ def map_todo(df):
         if key in ('testcaseid','test_case_id','testcase'): colmap[orig] = 'test_case_id'
     return df.rename(columns=colmap)
 
-# ---------- 1) LOAD ----------
-commits_df = read_any(output_file)
-logger.info("Loaded %d commits from %s", len(commits_df), output_file)
-
-# Load tests - optional, if file missing, skip test aggregation
-tests_df = None
-if os.path.exists(tests_path):
-    try:
-        tests_df = read_any(tests_path)
-        logger.info("Loaded %d test records from %s", len(tests_df), tests_path)
-    except Exception as e:
-        logger.warning("Could not load tests from %s: %s", tests_path, e)
-else:
-    logger.warning("Test file not found: %s", tests_path)
+def build_basename_keys(app_deps_obj):
+    """Group dependency-map file keys by basename, preserving key order."""
+    keys = {}
+    for fk in app_deps_obj:
+        keys.setdefault(os.path.basename(fk), []).append(fk)
+    return keys
 
-# Load todo - optional, if file missing, use commits as-is
-todo_df = None
-if os.path.exists(todo_path):
-    try:
-        todo_df = read_any(todo_path)
-        logger.info("Loaded %d todo mappings from %s", len(todo_df), todo_path)
-    except Exception as e:
-        logger.warning("Could not load todo from %s: %s", todo_path, e)
-else:
-    logger.warning("Todo file not found: %s", todo_path)
-
-app_deps   = read_any(app_deps_path) if os.path.exists(app_deps_path) else {}
-logger.info("Loaded app dependencies: %d keys", len(app_deps))
-
-# ---------- 2) NORMALIZE HEADERS ----------
-commits_df = map_commits(map_columns_lower_strip(commits_df))
-if tests_df is not None:
-    tests_df   = map_tests(map_columns_lower_strip(tests_df))
-if todo_df is not None:
-    todo_df    = map_todo(map_columns_lower_strip(todo_df))
-
-logger.info("Commit cols: %s", list(commits_df.columns))
-if tests_df is not None:
-    logger.info("Test cols: %s", list(tests_df.columns))
-if todo_df is not None:
-    logger.info("Todo cols: %s", list(todo_df.columns))
-
-# ---------- 3) EXPLODE CHANGED FUNCTIONS ----------
-if 'changed_function' not in commits_df.columns:
-    logger.warning("⚠ No 'changed_function' column found — using empty values.")
-    commits_df['changed_function'] = None
-commits_df['changed_function_list'] = commits_df['changed_function'].apply(split_funcs_cell)
-commits_exploded = commits_df.explode('changed_function_list').copy()
-# Keep commits even when no functions were extracted. Normalize empty lists/strings to NA
-commits_exploded['changed_function_list'] = commits_exploded['changed_function_list'].replace({None: pd.NA, '': pd.NA})
-commits_exploded = commits_exploded.reset_index(drop=True)
-
-# ---------- 4) PREPARE TEST RESULTS ----------
-agg_tests = None
-if tests_df is not None:
-    tests_df['status_norm'] = tests_df['status'].astype(str).str.lower().str.strip()
-    tests_df['status_norm'] = tests_df['status_norm'].replace(
-        {'passed':'pass','failed':'fail','ok':'pass','error':'fail'}
-    )
-
-    timestamp_col = next((c for c in tests_df.columns if any(k in c.lower() for k in ['time','date'])), None)
-    if timestamp_col:
-        tests_df[timestamp_col] = pd.to_datetime(tests_df[timestamp_col], errors='coerce')
-
-    agg_counts = (tests_df.groupby('test_case_id', dropna=False)
-                  .agg(total_no_of_Passed=('status_norm', lambda s: (s=='pass').sum()),
-                       total_no_of_Failed=('status_norm', lambda s: (s=='fail').sum()))
-                  .reset_index())
-
-    def choose_test_name(group):
-        vals = group['test_name'].dropna()
-        if vals.empty: return pd.NA
-        mode = vals.mode()
-        return mode.iloc[0] if not mode.empty else vals.iloc[-1]
-
-    # names = tests_df.groupby('test_case_id', dropna=False).apply(choose_test_name, include_groups=False).reset_index()
-    # names.columns = ['test_case_id','test_name']
-    # agg_tests = agg_counts.merge(names, on='test_case_id', how='left')
-
-    names = (
-    tests_df.groupby('test_case_id', dropna=False)
-    .apply(lambda g: choose_test_name(g), include_groups=False)
-    .reset_index(name='test_name')
-)
-
-    agg_tests = agg_counts.merge(names, on='test_case_id', how='left')
-
-    if timestamp_col:
-        last = (tests_df.sort_values(timestamp_col)
-                .groupby('test_case_id', dropna=False)
-                .last()
-                .reset_index())
-        last_small = last[['test_case_id','status_norm',timestamp_col]].rename(
-            columns={'status_norm':'last_status', timestamp_col:'last_execution_date'})
-        agg_tests = agg_tests.merge(last_small, on='test_case_id', how='left')
-    logger.info("Aggregated %d test cases", len(agg_tests))
-else:
-    logger.warning("Tests not available; skipping test aggregation")
-
-# ---------- 5) JOIN COMMITS + TODO + TESTS ----------
-final = commits_exploded.copy()
-
-if todo_df is not None and agg_tests is not None:
-    mapped_todo = todo_df[['user_story_id','test_case_id']].dropna().drop_duplicates()
-    joined = final.merge(mapped_todo, on='user_story_id', how='left')
-    final = joined.merge(agg_tests, on='test_case_id', how='left')
-    logger.info("After join with todo+tests: %d rows", len(final))
-elif agg_tests is not None:
-    logger.warning("Todo not available; cannot join with tests")
-else:
-    logger.warning("Tests not available; report will only show commits")
-
-# ---------- 6) DEPENDENCY LOOKUP ----------
-def lookup_deps_by_file(file_changed, func_name, app_deps_obj):
+def lookup_deps_by_file(file_changed, func_name, app_deps_obj, basename_keys=None):
     # Normalize missing / pandas.NA values safely
     if pd.isna(func_name):
         return []
@@ -255,7 +163,11 @@ def lookup_deps_by_file(file_changed, func_name, app_deps_obj):
                 results.extend(fm[f.lower()])
 
         # Check by basename match
-        for fk, fm in app_deps_obj.items():
+        if basename_keys is not None:
+            candidates = ((fk, app_deps_obj[fk]) for fk in basename_keys.get(basename, ()))
+        else:
+            candidates = app_deps_obj.items()
+        for fk, fm in candidates:
             if os.path.basename(fk) == basename and isinstance(fm, dict):
                 if f in fm and isinstance(fm[f], list):
                     results.extend(fm[f])
@@ -271,115 +183,530 @@ def lookup_deps_by_file(file_changed, func_name, app_deps_obj):
     # Deduplicate while preserving order
     return list(dict.fromkeys(results))
 
-final['dependent_functions_list'] = final.apply(
-    lambda r: lookup_deps_by_file(r.get('file_changed',''), r.get('changed_function_list',''), app_deps),
-    axis=1,
-    result_type='reduce'
-)
-final['dependent_function'] = final['dependent_functions_list'].apply(lambda L: ", ".join(L) if isinstance(L, list) and L else pd.NA)
+def resolve_dependent_functions(df, app_deps_obj, basename_keys=None):
+    """
+    dependent_function column for df, resolving each distinct
+    (file_changed, changed_function_list) pair only once.
 
-# ---------- 7) FINALIZE ----------
-desired_cols = [
- 'user_story_id','commit_sha','author','file_changed','changed_function',
- 'dependent_function','language','test_case_id','test_name','total_no_of_Passed',
- 'total_no_of_Failed','last_status','last_execution_date'
-]
-for c in desired_cols:
-    if c not in final.columns: final[c] = pd.NA
-final['changed_function'] = final['changed_function_list']
-
-final_df = final[desired_cols].copy()
-final_df['last_execution_date'] = pd.to_datetime(final_df['last_execution_date'], errors='coerce')
-final_df['last_execution_date'] = final_df['last_execution_date'].dt.strftime("%Y-%m-%d %H:%M:%S")
-final_df['last_status'] = final_df['last_status'].astype(str).str.lower().replace(
-    {'nan': pd.NA, 'none': pd.NA, '': pd.NA, 'passed':'pass','failed':'fail','ok':'pass','error':'fail'}
-)
-
-# Replace missing test mappings/names/status with user-friendly placeholders
-final_df['test_case_id'] = final_df['test_case_id'].astype(object)
-final_df['test_name'] = final_df['test_name'].astype(object)
-final_df['last_status'] = final_df['last_status'].astype(object)
-
-final_df['test_case_id'] = final_df['test_case_id'].where(pd.notnull(final_df['test_case_id']), 'No Test Mapped')
-final_df['test_name'] = final_df['test_name'].where(pd.notnull(final_df['test_name']), 'No Test Name')
-final_df['last_status'] = final_df['last_status'].where(pd.notnull(final_df['last_status']), 'No Execution')
-
-# ---------- 8) SAVE ----------
-# df_with_status = final_df[final_df['last_status'].notna()].copy()
-df_full = final_df.copy()
-
-# df_with_status.to_csv(output_status, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
-df_full.to_csv(output_path, index=False, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
-
-# logger.info("✅ Saved main report: %s  (%d rows)", output_path, len(df_with_status))
-logger.info("✅ Saved full report: %s  (%d rows)\n", output_status, len(df_full))
-
-def _to_native_int(v):
-    if v is None: return None
-    if isinstance(v, int): return v
-    if isinstance(v, float):
-        if math.isnan(v): return None
-        return int(v)
+    Exploded reports repeat the same pair on many rows (one per mapped test),
+    so the pairs are factorized to integer codes, looked up through the
+    basename index, and the joined strings are scattered back with one take().
+    """
+    if basename_keys is None:
+        basename_keys = build_basename_keys(app_deps_obj)
+    files = df['file_changed'] if 'file_changed' in df.columns else pd.Series('', index=df.index)
+    funcs = df['changed_function_list']
+
+    file_codes, file_uniques = pd.factorize(files, use_na_sentinel=False)
+    func_codes, func_uniques = pd.factorize(funcs, use_na_sentinel=False)
+    pair_codes = file_codes.astype(np.int64) * max(len(func_uniques), 1) + func_codes
+    unique_pairs, inverse = np.unique(pair_codes, return_inverse=True)
+
+    width = max(len(func_uniques), 1)
+    resolved = np.empty(len(unique_pairs), dtype=object)
+    for i, code in enumerate(unique_pairs.tolist()):
+        deps = lookup_deps_by_file(file_uniques[code // width], func_uniques[code % width], app_deps_obj, basename_keys)
+        resolved[i] = ", ".join(deps) if deps else pd.NA
+    logger.info("Resolved dependencies for %d distinct (file, function) pairs across %d rows", len(unique_pairs), len(df))
+    return pd.Series(resolved.take(inverse.reshape(-1)), index=df.index, dtype=object)
+
+# ---------- LOAD ----------
+def _read_optional(path, label):
+    """read_any(path), or None (with a warning) when the file is missing or unreadable."""
+    if not path or not os.path.exists(path):
+        logger.warning("%s file not found: %s", label, path)
+        return None
     try:
-        if isinstance(v, str) and v.strip() != "":
-            return int(float(v)) if '.' in v else int(v)
-    except Exception:
+        df = read_any(path)
+        logger.info("Loaded %d %s records from %s", len(df), label.lower(), path)
+        return df
+    except Exception as e:
+        logger.warning("Could not load %s from %s: %s", label.lower(), path, e)
         return None
-    return None
 
-def insert_regression_matrix(df):
-    conn = get_connection()
-    if conn is None:
-        logger.error("❌ Cannot insert — DB connection failed.")
-        return
-        return
-    df2 = df.copy().where(pd.notnull(df), None)
+def _test_columns(path):
+    """Header columns of a test results CSV that aggregation reads (id, name, status, time)."""
+    raw = csv_columns(path)
+    if not raw:
+        return None
+    mapped = list(map_tests(map_columns_lower_strip(pd.DataFrame(columns=raw))).columns)
+    timestamp_col = find_timestamp_column(mapped)
+    return [r for r, m in zip(raw, mapped) if m in ('test_case_id', 'test_name', 'status') or m == timestamp_col]
+
+def aggregate_test_results(path, state=None, cursor=None, chunksize=TESTS_CHUNK_ROWS):
+    """
+    Stream a test results CSV into per-test_case_id running aggregates,
+    chunksize rows at a time, so memory grows with the number of test cases
+    rather than with the length of the history. Only rows after cursor are
+    read (all rows when None). Returns (state, new cursor, touched test_case_ids).
+    """
+    state = state or ResultsAggregateState()
+    chunks, cursor = read_appended_csv(path, cursor, chunksize=chunksize, usecols=_test_columns(path))
+    touched = set()
+    for chunk in chunks:
+        if len(chunk.columns):
+            touched |= state.update(map_tests(map_columns_lower_strip(chunk)))
+    return state, cursor, touched
+
+def _aggregate_optional(path, chunksize):
+    """aggregate_test_results(path).to_frame(), or None (with a warning) when missing or unreadable."""
+    if not path or not os.path.exists(path):
+        logger.warning("Test file not found: %s", path)
+        return None
+    try:
+        state, _, _ = aggregate_test_results(path, chunksize=chunksize)
+        logger.info("Aggregated %d test records into %d test cases from %s", state.rows, len(state.cases), path)
+        return state.to_frame()
+    except Exception as e:
+        logger.warning("Could not aggregate tests from %s: %s", path, e)
+        return None
+
+def load_inputs(conf):
+    """
+    Read the configured inputs: {'commits', 'tests', 'agg_tests', 'todo', 'deps'}.
+    CSV test results are streamed straight into 'agg_tests' ('tests' is None);
+    other formats are loaded whole into 'tests'.
+    """
+    # Partitioned output of batch_harvest.py; when set it replaces output_file as the commit source
+    commits_source = conf.get('batch_output_dir') or conf.get('output_file')
+    commits_df = read_commits(commits_source, conf.get('report_repos'))
+    logger.info("Loaded %d commits from %s", len(commits_df), commits_source)
+
+    # Tests and todo are optional: without them the report only shows commits
+    tests_path, tests_df, agg_tests = conf.get('tests_path'), None, None
+    if tests_path and tests_path.lower().endswith(".csv"):
+        agg_tests = _aggregate_optional(tests_path, conf.get('tests_chunk_rows', TESTS_CHUNK_ROWS))
+    else:
+        tests_df = _read_optional(tests_path, "Test")
+    todo_df = _read_optional(conf.get('todo_path'), "Todo")
+
+    # Prefers the memory-mapped .depgraph artifact next to app_deps_path, falls back to JSON
+    app_deps_path = conf.get('app_deps_path')
+    app_deps = load_dependencies(app_deps_path) if app_deps_path else {}
+    logger.info("Loaded app dependencies: %d keys", len(app_deps))
+    return {'commits': commits_df, 'tests': tests_df, 'agg_tests': agg_tests, 'todo': todo_df, 'deps': app_deps}
+
+
+# ---------- BUILD ----------
+def explode_changed_functions(commits_df):
+    """One row per (commit file, changed function); rows without functions are kept with NA."""
+    commits_df = commits_df.copy()
+    if 'changed_function' not in commits_df.columns:
+        logger.warning("⚠ No 'changed_function' column found — using empty values.")
+        commits_df['changed_function'] = None
+    commits_df['changed_function_list'] = commits_df['changed_function'].apply(split_funcs_cell)
+    commits_exploded = commits_df.explode('changed_function_list').copy()
+    # Keep commits even when no functions were extracted. Normalize empty lists/strings to NA
+    commits_exploded['changed_function_list'] = commits_exploded['changed_function_list'].replace({None: pd.NA, '': pd.NA})
+    return commits_exploded.reset_index(drop=True)
+
+def finalize_report(final):
+    """Select REPORT_COLUMNS and apply the output formatting and placeholders."""
+    for c in REPORT_COLUMNS:
+        if c not in final.columns: final[c] = pd.NA
+    final['changed_function'] = final['changed_function_list']
+
+    return format_test_columns(final[REPORT_COLUMNS].copy())
+
+def format_test_columns(final_df):
+    """Output formatting and placeholders for the test columns of report rows (in place)."""
+    final_df['last_execution_date'] = pd.to_datetime(final_df['last_execution_date'], errors='coerce')
+    final_df['last_execution_date'] = final_df['last_execution_date'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    final_df['last_status'] = final_df['last_status'].astype(str).str.lower().replace(
+        {'nan': pd.NA, 'none': pd.NA, '': pd.NA, 'passed':'pass','failed':'fail','ok':'pass','error':'fail'}
+    )
+
+    # Replace missing test mappings/names/status with user-friendly placeholders
+    final_df['test_case_id'] = final_df['test_case_id'].astype(object)
+    final_df['test_name'] = final_df['test_name'].astype(object)
+    final_df['last_status'] = final_df['last_status'].astype(object)
 
-    query = """
+    final_df['test_case_id'] = final_df['test_case_id'].where(pd.notnull(final_df['test_case_id']), 'No Test Mapped')
+    final_df['test_name'] = final_df['test_name'].where(pd.notnull(final_df['test_name']), 'No Test Name')
+    final_df['last_status'] = final_df['last_status'].where(pd.notnull(final_df['last_status']), 'No Execution')
+    return final_df
+
+def build_report(commits, tests=None, todo=None, deps=None, agg_tests=None):
+    """
+    Build the regression-matrix DataFrame (REPORT_COLUMNS) from in-memory inputs.
+
+    commits:   commit report rows (userstory_commit_report.csv layout)
+    tests:     test result rows, or None to skip test aggregation
+    todo:      user story -> test case mapping, or None
+    deps:      {file: {function: [deps]}} mapping (dict or DependencyArtifact), or None
+    agg_tests: precomputed aggregate_tests() table, used instead of tests
+    The input frames are not modified.
+    """
+    deps = deps if deps is not None else {}
+
+    # ---------- NORMALIZE HEADERS ----------
+    commits_df = map_commits(map_columns_lower_strip(commits))
+    tests_df = map_tests(map_columns_lower_strip(tests)) if tests is not None else None
+    todo_df = map_todo(map_columns_lower_strip(todo)) if todo is not None else None
+
+    logger.info("Commit cols: %s", list(commits_df.columns))
+    if tests_df is not None:
+        logger.info("Test cols: %s", list(tests_df.columns))
+    if todo_df is not None:
+        logger.info("Todo cols: %s", list(todo_df.columns))
+
+    # ---------- EXPLODE CHANGED FUNCTIONS ----------
+    commits_exploded = explode_changed_functions(commits_df)
+
+    # ---------- PREPARE TEST RESULTS ----------
+    if agg_tests is not None:
+        logger.info("Using %d precomputed test aggregates", len(agg_tests))
+    elif tests_df is not None:
+        agg_tests = aggregate_tests(tests_df)
+        logger.info("Aggregated %d test cases", len(agg_tests))
+    else:
+        logger.warning("Tests not available; skipping test aggregation")
+
+    # ---------- JOIN COMMITS + TODO + TESTS ----------
+    final = commits_exploded.copy()
+
+    if todo_df is not None and agg_tests is not None:
+        mapped_todo = todo_df[['user_story_id','test_case_id']].dropna().drop_duplicates()
+        joined = final.merge(mapped_todo, on='user_story_id', how='left')
+        final = joined.merge(agg_tests, on='test_case_id', how='left')
+        logger.info("After join with todo+tests: %d rows", len(final))
+    elif agg_tests is not None:
+        logger.warning("Todo not available; cannot join with tests")
+    else:
+        logger.warning("Tests not available; report will only show commits")
+
+    # ---------- DEPENDENCY LOOKUP ----------
+    final['dependent_function'] = resolve_dependent_functions(final, deps, build_basename_keys(deps))
+
+    # ---------- FINALIZE ----------
+    return finalize_report(final)
+
+
+# ---------- SAVE ----------
+def save_report(final_df, path, parquet=False):
+    write_table(final_df, path, parquet=parquet, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
+    logger.info("✅ Saved full report: %s  (%d rows)\n", path, len(final_df))
+
+
+REGRESSION_MATRIX_COLUMNS = [
+    'user_story_id', 'commit_sha', 'author', 'file_changed', 'changed_function',
+    'dependent_function', 'test_case_id', 'test_name', 'total_no_of_Passed',
+    'total_no_of_Failed', 'last_status', 'last_execution_date'
+]
+_COPY_NULL = r'\N'
+
+_STAGE_DDL = """
+    CREATE TEMP TABLE regression_matrix_stage (
+        row_no BIGINT, user_story_id TEXT, commit_sha TEXT, author TEXT, file_changed TEXT,
+        changed_function TEXT, dependent_function TEXT, test_case_id TEXT, test_name TEXT,
+        total_no_of_Passed INT, total_no_of_Failed INT, last_status TEXT, last_execution_date TIMESTAMP
+    ) ON COMMIT DROP
+"""
+_COPY_SQL = "COPY regression_matrix_stage FROM STDIN WITH (FORMAT csv, NULL '%s')" % _COPY_NULL
+_INSERT_STAGE_SQL = "INSERT INTO regression_matrix_stage VALUES %s"
+
+# One statement for the whole batch, keyed on the natural key of model/migrations.py
+# (same COALESCE expressions as its index). Within a batch the last row per key wins;
+# existing rows are updated and new ones inserted. Works on the partitioned layout
+# too, where a unique index (and so ON CONFLICT) is not available.
+_KEY_MATCH = """
+        m.user_story_id = s.user_story_id
+        AND COALESCE(m.commit_sha, '') = COALESCE(s.commit_sha, '')
+        AND COALESCE(m.file_changed, '') = COALESCE(s.file_changed, '')
+        AND COALESCE(m.changed_function, '') = COALESCE(s.changed_function, '')
+        AND COALESCE(m.test_case_id, '') = COALESCE(s.test_case_id, '')"""
+_MERGE_SQL = """
+    WITH staged AS (
+        SELECT * FROM (
+            SELECT *, row_number() OVER (
+                PARTITION BY user_story_id, COALESCE(commit_sha, ''), COALESCE(file_changed, ''),
+                             COALESCE(changed_function, ''), COALESCE(test_case_id, '')
+                ORDER BY row_no DESC) AS latest
+            FROM regression_matrix_stage
+        ) ranked
+        WHERE latest = 1
+    ), updated AS (
+        UPDATE regression_matrix m SET
+            author = s.author,
+            dependent_function = s.dependent_function,
+            test_name = s.test_name,
+            total_no_of_Passed = s.total_no_of_Passed,
+            total_no_of_Failed = s.total_no_of_Failed,
+            last_status = s.last_status,
+            last_execution_date = s.last_execution_date
+        FROM staged s
+        WHERE %(key)s
+        RETURNING 1
+    ), inserted AS (
         INSERT INTO regression_matrix (
             user_story_id, commit_sha, author, file_changed, changed_function,
             dependent_function, test_case_id, test_name, total_no_of_Passed,
             total_no_of_Failed, last_status, last_execution_date
-        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        ON CONFLICT (changed_function) DO UPDATE SET
-            dependent_function = EXCLUDED.dependent_function,
-            test_case_id = EXCLUDED.test_case_id,
-            test_name = EXCLUDED.test_name,
-            total_no_of_Passed = EXCLUDED.total_no_of_Passed,
-            total_no_of_Failed = EXCLUDED.total_no_of_Failed,
-            last_status = EXCLUDED.last_status,
-            last_execution_date = EXCLUDED.last_execution_date;
+        )
+        SELECT user_story_id, commit_sha, author, file_changed, changed_function,
+               dependent_function, test_case_id, test_name, total_no_of_Passed,
+               total_no_of_Failed, last_status, last_execution_date
+        FROM staged s
+        WHERE NOT EXISTS (SELECT 1 FROM regression_matrix m WHERE %(key)s)
+        ORDER BY row_no
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM inserted), (SELECT count(*) FROM updated)
+""" % {'key': _KEY_MATCH}
+
+def regression_matrix_rows(df):
     """
-    cur = None
+    Report rows as regression_matrix values (row_no + REGRESSION_MATRIX_COLUMNS):
+    text columns as str, counts as nullable ints. Rows without a
+    user_story_id (NOT NULL in the table) are dropped.
+    """
+    out = df.reindex(columns=REGRESSION_MATRIX_COLUMNS).copy()
+    for c in REGRESSION_MATRIX_COLUMNS:
+        if c in ('total_no_of_Passed', 'total_no_of_Failed'):
+            out[c] = pd.to_numeric(out[c], errors='coerce').astype('Int64')
+        else:
+            out[c] = out[c].astype(object).where(out[c].notna(), None).map(lambda v: v if v is None else str(v))
+    out.insert(0, 'row_no', np.arange(len(out), dtype=np.int64))
+    return out[out['user_story_id'].notna()]
+
+def _stage_rows(cur, rows, method, page_size):
+    """Load rows into regression_matrix_stage; returns the method that was used."""
+    if method == "copy":
+        buf = io.StringIO()
+        rows.to_csv(buf, header=False, index=False, na_rep=_COPY_NULL)
+        buf.seek(0)
+        cur.execute("SAVEPOINT stage_copy")
+        try:
+            cur.copy_expert(_COPY_SQL, buf)
+            return "COPY"
+        except psycopg2.Error as e:
+            # e.g. COPY blocked by a pooler or proxy: keep the transaction, stage in batches instead
+            cur.execute("ROLLBACK TO SAVEPOINT stage_copy")
+            logger.warning("COPY into staging failed (%s); falling back to execute_values", e)
+    values = rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+    execute_values(cur, _INSERT_STAGE_SQL, values, page_size=page_size)
+    return "execute_values"
+
+def insert_regression_matrix(df, conn=None, method="copy", page_size=5000):
+    """
+    Upsert report rows into regression_matrix in one transaction: rows are
+    staged in a temp table (COPY FROM STDIN, or batched execute_values when
+    method="values" or COPY fails) and merged with a single statement on
+    the natural key from model/migrations.py, which must have been applied.
+    On failure everything is rolled back and the
+    error re-raised. Without conn, a pooled connection from
+    model.db_connection.connection() is used. Returns the number of rows
+    inserted or updated.
+    """
+    if conn is None:
+        with connection() as conn:
+            return insert_regression_matrix(df, conn, method, page_size)
+    rows = regression_matrix_rows(df)
+    if len(rows) < len(df):
+        logger.warning("Skipping %d report rows without user_story_id", len(df) - len(rows))
+
+    started = time.perf_counter()
     try:
-        cur = conn.cursor()
-        inserted, failed = 0, 0
-        for _, row in df2.iterrows():
-            try:
-                data = [
-                    row.get('user_story_id'),
-                    row.get('commit_sha'),
-                    row.get('author'),
-                    row.get('file_changed'),
-                    row.get('changed_function'),
-                    row.get('dependent_function'),
-                    row.get('test_case_id'),
-                    row.get('test_name'),
-                    _to_native_int(row.get('total_no_of_Passed')),
-                    _to_native_int(row.get('total_no_of_Failed')),
-                    None if pd.isna(row.get('last_status')) else str(row.get('last_status')),
-                    None if pd.isna(row.get('last_execution_date')) else str(row.get('last_execution_date'))
-                ]
-                cur.execute(query, data)
-                inserted += 1
-            except Exception as row_e:
-                failed += 1
+        with conn.cursor() as cur:
+            cur.execute(_STAGE_DDL)
+            staged_by = _stage_rows(cur, rows, method, page_size)
+            cur.execute(_MERGE_SQL)
+            inserted, updated = cur.fetchone()
+        conn.commit()
     except Exception as e:
         conn.rollback()
-        logger.exception("❌ Insert aborted: %s", e)
-    finally:
-        if cur: cur.close()
-        conn.close()
+        logger.exception("❌ regression_matrix load rolled back: %s", e)
+        raise
+    elapsed = time.perf_counter() - started
+    logger.info("✅ regression_matrix: %d rows staged via %s, %d inserted, %d updated in %.2fs (%.0f rows/sec)",
+                len(rows), staged_by, inserted, updated, elapsed, len(rows) / elapsed if elapsed else 0)
+    return inserted + updated
+
+
+def load_regression_matrix(df, conf):
+    """
+    Upsert report rows into regression_matrix when "load_regression_matrix"
+    is set. The report file is already written, so a failed load is logged
+    and the build goes on; returns the rows loaded, or None.
+    """
+    if not conf.get('load_regression_matrix') or df is None or not len(df):
+        return None
+    try:
+        return insert_regression_matrix(df, page_size=int(conf.get('db_load_page_size', 5000)))
+    except Exception as e:
+        logger.error("❌ regression_matrix not updated (report file is): %s", e)
+        return None
+
+
+def _commit_sources(conf):
+    """CSV files the commit rows come from (one file, or the selected partitions)."""
+    if conf.get('batch_output_dir'):
+        return [path for _, path in list_partitions(conf['batch_output_dir'], conf.get('report_repos'))]
+    return [conf.get('output_file')]
+
+def _apply_test_aggregates(report_df, agg_tests, test_case_ids):
+    """Refresh the test columns of report rows whose test_case_id is in test_case_ids."""
+    mask = report_df['test_case_id'].isin([t for t in test_case_ids if t is not None])
+    if not mask.any():
+        return report_df
+    cols = ['test_name', 'total_no_of_Passed', 'total_no_of_Failed', 'last_status', 'last_execution_date']
+    rows = report_df.loc[mask, ['test_case_id']].merge(agg_tests, on='test_case_id', how='left')
+    for c in cols:
+        if c not in rows.columns: rows[c] = pd.NA
+    rows = format_test_columns(rows)
+    report_df = report_df.astype({c: object for c in cols})
+    report_df.loc[mask, cols] = rows[cols].to_numpy()
+    logger.info("Refreshed test results on %d existing report rows", int(mask.sum()))
+    return report_df
+
+def run_report_incremental(conf, output_path=None, rebuild=False):
+    """
+    Refresh the report from what changed since the last run: commit and test
+    rows appended to their CSVs since the saved cursors, plus the running
+    per-test aggregates. Existing rows are kept; rows of touched test cases get
+    new test columns, and dependent functions are re-resolved if the
+    dependency map changed. Falls back to a full build when an input was
+    rewritten, the todo mapping changed, or there is no previous state.
+    """
+    output_path = output_path or conf.get('output_path')
+    state_path = report_state_path_for(output_path)
+    state = None if rebuild else load_report_state(state_path)
+    commit_files = _commit_sources(conf)
+    tests_path = conf.get('tests_path')
+    todo_path = conf.get('todo_path')
+    app_deps_path = conf.get('app_deps_path')
+    deps_signature = None
+    if app_deps_path:
+        deps_signature = file_signature(dependencies_source(app_deps_path))
+
+    if state is not None:
+        reasons = []
+        if not os.path.exists(output_path): reasons.append("no previous report")
+        if sorted(state['commits']) != sorted(commit_files) or \
+                not all(cursor_valid(p, state['commits'][p]) for p in commit_files):
+            reasons.append("commit report rewritten")
+        if state.get('tests_path') != tests_path or \
+                (state.get('tests') and not cursor_valid(tests_path, state['tests'])):
+            reasons.append("test results rewritten")
+        if state.get('todo') != file_signature(todo_path): reasons.append("todo mapping changed")
+        if reasons:
+            logger.info("Full report rebuild: %s", ", ".join(reasons))
+            state = None
+
+    # ---------- DELTAS ----------
+    commit_cursors, frames = {}, []
+    for path in commit_files:
+        df, commit_cursors[path] = read_appended_csv(path, state['commits'].get(path) if state else None)
+        frames.append(df)
+    new_commits = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=FIELDNAMES, dtype=str)
+
+    tests_state = ResultsAggregateState.from_dict(state['tests_state']) if state else ResultsAggregateState()
+    tests_cursor, touched = (state or {}).get('tests'), set()
+    if tests_path and os.path.exists(tests_path) and tests_path.lower().endswith(".csv"):
+        tests_state, tests_cursor, touched = aggregate_test_results(
+            tests_path, tests_state, tests_cursor, conf.get('tests_chunk_rows', TESTS_CHUNK_ROWS))
+    elif tests_path and os.path.exists(tests_path):
+        logger.warning("Incremental mode needs CSV test results; aggregating %s in full", tests_path)
+        tests_state = ResultsAggregateState()
+        touched = tests_state.update(map_tests(map_columns_lower_strip(read_any(tests_path))))
+    logger.info("Incremental report: %d new commit rows, %d test cases touched", len(new_commits), len(touched))
+
+    todo_df = _read_optional(todo_path, "Todo")
+    app_deps = load_dependencies(app_deps_path) if app_deps_path else {}
+    agg_tests = tests_state.to_frame() if tests_state.cases else None
+
+    # ---------- MERGE WITH THE PREVIOUS REPORT ----------
+    new_rows = None
+    if len(new_commits) or state is None:
+        new_rows = build_report(new_commits, todo=todo_df, deps=app_deps, agg_tests=agg_tests)
+
+    deps_changed = state is not None and state.get('deps') != deps_signature
+    changed_rows = new_rows  # rows to upsert into regression_matrix
+    if state is None:
+        save_report(new_rows, output_path, conf.get('parquet_outputs', False))
+    elif touched or deps_changed:
+        report_df = read_table(output_path, dtype=str, keep_default_na=False, na_values=[""])
+        for c in ('total_no_of_Passed', 'total_no_of_Failed'):
+            report_df[c] = pd.to_numeric(report_df[c])
+        if touched and agg_tests is not None:
+            report_df = _apply_test_aggregates(report_df, agg_tests, touched)
+        if deps_changed:
+            report_df['dependent_function'] = resolve_dependent_functions(
+                report_df.assign(changed_function_list=report_df['changed_function']), app_deps)
+        if deps_changed:
+            changed_rows = report_df  # dependent_function may differ on any row
+        else:
+            changed_rows = report_df[report_df['test_case_id'].isin([t for t in touched if t is not None])]
+            if new_rows is not None:
+                changed_rows = pd.concat([changed_rows, new_rows], ignore_index=True)
+        if new_rows is not None:
+            report_df = pd.concat([report_df, new_rows], ignore_index=True)
+        save_report(report_df, output_path, conf.get('parquet_outputs', False))
+    elif new_rows is not None and len(new_rows):
+        # Only new commits: append their rows
+        append_table(new_rows, output_path, encoding='utf-8', quoting=csv.QUOTE_MINIMAL)
+        logger.info("✅ Appended %d rows to report: %s", len(new_rows), output_path)
+    else:
+        logger.info("Report is up to date: %s", output_path)
+    load_regression_matrix(changed_rows, conf)
+
+    save_report_state(state_path, {
+        'commits': commit_cursors,
+        'tests_path': tests_path,
+        'tests': tests_cursor,
+        'tests_state': tests_state.to_dict(),
+        'todo': file_signature(todo_path),
+        'deps': deps_signature,
+    })
+    return new_rows
+
+def run_report(conf, output_path=None):
+    """Load the configured inputs, build the report and write it; returns the DataFrame."""
+    output_path = output_path or conf.get('output_path')
+    inputs = load_inputs(conf)
+    final_df = build_report(inputs['commits'], inputs['tests'], inputs['todo'], inputs['deps'],
+                            agg_tests=inputs['agg_tests'])
+    save_report(final_df, output_path, conf.get('parquet_outputs', False))
+    load_regression_matrix(final_df, conf)
+    return final_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the user story / commit / test regression report")
+    parser.add_argument("--output_path", default=None, help="Report CSV to write (default: config output_path)")
+    parser.add_argument("--commits", default=None, help="Commit report CSV or partition directory (default: config)")
+    parser.add_argument("--repos", default=None, help="Comma-separated owner/name partitions to include")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fold in commits and test runs appended since the last build")
+    args = parser.parse_args(argv)
+
+    # load centralized config and logging
+    try:
+        import config_loader as cfg
+        cfg.setup_logging()
+        conf = cfg.load_config()
+    except Exception:
+        conf = {}
+    conf = dict(conf)
+    if args.commits:
+        conf['output_file'], conf['batch_output_dir'] = args.commits, None
+    if args.repos:
+        conf['report_repos'] = [r.strip() for r in args.repos.split(",") if r.strip()]
+
+    output_path = args.output_path or conf.get('output_path')
+    if not conf.get('output_file') and not conf.get('batch_output_dir'):
+        logging.error("output_file is not configured. Please set output_file in config_loader or _conf.")
+        sys.exit(1)
+    if not output_path:
+        logging.error("output_path is not configured. Please set output_path in config_loader or _conf.")
+        sys.exit(1)
+
+    if args.incremental or conf.get('report_incremental'):
+        run_report_incremental(conf, output_path)
+    else:
+        run_report(conf, output_path)
+    print(output_path)
+
 
-# insert_regression_matrix(df_with_status)
-print(output_path)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
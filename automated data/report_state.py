@@ -0,0 +1,161 @@
+"""
+State for incremental report builds (report.py --incremental).
+
+Append-only inputs (the commit report, test_results.csv) are tracked with a
+byte cursor: the offset read up to, plus hashes of the header and of the bytes
+just before the offset. A run reads only what was appended after the cursor;
+if a file was rewritten or truncated, the cursor no longer validates and the
+caller falls back to a full rebuild.
+"""
+import io
+import os
+import json
+import hashlib
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+_CHECK_BYTES = 4096
+
+
+def report_state_path_for(output_path):
+    """final_report.csv -> final_report.state.json"""
+    return os.path.splitext(output_path)[0] + ".state.json"
+
+
+def load_report_state(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read report state %s: %s; rebuilding", path, e)
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def save_report_state(path, state):
+    """Write the state atomically (tmp file + rename)."""
+    state = dict(state, version=STATE_VERSION)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def file_signature(path):
+    """[mtime_ns, size] of a file (or of a .depgraph artifact's meta.json), None if missing."""
+    if not path:
+        return None
+    if os.path.isdir(path):
+        path = os.path.join(path, "meta.json")
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def _cursor_for(f, header, offset):
+    f.seek(max(len(header), offset - _CHECK_BYTES))
+    return {"offset": offset, "header": _sha1(header), "check": _sha1(f.read(offset - f.tell()))}
+
+
+def cursor_valid(path, cursor):
+    """True if path still starts with everything the cursor has already read."""
+    if not cursor or not os.path.exists(path) or os.path.getsize(path) < cursor["offset"]:
+        return False
+    with open(path, "rb") as f:
+        header = f.readline()
+        return _cursor_for(f, header, cursor["offset"]) == cursor
+
+
+class _AppendedRange(io.RawIOBase):
+    """Readable view of header + file[start:end], so pandas can parse a byte range of a CSV."""
+
+    def __init__(self, f, header, start, end):
+        self._f = f
+        self._pending = header
+        self._remaining = end - start
+        f.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._pending:
+            n = min(len(buffer), len(self._pending))
+            buffer[:n] = self._pending[:n]
+            self._pending = self._pending[n:]
+            return n
+        n = min(len(buffer), self._remaining)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _last_line_end(f, start):
+    """Offset just past the last newline at or after start (start if there is none)."""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    while pos > start:
+        block = min(_CHECK_BYTES * 16, pos - start)
+        f.seek(pos - block)
+        idx = f.read(block).rfind(b"\n")
+        if idx >= 0:
+            return pos - block + idx + 1
+        pos -= block
+    return start
+
+
+def read_appended_csv(path, cursor=None, chunksize=None, usecols=None):
+    """
+    Rows appended to a CSV since cursor (all rows when cursor is None), read
+    as strings like report.read_any. Returns (rows, new cursor), where rows
+    is a DataFrame, or an iterator of DataFrames of chunksize rows when
+    chunksize is set (the file stays open until it is exhausted). A trailing
+    partial line is left for the next run.
+    """
+    f = open(path, "rb")
+    try:
+        header = f.readline()
+        start = cursor["offset"] if cursor else f.tell()
+        end = _last_line_end(f, start)
+        new_cursor = _cursor_for(f, header, end) if end > start else (cursor or _cursor_for(f, header, start))
+    except Exception:
+        f.close()
+        raise
+    if not header.strip():
+        f.close()
+        empty = pd.DataFrame(dtype=str)
+        return (iter([empty]) if chunksize else empty), new_cursor
+
+    reader = io.BufferedReader(_AppendedRange(f, header, start, end))
+    kwargs = dict(dtype=str, on_bad_lines="skip", usecols=usecols)
+    if not chunksize:
+        with f:
+            return pd.read_csv(reader, **kwargs), new_cursor
+
+    def chunks():
+        with f:
+            yield from pd.read_csv(reader, chunksize=chunksize, **kwargs)
+    return chunks(), new_cursor
+
+
+def csv_columns(path):
+    """Header columns of a CSV file ([] when it is empty)."""
+    try:
+        return list(pd.read_csv(path, nrows=0, dtype=str).columns)
+    except pd.errors.EmptyDataError:
+        return []
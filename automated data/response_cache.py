@@ -0,0 +1,80 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of GitHub API response bodies, stored in SQLite.
+
+    Immutable entries (e.g. /commits/{sha}) are served without a request;
+    the rest keep their ETag so the client can revalidate with If-None-Match.
+    Total body size is capped at max_bytes; the least recently used entries
+    are evicted first. Safe to share between the client's worker threads.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                immutable INTEGER,
+                body BLOB,
+                size INTEGER,
+                accessed REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url):
+        """(etag, immutable, body) for url, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT etag, immutable, body FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url))
+            self.conn.commit()
+        return row[0], bool(row[1]), bytes(row[2])
+
+    def put(self, url, body, etag=None, immutable=False):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                              (url, etag, int(immutable), sqlite3.Binary(body), size, time.time()))
+            self.total_bytes += size - (old[0] if old else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is under 90% of its cap."""
+        target = self.max_bytes * 0.9
+        evicted = 0
+        rows = self.conn.execute("SELECT url, size FROM responses ORDER BY accessed").fetchall()
+        for url, size in rows:
+            if self.total_bytes <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self.total_bytes -= size
+            evicted += 1
+        logger.info("🧹 Evicted %d cached GitHub responses (%.1f MB kept)", evicted, self.total_bytes / 1e6)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,179 @@
+"""
+Per-test-case aggregation of test_results.csv for report.py (step 4).
+
+Vectorized replacement for the lambda / groupby().apply() version. Test case
+ids, statuses and names are factorized once, so everything after that works on
+integer codes: pass and fail counts are boolean sums (bincount), the test name
+is the most frequent one via value_counts (ties go to the smallest name, like
+Series.mode), and the last status comes from an idxmax over the time column
+instead of re-sorting the whole frame.
+"""
+import numpy as np
+import pandas as pd
+
+STATUS_ALIASES = {'passed': 'pass', 'failed': 'fail', 'ok': 'pass', 'error': 'fail'}
+
+
+def normalize_status(status):
+    """pass/fail/... labels from a raw status column."""
+    return status.astype(str).str.lower().str.strip().replace(STATUS_ALIASES)
+
+
+def find_timestamp_column(columns):
+    """First column whose name mentions time or date, or None."""
+    return next((c for c in columns if any(k in c.lower() for k in ['time', 'date'])), None)
+
+
+def aggregate_tests(tests_df):
+    """
+    One row per test_case_id (sorted, NaN ids last) with total_no_of_Passed,
+    total_no_of_Failed, test_name and, when tests_df has a time/date column,
+    last_status and last_execution_date.
+
+    Adds status_norm to tests_df and parses its time column in place.
+    """
+    # Normalise each distinct status once instead of every row
+    status_codes, status_uniques = pd.factorize(tests_df['status'], use_na_sentinel=False)
+    status_norm = normalize_status(pd.Series(status_uniques, dtype=object)).to_numpy(dtype=object)
+    tests_df['status_norm'] = status_norm[status_codes]
+    timestamp_col = find_timestamp_column(tests_df.columns)
+    if timestamp_col:
+        tests_df[timestamp_col] = pd.to_datetime(tests_df[timestamp_col], errors='coerce')
+
+    # Sorted codes with NaN last, the same group order as groupby(dropna=False)
+    id_codes, id_uniques = pd.factorize(tests_df['test_case_id'], sort=True, use_na_sentinel=False)
+    n_ids = len(id_uniques)
+    agg_tests = pd.DataFrame({
+        'total_no_of_Passed': np.bincount(id_codes, weights=(status_norm == 'pass')[status_codes], minlength=n_ids),
+        'total_no_of_Failed': np.bincount(id_codes, weights=(status_norm == 'fail')[status_codes], minlength=n_ids),
+    }, index=pd.Index(id_uniques, name='test_case_id')).astype('int64')
+
+    # Most frequent name per test case; sorted name codes make ties resolve to the smallest name
+    name_codes, name_uniques = pd.factorize(tests_df['test_name'], sort=True)
+    named = name_codes >= 0
+    pairs = pd.Series(id_codes[named].astype(np.int64) * max(len(name_uniques), 1) + name_codes[named])
+    counts = pairs.value_counts(sort=False)
+    pair_ids, pair_names = np.divmod(counts.index.to_numpy(), max(len(name_uniques), 1))
+    best = np.lexsort((pair_names, -counts.to_numpy(), pair_ids))
+    first = np.ones(len(best), dtype=bool)
+    first[1:] = pair_ids[best][1:] != pair_ids[best][:-1]
+    test_names = np.full(n_ids, pd.NA, dtype=object)
+    test_names[pair_ids[best][first]] = name_uniques.to_numpy(dtype=object)[pair_names[best][first]]
+    agg_tests['test_name'] = test_names
+
+    if timestamp_col:
+        # The last row in time order: unparseable times sort after every valid one, and
+        # ties go to the later row, so idxmax runs over the reversed frame
+        times = tests_df[timestamp_col]
+        order_key = pd.DatetimeIndex(times).asi8.copy()
+        order_key[times.isna().to_numpy()] = np.iinfo(np.int64).max
+        last_rows = pd.Series(order_key[::-1]).groupby(id_codes[::-1]).idxmax()
+        last_rows = len(order_key) - 1 - last_rows.reindex(range(n_ids)).to_numpy()
+        agg_tests['last_status'] = tests_df['status_norm'].to_numpy()[last_rows]
+        agg_tests['last_execution_date'] = (pd.Series(times.to_numpy()).groupby(id_codes).max()
+                                            .reindex(range(n_ids)).to_numpy())
+
+    return agg_tests.reset_index()
+
+
+class ResultsAggregateState:
+    """
+    Running per-test_case_id aggregates that test rows can be folded into in
+    batches (new runs, file chunks) and that round-trip through JSON, so a
+    report can be refreshed without re-reading the whole results history.
+    to_frame() returns the same table as aggregate_tests over all rows seen.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.timestamp_col = None  # None until the first batch, "" when the results have no time column
+        self.cases = {}            # test_case_id (None for missing) -> running aggregate
+
+    def update(self, tests_df):
+        """Fold in rows that follow every row seen so far; returns the touched test_case_ids."""
+        if self.timestamp_col is None:
+            self.timestamp_col = find_timestamp_column(tests_df.columns) or ""
+        if not len(tests_df):
+            return set()
+
+        status_codes, status_uniques = pd.factorize(tests_df['status'], use_na_sentinel=False)
+        status_norm = normalize_status(pd.Series(status_uniques, dtype=object)).to_numpy(dtype=object)
+        row_status = status_norm[status_codes]
+        id_codes, id_uniques = pd.factorize(tests_df['test_case_id'], use_na_sentinel=False)
+        n_ids = len(id_uniques)
+        passed = np.bincount(id_codes, weights=(status_norm == 'pass')[status_codes], minlength=n_ids)
+        failed = np.bincount(id_codes, weights=(status_norm == 'fail')[status_codes], minlength=n_ids)
+
+        if self.timestamp_col:
+            times = pd.to_datetime(tests_df[self.timestamp_col], errors='coerce')
+            order_key = pd.DatetimeIndex(times).asi8.copy()
+            order_key[times.isna().to_numpy()] = np.iinfo(np.int64).max
+            last_rows = pd.Series(order_key[::-1]).groupby(id_codes[::-1]).idxmax()
+            last_rows = (len(order_key) - 1 - last_rows.reindex(range(n_ids))).to_numpy()
+            max_times = pd.Series(times.to_numpy()).groupby(id_codes).max().reindex(range(n_ids))
+
+        touched = set()
+        keys = [None if pd.isna(v) else v for v in id_uniques]
+        for i, key in enumerate(keys):
+            case = self.cases.get(key)
+            if case is None:
+                case = self.cases[key] = {'passed': 0, 'failed': 0, 'names': {}, 'last_key': None,
+                                          'last_pos': None, 'last_status': None, 'max_time': None}
+            case['passed'] += int(passed[i])
+            case['failed'] += int(failed[i])
+            if self.timestamp_col:
+                pos = int(last_rows[i])
+                candidate = (int(order_key[pos]), self.rows + pos)
+                if case['last_key'] is None or candidate >= (case['last_key'], case['last_pos']):
+                    case['last_key'], case['last_pos'] = candidate
+                    case['last_status'] = row_status[pos]
+                if pd.notna(max_times.iloc[i]):
+                    t = int(pd.Timestamp(max_times.iloc[i]).value)
+                    case['max_time'] = t if case['max_time'] is None else max(case['max_time'], t)
+            touched.add(key)
+
+        name_codes, name_uniques = pd.factorize(tests_df['test_name'])
+        named = name_codes >= 0
+        width = max(len(name_uniques), 1)
+        pair_counts = pd.Series(id_codes[named].astype(np.int64) * width + name_codes[named]).value_counts(sort=False)
+        for pair, count in zip(pair_counts.index.tolist(), pair_counts.tolist()):
+            names = self.cases[keys[pair // width]]['names']
+            name = name_uniques[pair % width]
+            names[name] = names.get(name, 0) + count
+
+        self.rows += len(tests_df)
+        return touched
+
+    def to_frame(self):
+        """The aggregate_tests table for every row folded in so far."""
+        keys = sorted(k for k in self.cases if k is not None)
+        if None in self.cases:
+            keys.append(None)
+        cases = [self.cases[k] for k in keys]
+        frame = pd.DataFrame({
+            'test_case_id': pd.Series([np.nan if k is None else k for k in keys], dtype=object),
+            'total_no_of_Passed': pd.Series([c['passed'] for c in cases], dtype='int64'),
+            'total_no_of_Failed': pd.Series([c['failed'] for c in cases], dtype='int64'),
+            # Most frequent name; ties resolve to the smallest name
+            'test_name': pd.Series([min(c['names'].items(), key=lambda kv: (-kv[1], kv[0]))[0] if c['names'] else pd.NA
+                                    for c in cases], dtype=object),
+        })
+        if self.timestamp_col:
+            frame['last_status'] = pd.Series([c['last_status'] for c in cases], dtype=object)
+            # Epoch ns kept as int64 (NaT's value for missing): a float64 round trip drops the low digits
+            nat = np.iinfo(np.int64).min
+            frame['last_execution_date'] = pd.Series(np.array([nat if c['max_time'] is None else c['max_time']
+                                                               for c in cases], dtype=np.int64).view('datetime64[ns]'))
+        return frame
+
+    def to_dict(self):
+        return {'rows': self.rows, 'timestamp_col': self.timestamp_col,
+                'cases': [[k, c] for k, c in self.cases.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.rows = data.get('rows', 0)
+        state.timestamp_col = data.get('timestamp_col')
+        state.cases = {k: c for k, c in data.get('cases', [])}
+        return state
@@ -0,0 +1,356 @@
+"""
+Tree-sitter parsers and dependency-graph extraction for the 9 supported languages.
+
+Importing this module has no side effects (no config, no output), so
+automated_pipeline.py and diff_functions.py can both use it, and the scan's
+process-pool workers (scan_chunk) import nothing else.
+"""
+import logging
+from tree_sitter import Language, Parser
+
+logger = logging.getLogger(__name__)
+
+# === LANGUAGE DETECTION ===
+LANGUAGE_MAP = {
+    '.py': 'python',
+    '.java': 'java',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+    '.jsx': 'javascript',
+    '.cs': 'csharp',
+    '.go': 'go',
+    '.php': 'php',
+    '.cpp': 'cpp',
+    '.cc': 'cpp',
+    '.cxx': 'cpp',
+    '.c': 'c',
+}
+
+# === LANGUAGE PARSERS ===
+PARSERS = {}
+
+def get_parser(language):
+    """Lazy-load Tree-sitter parser for given language."""
+    if language in PARSERS:
+        return PARSERS[language]
+    
+    try:
+        lang = None
+        if language == 'python':
+            import tree_sitter_python as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'java':
+            import tree_sitter_java as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'javascript':
+            import tree_sitter_javascript as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'typescript':
+            import tree_sitter_typescript as ts_lang
+            # TypeScript has language_typescript function
+            lang = Language(ts_lang.language_typescript())
+        elif language == 'csharp':
+            import tree_sitter_c_sharp as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'go':
+            import tree_sitter_go as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'php':
+            import tree_sitter_php as ts_lang
+            # PHP has language_php function
+            lang = Language(ts_lang.language_php())
+        elif language == 'cpp':
+            import tree_sitter_cpp as ts_lang
+            lang = Language(ts_lang.language())
+        elif language == 'c':
+            import tree_sitter_c as ts_lang
+            lang = Language(ts_lang.language())
+        else:
+            logger.warning("⚠️ Unsupported language: %s", language)
+            return None
+        
+        if lang is None:
+            logger.warning("⚠️ Failed to load language for: %s", language)
+            return None
+            
+        parser = Parser(lang)
+        PARSERS[language] = parser
+        logger.info("✅ Loaded parser for %s", language)
+        return parser
+    except (ImportError, AttributeError) as e:
+        logger.warning("⚠️ Tree-sitter parser not available for %s: %s", language, e)
+        return None
+
+
+
+def get_node_text(node, code_bytes):
+    """Extract text content for any Tree-sitter node."""
+    return code_bytes[node.start_byte:node.end_byte].decode("utf8", errors="ignore")
+
+
+# Function call node types vary by language
+CALL_NODE_TYPES = {
+    'python': 'call',
+    'java': 'method_invocation',
+    'javascript': 'call_expression',
+    'typescript': 'call_expression',
+    'csharp': 'invocation_expression',
+    'go': 'call_expression',
+    'php': 'object_creation_expression',  # or method call
+    'cpp': 'call_expression',
+    'c': 'call_expression',
+}
+
+# Function definition node types vary by language
+DEF_NODE_TYPES = {
+    'python': 'function_definition',
+    'java': 'method_declaration',
+    'javascript': 'function_declaration',
+    'typescript': 'function_declaration',
+    'csharp': 'method_declaration',
+    'go': 'function_declaration',
+    'php': 'function_declaration',
+    'cpp': 'function_definition',
+    'c': 'function_definition',
+}
+
+
+def get_call_name(node, code_bytes, language):
+    """Return the called function name for a call node, or None."""
+    try:
+        # Extract function name based on language specifics
+        func_name = None
+        if language == 'python':
+            func_node = node.child_by_field_name("function")
+            if func_node:
+                func_name = get_node_text(func_node, code_bytes).strip()
+        elif language == 'java':
+            # method_invocation: object.method()
+            for child in node.children:
+                if child.type == 'identifier':
+                    func_name = get_node_text(child, code_bytes).strip()
+                    break
+        elif language in ('javascript', 'typescript', 'cpp', 'c', 'go'):
+            # call_expression: func()
+            func_node = node.child_by_field_name("function")
+            if func_node:
+                func_name = get_node_text(func_node, code_bytes).strip()
+        elif language == 'csharp':
+            # invocation_expression
+            for child in node.children:
+                if child.type in ('identifier', 'member_access_expression'):
+                    func_name = get_node_text(child, code_bytes).strip()
+                    break
+        return func_name
+    except Exception as e:
+        logger.warning("⚠️ Error extracting call in %s: %s", language, e)
+        return None
+
+
+def get_def_name(node, code_bytes, language):
+    """Return the defined function name for a definition node, or None."""
+    try:
+        func_name = None
+        if language in ('python', 'javascript', 'typescript', 'go', 'php'):
+            name_node = node.child_by_field_name("name")
+            if name_node:
+                func_name = get_node_text(name_node, code_bytes).strip()
+        elif language == 'java':
+            # method_declaration: modifiers type name params body
+            for child in node.children:
+                if child.type == 'identifier':
+                    func_name = get_node_text(child, code_bytes).strip()
+                    break
+        elif language == 'csharp':
+            # method_declaration
+            for child in node.children:
+                if child.type == 'identifier':
+                    func_name = get_node_text(child, code_bytes).strip()
+                    break
+        elif language in ('cpp', 'c'):
+            # function_definition: decl body
+            decl = node.child_by_field_name("declarator")
+            if decl:
+                func_name = get_node_text(decl, code_bytes).strip()
+                # Remove type prefixes and trailing ( for C/C++
+                if '(' in func_name:
+                    func_name = func_name[:func_name.index('(')].strip()
+        return func_name
+    except Exception as e:
+        logger.warning("⚠️ Error extracting function def in %s: %s", language, e)
+        return None
+
+
+def extract_dependencies_generic(node, code_bytes, language, seen=None):
+    """
+    Recursively find all unique function call dependencies for any language.
+    - Deduplicates repeated calls
+    - Preserves order of first occurrence
+
+    Kept as the reference implementation; build_dependency_graph_generic uses
+    the single-pass walk_dependency_graph instead.
+    """
+    if seen is None:
+        seen = set()
+    deps = []
+
+    if node.type == CALL_NODE_TYPES.get(language, 'call'):
+        func_name = get_call_name(node, code_bytes, language)
+        if func_name and func_name not in seen:
+            seen.add(func_name)
+            deps.append(func_name)
+
+    # Recursively process children
+    for child in node.children:
+        deps.extend(extract_dependencies_generic(child, code_bytes, language, seen))
+
+    return deps
+
+
+def find_function_defs_generic(node, code_bytes, language):
+    """
+    Recursively find all function/method definitions for any language.
+    Returns list of (function_name, node) tuples.
+    """
+    functions = []
+
+    if node.type == DEF_NODE_TYPES.get(language, 'function_definition'):
+        func_name = get_def_name(node, code_bytes, language)
+        if func_name:
+            functions.append((func_name, node))
+
+    # Recursively process children
+    for child in node.children:
+        functions.extend(find_function_defs_generic(child, code_bytes, language))
+
+    return functions
+
+
+def walk_dependency_graph(root, code_bytes, language):
+    """
+    Build {function_name: [dependencies]} in a single pre-order pass.
+
+    Uses a TreeCursor instead of recursion, so deeply nested code cannot hit
+    the interpreter recursion limit, and every node is visited exactly once.
+    A call is credited to every enclosing definition, matching the per-function
+    subtree walk of extract_dependencies_generic.
+    """
+    call_type = CALL_NODE_TYPES.get(language, 'call')
+    def_type = DEF_NODE_TYPES.get(language, 'function_definition')
+    graph = {}
+    open_defs = []  # (depth, seen, deps) for definitions enclosing the cursor
+    cursor = root.walk()
+    depth = 0
+
+    while True:
+        # Leaving a definition's subtree closes it
+        while open_defs and open_defs[-1][0] >= depth:
+            open_defs.pop()
+
+        node = cursor.node
+        node_type = node.type
+        if node_type == call_type:
+            if open_defs:
+                func_name = get_call_name(node, code_bytes, language)
+                if func_name:
+                    for _, seen, deps in open_defs:
+                        if func_name not in seen:
+                            seen.add(func_name)
+                            deps.append(func_name)
+        elif node_type == def_type:
+            func_name = get_def_name(node, code_bytes, language)
+            if func_name:
+                deps = []
+                graph[func_name] = deps
+                open_defs.append((depth, set(), deps))
+
+        if cursor.goto_first_child():
+            depth += 1
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return graph
+            depth -= 1
+
+
+def function_spans(code, language):
+    """
+    Return [(start_line, end_line, function_name)] for every definition in code,
+    with 1-based inclusive line numbers (used to map diff hunks onto functions).
+    """
+    parser = get_parser(language)
+    if not parser:
+        return None
+    code_bytes = code if isinstance(code, bytes) else code.encode("utf8")
+    def_type = DEF_NODE_TYPES.get(language, 'function_definition')
+    spans = []
+    cursor = parser.parse(code_bytes).root_node.walk()
+    while True:
+        node = cursor.node
+        if node.type == def_type:
+            func_name = get_def_name(node, code_bytes, language)
+            if func_name:
+                spans.append((node.start_point[0] + 1, node.end_point[0] + 1, func_name))
+        if cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return spans
+
+
+def build_dependency_graph_generic(code, language):
+    """
+    Build dependency graph for code in any supported language.
+    Returns dict: {function_name: [dependencies]}
+    """
+    parser = get_parser(language)
+    if not parser:
+        logger.warning("⚠️ Parser unavailable for %s; skipping", language)
+        return {}
+
+    try:
+        code_bytes = bytes(code, "utf8")
+        tree = parser.parse(code_bytes)
+        return walk_dependency_graph(tree.root_node, code_bytes, language)
+    except Exception as e:
+        logger.exception("⚠️ Error building dependency graph for %s: %s", language, e)
+        return {}
+
+
+def build_dependency_graph_recursive(code, language):
+    """Reference two-pass recursive implementation (used for equivalence tests and benchmarks)."""
+    parser = get_parser(language)
+    if not parser:
+        return {}
+    code_bytes = bytes(code, "utf8")
+    root = parser.parse(code_bytes).root_node
+    graph = {}
+    for func_name, func_node in find_function_defs_generic(root, code_bytes, language):
+        graph[func_name] = extract_dependencies_generic(func_node, code_bytes, language)
+    return graph
+
+
+def parse_source_file(file_path, language):
+    """Read a source file and return its {function: [deps]} map."""
+    with open(file_path, "r", encoding="utf8", errors="ignore") as f:
+        code = f.read()
+    return build_dependency_graph_generic(code, language) or {}
+
+
+def scan_chunk(chunk):
+    """
+    Worker entry point for parallel scans (automated_pipeline.scan_dependencies).
+    Each worker process keeps its own PARSERS cache, so parsers are loaded
+    once per process rather than once per chunk.
+    Returns list of (file_path, deps) tuples; deps is None for skipped files.
+    """
+    language, file_list = chunk
+    results = []
+    for file_path in file_list:
+        try:
+            results.append((file_path, parse_source_file(file_path, language)))
+        except Exception as e:
+            logger.warning("⚠️ Skipping %s: %s", file_path, e)
+            results.append((file_path, None))
+    return results
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for model/async_feature_store.py against a migrated regression_matrix.
+Needs a throwaway PostgreSQL: set REGRESSION_TEST_DSN (see test_report.py).
+"""
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.async_feature_store import ASYNC_AVAILABLE, AsyncFeatureStore, LoopThread
+from model.feature_store import mappings_from_json, mappings_to_json
+from model.migrations import migrate
+
+TEST_DSN = os.environ.get("REGRESSION_TEST_DSN")
+pytestmark = [pytest.mark.skipif(not TEST_DSN, reason="REGRESSION_TEST_DSN is not set"),
+              pytest.mark.skipif(not ASYNC_AVAILABLE, reason="psycopg[pool] is not installed")]
+
+ROWS = [
+    ("US-1", "app.py", "create_task", "validate", "TC-1"),
+    ("US-1", "app.py", "delete_task", None, "TC-2"),
+    ("US-2", "app.py", "create_task", "save, validate", "TC-1"),
+    ("US-2", "README.md", None, None, "TC-3"),
+    ("US-2", "app.py", "delete_task", None, "No Test Mapped"),  # report.py placeholder
+]
+
+
+@pytest.fixture
+def schema():
+    import psycopg2
+
+    conn = psycopg2.connect(TEST_DSN)
+    name = "async_store_test_%d" % os.getpid()
+    with conn.cursor() as cur:
+        cur.execute("CREATE SCHEMA %s" % name)
+        cur.execute("SET search_path TO %s" % name)
+    migrate(conn)
+    with conn.cursor() as cur:
+        cur.executemany("INSERT INTO regression_matrix (user_story_id, file_changed, changed_function,"
+                        " dependent_function, test_case_id) VALUES (%s, %s, %s, %s, %s)", ROWS)
+    conn.commit()
+    try:
+        yield name
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA %s CASCADE" % name)
+        conn.commit()
+        conn.close()
+
+
+def _store(schema, **kwargs):
+    # client_encoding: psycopg 3 returns bytes from a SQL_ASCII server otherwise
+    return AsyncFeatureStore(TEST_DSN, options="-c search_path=%s" % schema, client_encoding="utf8", **kwargs)
+
+
+def test_concurrent_lookups_share_pool(schema):
+    async def scenario():
+        async with _store(schema, min_size=1, max_size=2) as store:
+            lookups = [store.tests_for_story("US-1"), store.tests_for_file("app.py"),
+                       store.tests_for_function("create_task"), store.dependents_for_function("create_task"),
+                       store.test_mappings(["TC-3"])]
+            first = await asyncio.gather(*lookups)
+            burst = await asyncio.gather(*(store.tests_for_story("US-%d" % (i % 3)) for i in range(60)))
+            return first, burst, store.stats()
+
+    first, burst, stats = asyncio.run(scenario())
+    assert first[:3] == [["TC-1", "TC-2"], ["TC-1", "TC-2"], ["TC-1"]]
+    assert sorted(first[3]) == ["save", "validate"]
+    assert first[4] == {"TC-3": {"user_stories": {"US-2"}, "files_functions": [("README.md", "")]}}
+    assert burst[:3] == [[], ["TC-1", "TC-2"], ["TC-1", "TC-3"]]
+    assert stats["pool_max"] == 2
+    # 5 distinct lookups, then only US-0 and US-2 were new in the burst
+    assert stats["requests_num"] == 7
+
+
+def test_loop_thread_runs_store_for_sync_callers(schema):
+    runner = LoopThread()
+    store = _store(schema, max_size=1)
+    try:
+        runner.run(store.open(), timeout=30)
+        assert runner.run(store.tests_for_story("US-2"), timeout=30) == ["TC-1", "TC-3"]
+        runner.run(store.close(), timeout=30)
+    finally:
+        runner.stop()
+
+
+def test_prediction_mappings_in_chunks(schema):
+    async def scenario():
+        async with _store(schema, max_size=2) as store:
+            return await store.test_mappings_chunked(["TC-3", "TC-1", "TC-9"], chunk_size=1)
+
+    mappings = asyncio.run(scenario())
+    assert mappings == {
+        "TC-1": {"user_stories": {"US-1", "US-2"}, "files_functions": [("app.py", "create_task")]},
+        "TC-3": {"user_stories": {"US-2"}, "files_functions": [("README.md", "")]},
+        "TC-9": {"user_stories": set(), "files_functions": []},
+    }
+    # What priority_prediction.py receives from the webhook's /lookup/mappings
+    assert mappings_from_json(json.loads(json.dumps(mappings_to_json(mappings)))) == mappings
+
+
+def test_open_gives_up_after_timeout():
+    store = AsyncFeatureStore("host=127.0.0.1 port=1 user=postgres connect_timeout=1")
+
+    async def scenario():
+        with pytest.raises(Exception):
+            await store.open(timeout=1)
+
+    asyncio.run(scenario())
+    assert store.pool is None
+
+
+def test_cancelled_caller_does_not_cancel_coalesced_lookup():
+    store = AsyncFeatureStore("")
+    queries = []
+
+    async def slow_query(sql, params):
+        queries.append(params)
+        await asyncio.sleep(0.05)
+        return [("TC-1",)]
+
+    store._query = slow_query
+
+    async def scenario():
+        first = asyncio.ensure_future(store.tests_for_story("US-1"))
+        second = asyncio.ensure_future(store.tests_for_story("US-1"))
+        await asyncio.sleep(0.01)
+        first.cancel()  # e.g. a Flask request that timed out in LoopThread.run
+        result = await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return result
+
+    assert asyncio.run(scenario()) == ["TC-1"]
+    assert len(queries) == 1
+    assert store.cache.lookup(("user_story_id", "US-1")) == ["TC-1"]
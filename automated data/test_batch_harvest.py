@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for batch_harvest.py: concurrent multi-repo harvesting into per-repo partitions
+"""
+import os
+import sys
+import csv
+import time
+import shutil
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from batch_harvest import parse_repos, harvest
+from commit_store import list_partitions, partition_path
+from github_client import GitHubClient, RequestBudget
+from test_git_local import _make_repo
+
+
+def test_parse_repos_normalises_and_dedupes():
+    repos = parse_repos(["acme/api", " acme/API ", "# comment", "bad", {"owner": "acme", "name": "web", "local_repo": "/src/web"}])
+    assert [(r["owner"], r["name"], r["local_repo"]) for r in repos] == [
+        ("acme", "API", None), ("acme", "web", "/src/web")]
+
+
+def test_harvest_writes_one_partition_per_repo():
+    repo_a, repo_b = _make_repo(), _make_repo()
+    out_dir = tempfile.mkdtemp()
+    try:
+        repos = parse_repos([{"owner": "acme", "name": "svc_a", "local_repo": repo_a},
+                             {"owner": "acme", "name": "svc_b", "local_repo": repo_b}])
+        failures = harvest(repos, out_dir, GitHubClient(), max_repos=2)
+        assert failures == {}
+
+        assert [repo for repo, _ in list_partitions(out_dir)] == ["acme/svc_a", "acme/svc_b"]
+        assert list_partitions(out_dir, ["ACME/svc_b"]) == [("acme/svc_b", partition_path(out_dir, "acme", "svc_b"))]
+        for _, path in list_partitions(out_dir):
+            with open(path, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            assert {r["UserStoryID"] for r in rows} == {"US-1", "US-2"}
+            assert os.path.exists(path.replace(".csv", ".sync.json"))
+    finally:
+        for d in (repo_a, repo_b, out_dir):
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def test_request_budget_blocks_when_exhausted():
+    budget = RequestBudget(per_hour=36000)  # one token every 0.1s
+    budget.tokens = 0
+    started = time.monotonic()
+    budget.acquire()
+    assert time.monotonic() - started >= 0.09
+    assert budget.waited > 0
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled connection manager in model/db_connection.py.
+Needs a throwaway PostgreSQL: set REGRESSION_TEST_DSN (see test_report.py).
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.db_connection import ConnectionPool, PoolTimeout
+
+TEST_DSN = os.environ.get("REGRESSION_TEST_DSN")
+pytestmark = pytest.mark.skipif(not TEST_DSN, reason="REGRESSION_TEST_DSN is not set")
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(2, 2, health_check_idle=0, dsn=TEST_DSN)
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS pool_test (v INT)")
+        cur.execute("TRUNCATE pool_test")
+    try:
+        yield pool
+    finally:
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DROP TABLE pool_test")
+        pool.closeall()
+
+
+def _count(pool):
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM pool_test")
+        return cur.fetchone()[0]
+
+
+def test_commit_and_rollback(pool):
+    with pool.connection() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO pool_test VALUES (1)")
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("INSERT INTO pool_test VALUES (2)")
+            1 / 0
+    assert _count(pool) == 1
+
+
+def test_bounded_checkout_waits_then_times_out(pool):
+    before = pool.stats()["checkouts"]
+    first, second = pool.getconn(), pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+
+    # A waiting checkout gets the connection as soon as one is returned
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn(timeout=5)))
+    waiter.start()
+    pool.putconn(first)
+    waiter.join()
+    pool.putconn(got[0])
+    pool.putconn(second)
+
+    stats = pool.stats()
+    assert stats["checkouts"] - before == 3 and stats["timeouts"] == 1 and stats["in_use"] == 0
+    assert stats["wait_ms_max"] > 0
+
+
+def test_dead_connection_is_replaced(pool):
+    victim, other = pool.getconn(), pool.getconn()
+    with victim.cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        pid = cur.fetchone()[0]
+    victim.commit()
+    # Kill the victim's backend from the other session while it sits idle in the pool
+    with other.cursor() as cur:
+        cur.execute("SELECT pg_terminate_backend(%s)", (pid,))
+    other.commit()
+    pool.putconn(other)
+    pool.putconn(victim)  # handed out next
+
+    assert _count(pool) == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_idle_time_does_not_outlive_its_connection():
+    # minconn=0: psycopg2 closes every returned connection, so each checkout opens a new one
+    pool = ConnectionPool(0, 1, health_check_idle=3600, dsn=TEST_DSN)
+    try:
+        for _ in range(3):
+            conn = pool.getconn()
+            pool.putconn(conn)
+            del conn
+        assert len(pool._idle_since) == 0 and len(pool._checked_out) == 0
+
+        kept = ConnectionPool(1, 1, health_check_idle=3600, dsn=TEST_DSN)
+        conn = kept.getconn()
+        kept.putconn(conn)
+        assert list(kept._idle_since) == [conn]
+        kept.closeall()
+    finally:
+        pool.closeall()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for the binary dependency artifact in dependency_artifact.py
+"""
+import os
+import sys
+import json
+import tempfile
+import shutil
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dependency_artifact import (DependencyArtifact, write_artifact, load_dependencies, artifact_path_for,
+                                 dependencies_source, remove_artifact)
+
+
+def test_artifact_round_trip_matches_json():
+    with open(os.path.join(PROJECT_ROOT, "app_dependencies.json"), "r", encoding="utf8") as f:
+        deps = json.load(f)
+    deps["empty.py"] = {}
+    deps["unicode_ß.py"] = {"grüß": ["naïve()", "grüß"]}
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(tmp_dir, "app_dependencies.json")
+        write_artifact(deps, artifact_path_for(json_path))
+
+        artifact = load_dependencies(json_path)
+        assert isinstance(artifact, DependencyArtifact)
+        assert list(artifact) == list(deps)
+        assert artifact["unicode_ß.py"] == deps["unicode_ß.py"]
+        assert "missing.py" not in artifact
+        assert json.dumps(artifact.to_dict()) == json.dumps(deps)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_newer_json_wins_over_stale_artifact():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(tmp_dir, "app_dependencies.json")
+        write_artifact({"old.py": {"f": []}}, artifact_path_for(json_path))
+        meta = os.path.join(artifact_path_for(json_path), "meta.json")
+        os.utime(meta, (1_000_000, 1_000_000))
+        with open(json_path, "w", encoding="utf8") as f:
+            json.dump({"new.py": {"g": ["h"]}}, f)
+
+        assert load_dependencies(json_path) == {"new.py": {"g": ["h"]}}
+        assert dependencies_source(json_path) == json_path
+
+        write_artifact({"new.py": {"g": ["h"]}}, artifact_path_for(json_path))
+        assert isinstance(load_dependencies(json_path), DependencyArtifact)
+        remove_artifact(json_path)
+        assert not os.path.exists(artifact_path_for(json_path))
+    finally:
+        shutil.rmtree(tmp_dir)
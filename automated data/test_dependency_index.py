@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the reverse call-graph index in dependency_index.py
+"""
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from dependency_index import ReverseDependencyIndex, short_name
+
+SAMPLE_DEPS = {
+    "app/service.py": {
+        "process_data": ["calculate_total", "self.format_result"],
+        "calculate_total": ["sum"],
+        "format_result": ["render"],
+        "render": ["process_data"],   # cycle back to process_data
+    },
+    "app/api.py": {
+        "handler": ["service.process_data"],
+        "route": ["handler"],
+    },
+}
+
+
+def test_short_name():
+    assert short_name("self.format_result") == "format_result"
+    assert short_name("Foo::bar") == "bar"
+    assert short_name("* processData") == "processData"
+
+
+def test_transitive_impact_with_cycle_and_depth():
+    index = ReverseDependencyIndex.build(SAMPLE_DEPS)
+
+    assert index.callers_of("calculate_total") == [("app/service.py", "process_data")]
+
+    impacted = index.impacted("calculate_total")
+    assert impacted == [
+        ("app/service.py", "process_data", 1),
+        ("app/service.py", "render", 2),
+        ("app/api.py", "handler", 2),
+        ("app/service.py", "format_result", 3),
+        ("app/api.py", "route", 3),
+    ]
+
+    assert index.impacted("calculate_total", max_depth=1) == [("app/service.py", "process_data", 1)]
+    assert index.impacted("unknown_function") == []
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for hunk-range function detection (diff_functions.py) and git_diff.py --function_mode hunks
+"""
+import os
+import sys
+import csv
+import shutil
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from diff_functions import changed_lines, changed_functions, FunctionSpanIndex
+from test_git_local import _git, _make_repo
+
+SOURCE = '''def outer():
+    x = 1
+
+    def inner():
+        return x
+
+    return inner()
+
+
+def other():
+    return 2
+'''
+
+
+def test_changed_lines_tracks_additions_and_deletions():
+    patch = "\n".join([
+        "@@ -1,3 +1,3 @@",
+        " def outer():",
+        "-    x = 0",
+        "+    x = 1",
+        " ",
+        "@@ -10,3 +10,2 @@ def other():",
+        " def other():",
+        "-    pass",
+        "     return 2",
+        "\\ No newline at end of file",
+    ])
+    assert changed_lines(patch) == [1, 2, 10]
+
+
+def test_span_index_returns_innermost_function():
+    index = FunctionSpanIndex([(1, 7, "outer"), (4, 5, "inner"), (10, 11, "other")])
+    assert [index.innermost(line) for line in (1, 4, 5, 6, 8, 11, 12)] == \
+        ["outer", "inner", "inner", "outer", None, "other", None]
+    assert index.functions_for_lines([2, 5, 6, 11]) == ["outer", "inner", "other"]
+
+
+def test_changed_functions_reports_edited_bodies():
+    patch = "@@ -4,2 +4,2 @@\n     def inner():\n-        return 0\n+        return x\n"
+    assert changed_functions(patch, SOURCE, "python") == ["inner"]
+    patch = "@@ -10,2 +10,2 @@\n def other():\n-    return 1\n+    return 2\n"
+    assert changed_functions(patch, SOURCE.encode("utf8"), "python") == ["other"]
+
+
+
+def test_hunk_mode_does_not_import_the_pipeline_script():
+    """automated_pipeline.py loads config (and may exit) at import; hunk mode must not pull it in"""
+    code = ("import sys, diff_functions; "
+            "diff_functions.changed_functions('@@ -1 +1 @@\\n+def f():\\n', 'def f():\\n    pass\\n', 'python'); "
+            "print('automated_pipeline' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_git_diff_hunk_mode_finds_modified_functions():
+    from git_diff import find_and_write_commits
+
+    repo = _make_repo()
+    try:
+        with open(os.path.join(repo, "backend", "app.py"), "w", encoding="utf8") as f:
+            f.write("def health():\n    return 'healthy'\n\ndef get_tasks():\n    return []\n")
+        _git(repo, "commit", "-q", "-am", "US-3: change health message")
+
+        output_file = os.path.join(repo, "out", "report.csv")
+        find_and_write_commits("US-3", output_file=output_file, local_repo=repo)
+        find_and_write_commits("US-3", output_file=output_file + ".hunks.csv", local_repo=repo, function_mode="hunks")
+        with open(output_file, newline="", encoding="utf-8") as f:
+            added = list(csv.DictReader(f))
+        with open(output_file + ".hunks.csv", newline="", encoding="utf-8") as f:
+            hunks = list(csv.DictReader(f))
+        # The regex mode only sees new definitions; hunk mode sees the edited body
+        assert [r["ChangedFunctions"] for r in added] == [""]
+        assert [r["ChangedFunctions"] for r in hunks] == ["health"]
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for model/feature_store.py against a migrated regression_matrix.
+Needs a throwaway PostgreSQL: set REGRESSION_TEST_DSN (see test_report.py).
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.feature_store import FeatureStore, LookupCache
+from model.migrations import migrate
+
+TEST_DSN = os.environ.get("REGRESSION_TEST_DSN")
+needs_db = pytest.mark.skipif(not TEST_DSN, reason="REGRESSION_TEST_DSN is not set")
+
+ROWS = [
+    ("US-1", "a" * 40, "app.py", "create_task", "validate", "TC-1", 3, 1),
+    ("US-1", "a" * 40, "app.py", "delete_task", None, "TC-2", 2, 0),
+    ("US-2", "b" * 40, "app.py", "create_task", "save, validate", "TC-1", 3, 1),
+    ("US-2", "b" * 40, "README.md", None, None, "TC-3", 0, 0),
+    ("US-3", "c" * 40, "app.py", "create_task", None, "No Test Mapped", 0, 0),  # report.py placeholder
+]
+
+
+@pytest.fixture
+def store():
+    import psycopg2
+
+    conn = psycopg2.connect(TEST_DSN)
+    schema = "feature_store_test_%d" % os.getpid()
+    with conn.cursor() as cur:
+        cur.execute("CREATE SCHEMA %s" % schema)
+        cur.execute("SET search_path TO %s" % schema)
+    migrate(conn)
+    with conn.cursor() as cur:
+        cur.executemany("INSERT INTO regression_matrix (user_story_id, commit_sha, file_changed, changed_function,"
+                        " dependent_function, test_case_id, total_no_of_passed, total_no_of_failed)"
+                        " VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", ROWS)
+    conn.commit()
+
+    @contextmanager
+    def connect():
+        yield conn
+
+    try:
+        yield FeatureStore(connect, batch_size=3)
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA %s CASCADE" % schema)
+        conn.commit()
+        conn.close()
+
+
+@needs_db
+def test_training_batches(store):
+    batches = list(store.iter_training_batches())
+    assert [len(b) for b in batches] == [3, 2]
+    data = store.training_frame()
+    assert list(data["test_case_id"]) == ["TC-1", "TC-2", "TC-1", "TC-3", "No Test Mapped"]
+    assert list(data["total_no_of_Passed"]) == [3, 2, 3, 0, 0]
+
+
+@needs_db
+def test_lookups(store):
+    assert store.tests_for_story("US-1") == ["TC-1", "TC-2"]
+    assert store.tests_for_file("app.py") == ["TC-1", "TC-2"]
+    assert store.tests_for_function("create_task") == ["TC-1"]
+    assert store.tests_for_story("US-3") == []  # only unmapped rows
+    assert sorted(store.dependents_for_function("create_task")) == ["save", "validate"]
+
+    mappings = store.test_mappings(["TC-1", "TC-3", "TC-9"])
+    assert mappings["TC-1"] == {"user_stories": {"US-1", "US-2"}, "files_functions": [("app.py", "create_task")]}
+    assert mappings["TC-3"] == {"user_stories": {"US-2"}, "files_functions": [("README.md", "")]}
+    assert mappings["TC-9"] == {"user_stories": set(), "files_functions": []}
+
+    hits = store.cache.hits
+    store.tests_for_story("US-1")
+    store.test_mappings(["TC-3", "TC-1", "TC-9"])
+    assert store.cache.hits == hits + 2
+
+
+def test_cache_evicts_and_expires():
+    cache = LookupCache(maxsize=2, ttl=60)
+    calls = []
+
+    def load(key):
+        return lambda: calls.append(key) or key
+
+    for key in ("a", "b", "a", "c", "b"):
+        cache.get(key, load(key))
+    assert calls == ["a", "b", "c", "b"]  # "b" was least recently used when "c" arrived
+
+    cache.ttl = 0
+    cache.get("c", load("c"))
+    assert calls[-1] == "c"
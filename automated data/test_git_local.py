@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the local git backend (git_local.py) used by git_diff.py
+"""
+import os
+import sys
+import csv
+import shutil
+import tempfile
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from git_local import iter_local_commits
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", repo, "-c", "user.name=Test Dev", "-c", "user.email=dev@example.com", *args],
+                   check=True, capture_output=True)
+
+
+def _make_repo():
+    repo = tempfile.mkdtemp()
+    _git(repo, "init", "-q")
+    os.makedirs(os.path.join(repo, "backend"))
+    with open(os.path.join(repo, "backend", "app.py"), "w", encoding="utf8") as f:
+        f.write("def health():\n    return 'ok'\n")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "US-1: add health endpoint")
+
+    with open(os.path.join(repo, "backend", "app.py"), "a", encoding="utf8") as f:
+        f.write("\ndef get_tasks():\n    return []\n")
+    with open(os.path.join(repo, "README.md"), "w", encoding="utf8") as f:
+        f.write("docs\n")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "US-2: list tasks\n\nLonger body line")
+    return repo
+
+
+def test_iter_local_commits_matches_api_shape():
+    repo = _make_repo()
+    try:
+        commits = list(iter_local_commits(repo))
+        assert [c["commit"]["message"] for c in commits] == ["US-2: list tasks\n\nLonger body line", "US-1: add health endpoint"]
+        assert commits[0]["commit"]["author"]["name"] == "Test Dev"
+        assert len(commits[0]["sha"]) == 40
+
+        files = {f["filename"]: f["patch"] for f in commits[0]["files"]}
+        assert set(files) == {"README.md", "backend/app.py"}
+        assert files["backend/app.py"].startswith("@@ ")
+        assert "+def get_tasks():" in files["backend/app.py"].splitlines()
+
+        assert len(list(iter_local_commits(repo, max_count=1))) == 1
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
+
+
+def _no_api_client(*args, **kwargs):
+    raise AssertionError("the local backend must not build a GitHub client (or its response cache)")
+
+
+def test_find_and_write_commits_local_backend(monkeypatch):
+    from git_diff import GitHubClient, find_and_write_commits
+
+    monkeypatch.setattr(GitHubClient, "from_config", _no_api_client)
+    repo = _make_repo()
+    try:
+        output_file = os.path.join(repo, "out", "report.csv")
+        find_and_write_commits("US-2", output_file=output_file, local_repo=repo)
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        py_rows = [r for r in rows if r["FileChanged"] == "backend/app.py"]
+        assert len(py_rows) == 1
+        assert py_rows[0]["ChangedFunctions"] == "get_tasks"
+        assert py_rows[0]["Language"] == "python"
+        assert {r["UserStoryID"] for r in rows} == {"US-2"}
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
+
+
+def test_full_sync_local_backend_needs_no_api_client(monkeypatch):
+    from git_dif_full import GitHubClient, find_and_write_commits
+
+    monkeypatch.setattr(GitHubClient, "from_config", _no_api_client)
+    repo = _make_repo()
+    try:
+        output_file = os.path.join(repo, "out", "report.csv")
+        find_and_write_commits("o", "r", output_file, local_repo=repo)
+        with open(output_file, newline="", encoding="utf-8") as f:
+            assert {r["UserStoryID"] for r in csv.DictReader(f)} == {"US-1", "US-2"}
+    finally:
+        shutil.rmtree(repo, ignore_errors=True)
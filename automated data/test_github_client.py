@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Tests for github_client.py against a local stub HTTP server that replays canned commit JSON.
+"""
+import os
+import sys
+import csv
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from github_client import GitHubClient
+from response_cache import ResponseCache
+
+SHAS = ["c%039d" % i for i in range(6)]
+
+COMMIT_LIST = [
+    {"sha": sha, "commit": {"author": {"name": "Dev"}, "message": f"US-{i % 2 + 1}: change {i}"}}
+    for i, sha in enumerate(SHAS)
+]
+
+COMMIT_DETAILS = {
+    sha: {
+        "sha": sha,
+        "files": [{
+            "filename": f"backend/module_{i}.py",
+            "patch": f"@@ -0,0 +1,2 @@\n+def handler_{i}():\n+    pass",
+        }],
+    }
+    for i, sha in enumerate(SHAS)
+}
+
+
+class StubGitHub(BaseHTTPRequestHandler):
+    """Serves /repos/o/r/commits (3 per page) and /repos/o/r/commits/{sha}."""
+    calls = []
+    not_modified = 0
+    throttled = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            StubGitHub.calls.append(url.path)
+        parts = url.path.strip("/").split("/")
+        if parts[:4] == ["repos", "o", "r", "commits"] and len(parts) == 4:
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            body = COMMIT_LIST[(page - 1) * 3:page * 3]
+            etag = '"%s"' % hashlib.md5(json.dumps(body).encode("utf8")).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                with self.lock:
+                    StubGitHub.not_modified += 1
+                return self._send(304, None, {"ETag": etag})
+            return self._send(200, body, {"ETag": etag})
+        if parts[:4] == ["repos", "o", "r", "commits"] and len(parts) == 5:
+            sha = parts[4]
+            with self.lock:
+                first_time = sha == SHAS[1] and sha not in StubGitHub.throttled
+                StubGitHub.throttled.add(sha)
+            if first_time:
+                # Secondary rate limit on the first request for this sha
+                return self._send(429, {"message": "rate limited"}, {"Retry-After": "0"})
+            return self._send(200, COMMIT_DETAILS[sha])
+        return self._send(404, {"message": "Not Found"})
+
+
+def _start_stub():
+    StubGitHub.calls = []
+    StubGitHub.not_modified = 0
+    StubGitHub.throttled = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_pages_and_concurrent_details_in_order_with_retry():
+    server, api_url = _start_stub()
+    try:
+        client = GitHubClient(api_url=api_url, max_workers=4)
+        pages = list(client.iter_commit_pages("o", "r", per_page=3))
+        assert [p for p, _ in pages] == [1, 2]
+
+        commits = [c for _, page in pages for c in page]
+        detailed = list(client.with_files("o", "r", commits))
+        assert [c["sha"] for c in detailed] == SHAS
+        assert all(c["files"] == COMMIT_DETAILS[c["sha"]]["files"] for c in detailed)
+        # 3 list pages + 6 details + 1 retry after the 429
+        assert len(StubGitHub.calls) == 10
+    finally:
+        server.shutdown()
+
+
+def test_git_diff_writes_rows_from_stub():
+    from git_diff import find_and_write_commits
+
+    server, api_url = _start_stub()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        output_file = os.path.join(tmp_dir, "report.csv")
+        find_and_write_commits("US-2", "o", "r", output_file, client=GitHubClient(api_url=api_url, max_workers=4))
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [r["CommitSHA"] for r in rows] == [SHAS[1], SHAS[3], SHAS[5]]
+        assert [r["ChangedFunctions"] for r in rows] == ["handler_1", "handler_3", "handler_5"]
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
+
+
+def test_full_sync_is_incremental_and_never_duplicates():
+    from git_dif_full import find_and_write_commits as sync_commits
+
+    server, api_url = _start_stub()
+    tmp_dir = tempfile.mkdtemp()
+    new_sha = "d%039d" % 0
+    try:
+        output_file = os.path.join(tmp_dir, "report.csv")
+        client = GitHubClient(api_url=api_url, max_workers=4)
+        sync_commits("o", "r", output_file, client=client)
+
+        # Nothing new: one list request, stops at the high-water mark, no detail fetches
+        StubGitHub.calls = []
+        sync_commits("o", "r", output_file, client=client)
+        assert StubGitHub.calls == ["/repos/o/r/commits"]
+
+        COMMIT_LIST.insert(0, {"sha": new_sha, "commit": {"author": {"name": "Dev"}, "message": "US-9: new"}})
+        COMMIT_DETAILS[new_sha] = {"sha": new_sha, "files": [{"filename": "backend/new.py", "patch": "+def fresh():"}]}
+        StubGitHub.calls = []
+        sync_commits("o", "r", output_file, client=client)
+        assert StubGitHub.calls.count(f"/repos/o/r/commits/{new_sha}") == 1
+        assert len([c for c in StubGitHub.calls if c.startswith("/repos/o/r/commits/")]) == 1
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert sorted(r["CommitSHA"] for r in rows) == sorted(SHAS + [new_sha])
+        with open(os.path.join(tmp_dir, "report.sync.json"), encoding="utf-8") as f:
+            assert json.load(f)["o/r"]["last_sha"] == new_sha
+    finally:
+        if COMMIT_LIST and COMMIT_LIST[0]["sha"] == new_sha:
+            COMMIT_LIST.pop(0)
+        COMMIT_DETAILS.pop(new_sha, None)
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
+
+
+def test_upsert_writer_replaces_changed_rows_and_drops_duplicates():
+    from commit_store import FIELDNAMES, UpsertCsvWriter
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "report.csv")
+        row = dict.fromkeys(FIELDNAMES, "")
+        row.update({"CommitSHA": "a1", "FileChanged": "x.py", "ChangedFunctions": "f"})
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows([row, row])  # legacy append-mode duplicate
+
+        with UpsertCsvWriter(path) as writer:
+            writer.writerow(dict(row, ChangedFunctions="f, g"))
+            writer.writerow(dict(row, FileChanged="y.py"))
+            writer.writerow(dict(row, FileChanged="y.py"))
+
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert [(r["FileChanged"], r["ChangedFunctions"]) for r in rows] == [("x.py", "f, g"), ("y.py", "f")]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+
+def test_upsert_writer_keeps_its_key_index_on_disk():
+    from commit_store import FIELDNAMES, UpsertCsvWriter
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "report.csv")
+        rows = [dict(dict.fromkeys(FIELDNAMES, ""), CommitSHA=f"s{i}", FileChanged="x.py") for i in range(3)]
+        with UpsertCsvWriter(path) as writer:
+            index_path = writer._index_path
+            assert os.path.exists(index_path)
+            for row in rows:
+                writer.writerow(row)
+            writer.writerow(dict(rows[1], ChangedFunctions="changed"))
+        assert not os.path.exists(index_path)
+        assert (writer.appended, writer.updated, writer.skipped) == (3, 1, 0)
+
+        with open(path, newline="", encoding="utf-8") as f:
+            assert [(r["CommitSHA"], r["ChangedFunctions"]) for r in csv.DictReader(f)] == \
+                [("s0", ""), ("s1", "changed"), ("s2", "")]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+def test_response_cache_skips_immutable_details_and_revalidates_lists():
+    server, api_url = _start_stub()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cache = ResponseCache(os.path.join(tmp_dir, "gh.cache.sqlite"))
+        first = GitHubClient(api_url=api_url, max_workers=4, cache=cache)
+        commits = [c for _, page in first.iter_commit_pages("o", "r", per_page=3) for c in page]
+        expected = list(first.with_files("o", "r", commits))
+
+        StubGitHub.calls = []
+        second = GitHubClient(api_url=api_url, max_workers=4, cache=cache)
+        commits = [c for _, page in second.iter_commit_pages("o", "r", per_page=3) for c in page]
+        assert list(second.with_files("o", "r", commits)) == expected
+        # Only the list pages hit the server, and all of them came back 304
+        assert StubGitHub.calls == ["/repos/o/r/commits"] * 3
+        assert StubGitHub.not_modified == 3 and second.not_modified == 3
+        assert second.cache_hits == len(SHAS)
+        cache.close()
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
+
+
+def test_response_cache_evicts_least_recently_used():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        cache = ResponseCache(os.path.join(tmp_dir, "gh.cache.sqlite"), max_bytes=100)
+        for name in ("a", "b", "c"):
+            cache.put(name, b"x" * 30, immutable=True)
+        assert cache.get("a") is not None  # a is now more recent than b
+        cache.put("d", b"x" * 30, immutable=True)
+        assert cache.get("b") is None
+        assert all(cache.get(name) is not None for name in ("a", "c", "d"))
+        assert cache.total_bytes == 90
+        cache.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_full_sync_resumes_from_last_written_page_after_crash():
+    from git_dif_full import find_and_write_commits as sync_commits
+
+    class CrashingClient(GitHubClient):
+        def get_commit(self, owner, repo, sha):
+            if sha == SHAS[4]:
+                raise ConnectionError("connection dropped")
+            return super().get_commit(owner, repo, sha)
+
+    server, api_url = _start_stub()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        output_file = os.path.join(tmp_dir, "report.csv")
+        state_file = os.path.join(tmp_dir, "report.sync.json")
+        try:
+            sync_commits("o", "r", output_file, client=CrashingClient(api_url=api_url, max_workers=2))
+        except ConnectionError:
+            pass
+        with open(state_file, encoding="utf-8") as f:
+            assert json.load(f)["o/r"]["pending"] == {"page": 2, "head_sha": SHAS[0]}
+
+        StubGitHub.calls = []
+        sync_commits("o", "r", output_file, client=GitHubClient(api_url=api_url, max_workers=2))
+        # Page 1 is not fetched again: pages 2 and 3 (empty), plus details for page 2 only
+        assert StubGitHub.calls.count("/repos/o/r/commits") == 2
+        assert sorted(c for c in StubGitHub.calls if c != "/repos/o/r/commits") == \
+            [f"/repos/o/r/commits/{sha}" for sha in SHAS[3:]]
+
+        with open(output_file, newline="", encoding="utf-8") as f:
+            assert sorted(r["CommitSHA"] for r in csv.DictReader(f)) == SHAS
+        with open(state_file, encoding="utf-8") as f:
+            assert json.load(f)["o/r"] == {"last_sha": SHAS[0]}
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
+
+
+def test_latest_on_first_run_does_not_set_high_water_mark():
+    from git_dif_full import find_and_write_commits as sync_commits
+
+    server, api_url = _start_stub()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        output_file = os.path.join(tmp_dir, "report.csv")
+        state_file = os.path.join(tmp_dir, "report.sync.json")
+        client = GitHubClient(api_url=api_url, max_workers=2)
+        sync_commits("o", "r", output_file, latest=4, client=client)
+        with open(state_file, encoding="utf-8") as f:
+            assert "o/r" not in json.load(f)
+
+        # The next run still reaches the older commits
+        sync_commits("o", "r", output_file, client=client)
+        with open(output_file, newline="", encoding="utf-8") as f:
+            assert sorted(r["CommitSHA"] for r in csv.DictReader(f)) == SHAS
+        with open(state_file, encoding="utf-8") as f:
+            assert json.load(f)["o/r"] == {"last_sha": SHAS[0]}
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for model/migrations.py on a legacy regression_matrix.
+Needs a throwaway PostgreSQL: set REGRESSION_TEST_DSN (see test_report.py).
+"""
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.db_connection import REGRESSION_MATRIX_DDL
+from model.migrations import migrate
+
+TEST_DSN = os.environ.get("REGRESSION_TEST_DSN")
+pytestmark = pytest.mark.skipif(not TEST_DSN, reason="REGRESSION_TEST_DSN is not set")
+
+LEGACY_ROWS = [
+    ("US-1", "a" * 40, "app.py", "create_task", "TC-1", "2024-01-15 10:00"),
+    ("US-1", "a" * 40, "README.md", None, "TC-2", "2024-02-01 09:00"),
+    ("US-1", "a" * 40, "README.md", None, "TC-2", "2024-03-01 09:00"),  # duplicate natural key
+    ("US-2", "b" * 40, "docs.md", None, "TC-3", None),
+]
+
+
+@pytest.fixture
+def legacy_db():
+    import psycopg2
+
+    conn = psycopg2.connect(TEST_DSN)
+    schema = "migrations_test_%d" % os.getpid()
+    with conn.cursor() as cur:
+        cur.execute("CREATE SCHEMA %s" % schema)
+        cur.execute("SET search_path TO %s" % schema)
+        cur.execute(REGRESSION_MATRIX_DDL)
+        cur.executemany("INSERT INTO regression_matrix (user_story_id, commit_sha, file_changed, changed_function,"
+                        " test_case_id, last_execution_date) VALUES (%s, %s, %s, %s, %s, %s)", LEGACY_ROWS)
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA %s CASCADE" % schema)
+        conn.commit()
+        conn.close()
+
+
+def _query(conn, sql):
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        return cur.fetchall()
+
+
+def test_migrates_legacy_table(legacy_db):
+    assert migrate(legacy_db) == [1, 2, 3, 5]
+    assert migrate(legacy_db) == []  # idempotent
+
+    indexes = {name for (name,) in _query(legacy_db, "SELECT indexname FROM pg_indexes WHERE tablename = 'regression_matrix'")}
+    assert {"regression_matrix_natural_key", "regression_matrix_test_case_idx",
+            "regression_matrix_user_story_idx", "regression_matrix_file_function_idx",
+            "regression_matrix_changed_function_idx"} <= indexes
+    assert "regression_matrix_changed_function_key" not in indexes
+    # The later duplicate of the README row survives
+    assert _query(legacy_db, "SELECT count(*), max(last_execution_date)::date::text FROM regression_matrix"
+                             " WHERE file_changed = 'README.md'") == [(1, "2024-03-01")]
+
+    # Several rows may now share a changed_function
+    with legacy_db.cursor() as cur:
+        cur.execute("INSERT INTO regression_matrix (user_story_id, commit_sha, changed_function, test_case_id)"
+                    " VALUES ('US-3', 'c', 'create_task', 'TC-1')")
+    legacy_db.commit()
+
+
+def test_partitions_by_month(legacy_db):
+    assert migrate(legacy_db, partition=True) == [1, 2, 3, 4, 5]
+    assert _query(legacy_db, "SELECT relkind::text FROM pg_class WHERE oid = 'regression_matrix'::regclass") == [("p",)]
+    placement = dict(_query(legacy_db, "SELECT test_case_id, tableoid::regclass::text FROM regression_matrix"))
+    assert placement["TC-1"].endswith("regression_matrix_2024_01")
+    assert placement["TC-2"].endswith("regression_matrix_2024_03")
+    assert placement["TC-3"].endswith("regression_matrix_default")
+    assert migrate(legacy_db, partition=True) == []
+
+
+def test_partitioning_later_keeps_indexes(legacy_db):
+    assert migrate(legacy_db) == [1, 2, 3, 5]
+    assert migrate(legacy_db, partition=True) == [4]
+    indexes = {name for (name,) in _query(legacy_db, "SELECT indexname FROM pg_indexes WHERE tablename = 'regression_matrix'")}
+    assert {"regression_matrix_natural_key", "regression_matrix_test_case_idx",
+            "regression_matrix_changed_function_idx"} <= indexes
+
+
+def test_new_partition_takes_rows_from_default(legacy_db):
+    migrate(legacy_db, partition=True)
+    # Older than the first partition: lands in the default partition
+    with legacy_db.cursor() as cur:
+        cur.execute("INSERT INTO regression_matrix (user_story_id, test_case_id, last_execution_date)"
+                    " VALUES ('US-0', 'TC-0', '2023-11-20 08:00')")
+        cur.execute("DELETE FROM regression_matrix WHERE test_case_id = 'TC-1'")  # 2023-11 becomes the minimum
+    legacy_db.commit()
+    assert migrate(legacy_db, partition=True) == []
+    placement = dict(_query(legacy_db, "SELECT test_case_id, tableoid::regclass::text FROM regression_matrix"))
+    assert placement["TC-0"].endswith("regression_matrix_2023_11")
+    assert placement["TC-3"].endswith("regression_matrix_default")
+    # ATTACH gave the moved partition the partitioned table's indexes
+    assert _query(legacy_db, "SELECT count(*) FROM pg_indexes WHERE tablename = 'regression_matrix_2023_11'")[0][0] >= 5
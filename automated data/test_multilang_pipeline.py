@@ -7,6 +7,7 @@ import sys
 import json
 import tempfile
 import shutil
+import subprocess
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
 if PROJECT_ROOT not in sys.path:
@@ -223,9 +224,8 @@ def test_multi_language_extraction():
     print("[TEST] MULTI-LANGUAGE DEPENDENCY EXTRACTION")
     print("=" * 80)
     
-    # Import the functions from automated_pipeline
-    sys.path.insert(0, os.path.join(PROJECT_ROOT, 'automated data'))
-    from automated_pipeline import build_dependency_graph_generic, LANGUAGE_MAP
+    # Import the functions from source_parsers
+    from source_parsers import build_dependency_graph_generic, LANGUAGE_MAP
     
     results = {}
     
@@ -286,5 +286,173 @@ def test_multi_language_extraction():
     return results
 
 
+def test_parallel_scan_matches_serial():
+    """Parallel scan output must be byte-identical to the serial scan"""
+    from automated_pipeline import scan_files_by_language, scan_dependencies
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for lang, sample in TEST_SAMPLES.items():
+            for i in range(5):
+                with open(os.path.join(tmp_dir, f"{lang}_{i}{sample['ext']}"), "w", encoding="utf8") as f:
+                    f.write(sample['code'])
+
+        files_by_lang = scan_files_by_language(tmp_dir)
+        serial, _, _ = scan_dependencies(files_by_lang, workers=1)
+        parallel, _, _ = scan_dependencies(files_by_lang, workers=2, chunk_size=3)
+
+        assert json.dumps(serial, indent=2, ensure_ascii=False) == json.dumps(parallel, indent=2, ensure_ascii=False)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_dependency_cache_reuses_unchanged_files():
+    """Warm scans are served from the cache; edits and deletions are picked up"""
+    from automated_pipeline import scan_files_by_language, scan_dependencies
+    from dependency_cache import DependencyCache
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        src_dir = os.path.join(tmp_dir, "src")
+        os.makedirs(src_dir)
+        for lang in ('python', 'java', 'go'):
+            with open(os.path.join(src_dir, lang + TEST_SAMPLES[lang]['ext']), "w", encoding="utf8") as f:
+                f.write(TEST_SAMPLES[lang]['code'])
+        cache_path = os.path.join(tmp_dir, "deps.cache.sqlite")
+
+        cache = DependencyCache(cache_path)
+        cold, _, _ = scan_dependencies(scan_files_by_language(src_dir), cache=cache)
+        cache.close()
+
+        cache = DependencyCache(cache_path)
+        warm, _, _ = scan_dependencies(scan_files_by_language(src_dir), cache=cache)
+        assert warm == cold
+        assert cache.hits == 3 and cache.misses == 0
+        cache.close()
+
+        py_file = os.path.join(src_dir, "python.py")
+        with open(py_file, "a", encoding="utf8") as f:
+            f.write("\ndef extra():\n    return process_data([1])\n")
+        os.remove(os.path.join(src_dir, "go.go"))
+
+        cache = DependencyCache(cache_path)
+        files_by_lang = scan_files_by_language(src_dir)
+        updated, _, _ = scan_dependencies(files_by_lang, cache=cache)
+        assert cache.misses == 1
+        assert updated[py_file]['extra'] == ['process_data']
+        assert cache.evict_missing([p for fl in files_by_lang.values() for p in fl], root=src_dir) == 1
+        cache.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_single_pass_matches_recursive():
+    """The cursor-based extractor must emit the same graph as the recursive reference"""
+    from source_parsers import build_dependency_graph_generic, build_dependency_graph_recursive
+
+    for lang, sample in TEST_SAMPLES.items():
+        code = sample['code'] * 3
+        new_graph = build_dependency_graph_generic(code, lang)
+        ref_graph = build_dependency_graph_recursive(code, lang)
+        assert list(new_graph.items()) == list(ref_graph.items()), lang
+
+    nested = '''
+def outer():
+    helper_a()
+    def inner():
+        helper_b()
+        helper_a()
+    inner()
+'''
+    assert build_dependency_graph_generic(nested, 'python') == build_dependency_graph_recursive(nested, 'python')
+
+
+def test_deeply_nested_code_does_not_recurse():
+    """Deeply nested generated code must not hit the Python recursion limit"""
+    from source_parsers import build_dependency_graph_generic
+
+    depth = sys.getrecursionlimit() * 2
+    code = "function f0() {\n" + "".join("if (x) {\n" for _ in range(depth)) + "g();\n" + "}\n" * depth + "}\n"
+    graph = build_dependency_graph_generic(code, 'javascript')
+    assert graph == {'f0': ['g']}
+
+
+def test_partial_rescan_patches_changed_files_only():
+    """Files listed by git_diff (repo-relative) are re-parsed and patched into the existing map"""
+    from automated_pipeline import scan_files_by_language, scan_dependencies, resolve_changed_paths, patch_dependencies
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        subprocess.run(["git", "init", "-q", tmp_dir], check=True)
+        src_dir = os.path.join(tmp_dir, "backend")
+        os.makedirs(os.path.join(src_dir, "node_modules"))
+        for lang in ('python', 'go'):
+            with open(os.path.join(src_dir, lang + TEST_SAMPLES[lang]['ext']), "w", encoding="utf8") as f:
+                f.write(TEST_SAMPLES[lang]['code'])
+        full, _, _ = scan_dependencies(scan_files_by_language(src_dir))
+
+        py_file = os.path.join(src_dir, "python.py")
+        with open(py_file, "w", encoding="utf8") as f:
+            f.write("def only_one():\n    helper()\n")
+        os.remove(os.path.join(src_dir, "go.go"))
+        new_file = os.path.join(src_dir, "new.py")
+        with open(new_file, "w", encoding="utf8") as f:
+            f.write("def fresh():\n    only_one()\n")
+
+        changed = resolve_changed_paths(
+            ["backend/python.py", "backend/go.go", "backend/new.py", "backend/README.md",
+             "backend/node_modules/x.js", "frontend/app.js"],
+            src_dir)
+        assert set(changed) == {os.path.normpath(p) for p in (py_file, new_file, os.path.join(src_dir, "go.go"))}
+
+        updated, removed = patch_dependencies(full, changed)
+        assert (updated, removed) == (2, 1)
+        assert full == dict(scan_dependencies(scan_files_by_language(src_dir))[0])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_partial_rescan_keys_new_files_like_full_scan(monkeypatch):
+    """With a relative project_path, files added by a partial rescan get the full scan's keys and order"""
+    from automated_pipeline import scan_files_by_language, scan_dependencies, resolve_changed_paths, patch_dependencies
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        monkeypatch.chdir(tmp_dir)
+        os.makedirs(os.path.join("proj", "pkg"))
+        for name in ("a.py", "c.go"):
+            with open(os.path.join("proj", name), "w", encoding="utf8") as f:
+                f.write(TEST_SAMPLES['python' if name.endswith('.py') else 'go']['code'])
+        full, _, _ = scan_dependencies(scan_files_by_language("proj"))
+
+        with open(os.path.join("proj", "pkg", "b.py"), "w", encoding="utf8") as f:
+            f.write("def fresh():\n    process_data([])\n")
+        changed = resolve_changed_paths([os.path.abspath(os.path.join("proj", "pkg", "b.py"))], "proj")
+
+        assert patch_dependencies(full, changed, base_path="proj") == (1, 0)
+        expected = scan_dependencies(scan_files_by_language("proj"))[0]
+        assert list(full.items()) == list(expected.items())
+        assert os.path.join("proj", "pkg", "b.py") in full
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_scan_workers_do_not_import_the_pipeline_script():
+    """Spawned scan workers unpickle scan_chunk; it must not drag in automated_pipeline's import-time config/exit"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "sample.py")
+        with open(path, "w", encoding="utf8") as f:
+            f.write(TEST_SAMPLES['python']['code'])
+        code = ("import sys, pickle, source_parsers; "
+                "worker = pickle.loads(pickle.dumps(source_parsers.scan_chunk)); "
+                "[(_, deps)] = worker(('python', [sys.argv[1]])); "
+                "print(sorted(deps), 'automated_pipeline' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code, path], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == "['calculate_total', 'format_result', 'process_data'] False"
+    finally:
+        shutil.rmtree(tmp_dir)
+
 if __name__ == "__main__":
     results = test_multi_language_extraction()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Tests for report.build_report with in-memory inputs (no config, no files)
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from report import (build_report, run_report, run_report_incremental, aggregate_test_results,
+                    insert_regression_matrix, REPORT_COLUMNS)
+from results_aggregation import aggregate_tests
+from table_io import PARQUET_AVAILABLE, parquet_path_for, parquet_is_current, read_table
+
+COMMITS = pd.DataFrame({
+    "UserStoryID": ["US-1", "US-2"],
+    "CommitSHA": ["a" * 40, "b" * 40],
+    "Author": ["Dev", "Dev"],
+    "Message": ["US-1: add", "US-2: docs"],
+    "FileChanged": ["backend/app.py", "README.md"],
+    "ChangedFunctions": ["create_task, list_tasks", ""],
+    "Language": ["python", "unknown"],
+})
+TESTS = pd.DataFrame({
+    "TestCaseID": ["TC-1", "TC-1", "TC-2"],
+    "TestName": ["test_create", "test_create", "test_list"],
+    "Status": ["passed", "failed", "ok"],
+    "Timestamp": ["2024-05-01 10:00:00", "2024-05-02 10:00:00", "2024-05-01 09:00:00"],
+})
+TODO = pd.DataFrame({"UserStoryID": ["US-1", "US-1"], "TestCaseID": ["TC-1", "TC-2"]})
+DEPS = {"src/backend/app.py": {"create_task": ["validate", "save"], "list_tasks": ["query"]}}
+
+
+def test_build_report_from_frames():
+    commits = COMMITS.copy()
+    report = build_report(commits, TESTS, TODO, DEPS)
+    assert list(report.columns) == REPORT_COLUMNS
+    pd.testing.assert_frame_equal(commits, COMMITS)  # inputs are not modified
+
+    rows = report[report["user_story_id"] == "US-1"].set_index(["changed_function", "test_case_id"])
+    assert len(rows) == 4
+    create = rows.loc[("create_task", "TC-1")]
+    assert create["dependent_function"] == "validate, save"
+    assert (create["total_no_of_Passed"], create["total_no_of_Failed"]) == (1, 1)
+    assert create["last_status"] == "fail"
+    assert create["last_execution_date"] == "2024-05-02 10:00:00"
+    assert rows.loc[("list_tasks", "TC-2"), "dependent_function"] == "query"
+
+    docs = report[report["user_story_id"] == "US-2"].iloc[0]
+    assert (docs["test_case_id"], docs["test_name"], docs["last_status"]) == ("No Test Mapped", "No Test Name", "No Execution")
+
+
+def test_build_report_commits_only():
+    report = build_report(COMMITS)
+    assert len(report) == 3
+    assert set(report["test_case_id"]) == {"No Test Mapped"}
+    assert report["dependent_function"].isna().all()
+
+
+def _write_inputs(tmp_dir, commits, tests):
+    conf = {
+        "output_file": os.path.join(tmp_dir, "commits.csv"),
+        "tests_path": os.path.join(tmp_dir, "test_results.csv"),
+        "todo_path": os.path.join(tmp_dir, "todo.csv"),
+        "app_deps_path": os.path.join(tmp_dir, "app_dependencies.json"),
+        "output_path": os.path.join(tmp_dir, "report.csv"),
+    }
+    commits.to_csv(conf["output_file"], index=False)
+    tests.to_csv(conf["tests_path"], index=False)
+    TODO.to_csv(conf["todo_path"], index=False)
+    with open(conf["app_deps_path"], "w", encoding="utf8") as f:
+        json.dump(DEPS, f)
+    return conf
+
+
+def _normalised(path):
+    df = pd.read_csv(path, dtype=str)
+    for col in ("total_no_of_Passed", "total_no_of_Failed"):
+        df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def test_incremental_report_matches_full_rebuild():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        conf = _write_inputs(tmp_dir, COMMITS.iloc[:1], TESTS.iloc[:2])
+        run_report_incremental(conf)
+        assert os.path.exists(os.path.join(tmp_dir, "report.state.json"))
+
+        # Append a commit and a test run, then refresh incrementally
+        COMMITS.iloc[1:].to_csv(conf["output_file"], mode="a", header=False, index=False)
+        TESTS.iloc[2:].to_csv(conf["tests_path"], mode="a", header=False, index=False)
+        new_rows = run_report_incremental(conf)
+        assert len(new_rows) == 1  # only the appended commit was built
+
+        incremental = _normalised(conf["output_path"])
+        run_report(conf, os.path.join(tmp_dir, "full.csv"))
+        pd.testing.assert_frame_equal(incremental, _normalised(os.path.join(tmp_dir, "full.csv")))
+        tc2 = incremental[incremental["test_case_id"] == "TC-2"].iloc[0]
+        assert (tc2["total_no_of_Passed"], tc2["last_status"]) == (1, "pass")
+
+        # A rewritten commit report no longer matches the cursor: full rebuild
+        COMMITS.iloc[::-1].to_csv(conf["output_file"], index=False)
+        run_report_incremental(conf)
+        run_report(conf, os.path.join(tmp_dir, "full.csv"))
+        pd.testing.assert_frame_equal(_normalised(conf["output_path"]), _normalised(os.path.join(tmp_dir, "full.csv")))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_streamed_test_aggregates_match_in_memory():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "test_results.csv")
+        tests = pd.concat([TESTS] * 3, ignore_index=True).assign(Log="unused column")
+        tests.to_csv(path, index=False)
+        with open(path, "a", encoding="utf8") as f:
+            f.write("TC-9,test_partial,pass")  # a run still being written
+
+        state, cursor, touched = aggregate_test_results(path, chunksize=2)
+        assert touched == {"TC-1", "TC-2"} and state.rows == len(tests)
+        expected = aggregate_tests(tests.rename(columns={"TestCaseID": "test_case_id", "TestName": "test_name",
+                                                         "Status": "status"}))
+        pd.testing.assert_frame_equal(state.to_frame(), expected[state.to_frame().columns])
+
+        # The partial line is picked up once it is complete
+        with open(path, "a", encoding="utf8") as f:
+            f.write(",2024-05-03 10:00:00,done\n")
+        state, _, touched = aggregate_test_results(path, state, cursor, chunksize=2)
+        assert touched == {"TC-9"} and state.rows == len(tests) + 1
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_report_runs_load_changed_rows_into_regression_matrix(monkeypatch):
+    import report
+
+    loaded = []
+    monkeypatch.setattr(report, "insert_regression_matrix", lambda df, **kw: loaded.append(df) or len(df))
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        conf = _write_inputs(tmp_dir, COMMITS.iloc[:1], TESTS.iloc[:2])
+        run_report_incremental(conf)
+        assert loaded == []  # off unless configured
+
+        conf["load_regression_matrix"] = True
+        run_report_incremental(conf, rebuild=True)
+        assert len(loaded[-1]) == 4
+
+        # Only the appended commit's rows and the rows of the touched test case are loaded
+        COMMITS.iloc[1:].to_csv(conf["output_file"], mode="a", header=False, index=False)
+        TESTS.iloc[2:].to_csv(conf["tests_path"], mode="a", header=False, index=False)
+        run_report_incremental(conf)
+        assert sorted(loaded[-1]["test_case_id"]) == ["No Test Mapped", "TC-2", "TC-2"]
+
+        count = len(loaded)
+        run_report_incremental(conf)  # nothing new
+        assert len(loaded) == count
+
+        run_report(conf, os.path.join(tmp_dir, "full.csv"))
+        assert len(loaded[-1]) == 5
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow is not installed")
+def test_parquet_copy_tracks_incremental_report():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        conf = dict(_write_inputs(tmp_dir, COMMITS.iloc[:1], TESTS), parquet_outputs=True)
+        run_report_incremental(conf)
+        assert parquet_is_current(conf["output_path"])
+        cats = pd.read_parquet(parquet_path_for(conf["output_path"])).dtypes
+        assert isinstance(cats["test_case_id"], pd.CategoricalDtype)
+
+        # Appending a commit appends to the CSV and refreshes the parquet copy with it
+        COMMITS.iloc[1:].to_csv(conf["output_file"], mode="a", header=False, index=False)
+        run_report_incremental(conf)
+        assert parquet_is_current(conf["output_path"])
+        from_parquet = read_table(conf["output_path"])
+        from_csv = pd.read_csv(conf["output_path"])
+        assert list(from_parquet.columns) == REPORT_COLUMNS
+        pd.testing.assert_frame_equal(from_parquet.astype(str), from_csv.astype(str))
+
+        # read_csv's dtype / NA options give the same frame from either file
+        for options in ({"dtype": str}, {"dtype": str, "keep_default_na": False, "na_values": [""]},
+                        {"dtype": str, "keep_default_na": False}):
+            pd.testing.assert_frame_equal(read_table(conf["output_path"], **options),
+                                          pd.read_csv(conf["output_path"], **options))
+        with pytest.raises(TypeError):
+            read_table(conf["output_path"], parse_dates=["last_execution_date"])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+# Throwaway PostgreSQL for the bulk-load test, e.g. "host=127.0.0.1 port=55432 user=postgres dbname=postgres"
+TEST_DSN = os.environ.get("REGRESSION_TEST_DSN")
+
+
+@pytest.fixture
+def regression_db(request):
+    import psycopg2
+    from model.migrations import migrate
+
+    conn = psycopg2.connect(TEST_DSN)
+    schema = "regression_test_%d" % os.getpid()
+    with conn.cursor() as cur:
+        cur.execute("CREATE SCHEMA %s" % schema)
+        cur.execute("SET search_path TO %s" % schema)
+    conn.commit()
+    migrate(conn, partition=getattr(request, "param", False))
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("DROP SCHEMA %s CASCADE" % schema)
+        conn.commit()
+        conn.close()
+
+
+def _matrix(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT user_story_id, changed_function, test_case_id, total_no_of_Passed, last_status"
+                    " FROM regression_matrix ORDER BY id")
+        return cur.fetchall()
+
+
+@pytest.mark.skipif(not TEST_DSN, reason="REGRESSION_TEST_DSN is not set")
+@pytest.mark.parametrize("regression_db", [False, True], indirect=True, ids=["plain", "partitioned"])
+@pytest.mark.parametrize("method", ["copy", "values"])
+def test_insert_regression_matrix_bulk(regression_db, method):
+    report = build_report(COMMITS, TESTS, TODO, DEPS)
+    # One row per (user story, commit, file, function, test case)
+    assert insert_regression_matrix(report, conn=regression_db, method=method) == 5
+    rows = _matrix(regression_db)
+    assert [r[1:3] for r in rows] == [("create_task", "TC-1"), ("create_task", "TC-2"), ("list_tasks", "TC-1"),
+                                      ("list_tasks", "TC-2"), (None, "No Test Mapped")]
+    assert rows[1][3:] == (1, "pass")  # TC-2
+
+    # A second load updates in place; a bad row rolls the whole batch back
+    report.loc[report["changed_function"] == "list_tasks", "total_no_of_Passed"] = 7
+    assert insert_regression_matrix(report, conn=regression_db, method=method) == 5
+    assert [r[3] for r in _matrix(regression_db)] == [1, 1, 7, 7, None]
+    report.loc[0, "last_execution_date"] = "not a date"
+    with pytest.raises(Exception):
+        insert_regression_matrix(report.assign(total_no_of_Passed=0), conn=regression_db, method=method)
+    assert [r[3] for r in _matrix(regression_db)] == [1, 1, 7, 7, None]
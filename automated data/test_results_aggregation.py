@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for results_aggregation.aggregate_tests against the legacy report.py step 4
+"""
+import os
+import sys
+import json
+
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from results_aggregation import aggregate_tests, ResultsAggregateState
+from bench_test_aggregation import legacy_aggregate_tests
+
+
+def _tests_frame():
+    return pd.DataFrame({
+        "test_case_id": ["TC-2", "TC-1", "TC-2", None, "TC-1", "TC-3", "TC-2", None],
+        "test_name": ["login", "search", "login_v2", "orphan", None, None, "login_v2", "orphan"],
+        "status": ["Passed", "FAILED", "error", "ok", " pass ", "skipped", "fail", "PASS"],
+        "execution_time": ["2024-03-01 10:00", "2024-03-02 09:00", "2024-03-03 08:00", "2024-03-01 00:00",
+                        "not a date", "2024-02-01 00:00", "2024-03-02 12:00", "2024-03-05 00:00"],
+    }, dtype=object)
+
+
+def test_matches_legacy_aggregation():
+    new = aggregate_tests(_tests_frame())
+    old = legacy_aggregate_tests(_tests_frame())
+    assert list(new.columns) == list(old.columns)
+    for col in old.columns:
+        assert old[col].fillna("NA").astype(str).tolist() == new[col].fillna("NA").astype(str).tolist(), col
+
+
+def test_counts_names_and_last_status():
+    agg = aggregate_tests(_tests_frame()).set_index("test_case_id")
+    assert agg.loc["TC-2", ["total_no_of_Passed", "total_no_of_Failed"]].tolist() == [1, 2]
+    assert agg.loc["TC-2", "test_name"] == "login_v2"
+    assert agg.loc["TC-2", "last_status"] == "fail"  # latest run, not the last row in the file
+    # An unparseable time sorts last, so that run supplies the last status
+    assert agg.loc["TC-1", "last_status"] == "pass"
+    assert str(agg.loc["TC-1", "last_execution_date"]) == "2024-03-02 09:00:00"
+    assert pd.isna(agg.loc["TC-3", "test_name"])
+
+
+def test_state_keeps_nanosecond_execution_dates():
+    tests = pd.DataFrame({
+        "test_case_id": ["TC-1", "TC-1", "TC-2"],
+        "test_name": ["a", "a", "b"],
+        "status": ["pass", "fail", "pass"],
+        "execution_time": ["2024-03-02 09:00:00.123456789", "2024-03-01 00:00", "not a date"],
+    }, dtype=object)
+    state = ResultsAggregateState()
+    state.update(tests.iloc[:1])
+    state.update(tests.iloc[1:])
+    frame = ResultsAggregateState.from_dict(json.loads(json.dumps(state.to_dict()))).to_frame()
+
+    assert frame["last_execution_date"].dtype == "datetime64[ns]"
+    assert frame["last_execution_date"].iloc[0] == pd.Timestamp("2024-03-02 09:00:00.123456789")
+    assert pd.isna(frame["last_execution_date"].iloc[1])
+    expected = aggregate_tests(tests.assign(execution_time=pd.to_datetime(tests["execution_time"], errors="coerce")))
+    assert frame["last_execution_date"].tolist() == expected["last_execution_date"].tolist()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Tests for model/selection_env.py (needs gymnasium and stable-baselines3)."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("gymnasium")
+pytest.importorskip("stable_baselines3")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from gymnasium.utils.env_checker import check_env
+from model import selection_env  # module import: pytest would collect the Test* env classes
+from model.selection_env import STATE_COLS, compute_rewards, encode_states, make_vec_env
+
+
+def _data(rows=50):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({col: rng.integers(0, 10, rows) for col in STATE_COLS})
+    data['total_no_of_Passed'] = rng.integers(0, 4, rows)
+    data['total_no_of_Failed'] = rng.integers(0, 2, rows)
+    return data
+
+
+def test_compute_rewards_matches_row_rule():
+    passed = [0, 3, 3, 0, np.nan, 2]
+    failed = [0, 0, 1, 2, 1, np.nan]
+    assert compute_rewards(passed, failed).tolist() == pytest.approx([0.1, 0.2, 1.125, 1.5, 1.5, 0.2])
+
+
+def test_single_env_serves_precomputed_rows():
+    data = _data()
+    states = encode_states(data)
+    assert states.dtype == np.float32 and states.flags['C_CONTIGUOUS']
+    env = selection_env.TestSelectionEnv(states, compute_rewards(data['total_no_of_Passed'], data['total_no_of_Failed']), 7)
+    check_env(env, skip_render_check=True)
+    obs, _ = env.reset(seed=3)
+    row = env.current_index
+    assert np.array_equal(obs, data.loc[row, STATE_COLS].to_numpy(dtype=np.float32) / len(data))
+    _, reward, terminated, truncated, _ = env.step(0)
+    assert reward == pytest.approx(env.rewards[row]) and terminated and not truncated
+
+
+@pytest.mark.parametrize("kind", ["native", "dummy"])
+def test_vec_env_steps_n_rows(kind):
+    data = _data()
+    states = encode_states(data)
+    rewards = compute_rewards(data['total_no_of_Passed'], data['total_no_of_Failed'])
+    venv = make_vec_env(states, rewards, 7, n_envs=4, kind=kind, seed=0)
+    obs = venv.reset()
+    assert obs.shape == (4, len(STATE_COLS))
+    next_obs, step_rewards, dones, infos = venv.step(np.zeros(4, dtype=np.int64))
+    assert next_obs.shape == (4, len(STATE_COLS)) and dones.all() and len(infos) == 4
+    # The reward is the one of the row each env was observing
+    for env_obs, reward in zip(obs, step_rewards):
+        rows = np.flatnonzero((states == env_obs).all(axis=1))
+        assert np.isclose(rewards[rows], reward).any()
+    venv.close()
+
+
+def test_ppo_learns_on_native_vec_env():
+    from stable_baselines3 import PPO
+
+    data = _data()
+    venv = selection_env.TestSelectionVecEnv(encode_states(data), compute_rewards(data['total_no_of_Passed'],
+                                                                    data['total_no_of_Failed']), 7, n_envs=4, seed=0)
+    model = PPO("MlpPolicy", venv, n_steps=16, batch_size=32, n_epochs=1, verbose=0, device="cpu")
+    model.learn(total_timesteps=64)
+    assert model.num_timesteps == 64
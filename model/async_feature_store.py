@@ -0,0 +1,184 @@
+"""
+asyncio read path for the webhook and prediction: story -> tests,
+file -> tests, function -> tests / dependents and test -> stories/files,
+over a small psycopg 3 AsyncConnectionPool.
+
+Queries and the lookup cache are the ones in model/feature_store.py.
+Concurrent misses for the same key share one query, so a burst of webhook
+deliveries for one story costs a single round trip. Flask handlers are
+synchronous: they call the store through LoopThread, which runs the event
+loop on a daemon thread. priority_prediction.py, run by the webhook, fetches
+the mappings of its ranked tests through the webhook's /lookup/mappings, so
+deliveries share that pool too. Needs psycopg[pool]; without it
+ASYNC_AVAILABLE is False.
+"""
+import os
+import sys
+import asyncio
+import logging
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.feature_store import (MISSING, MAPPINGS_SQL, LookupCache, build_mappings,
+                                 dependents_query, split_dependents, tests_sql)
+
+try:
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+    ASYNC_AVAILABLE = True
+except ImportError:
+    ASYNC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def conninfo_from_config(db_config):
+    """libpq conninfo from a db_connection.DB_CONFIG-style dict (database -> dbname)."""
+    params = {("dbname" if key == "database" else key): value for key, value in db_config.items() if value is not None}
+    return make_conninfo(**params)
+
+
+class AsyncFeatureStore:
+    """
+    Async lookups over a bounded AsyncConnectionPool (min_size..max_size
+    connections, checkouts wait up to timeout seconds). Use as
+    `async with AsyncFeatureStore(...) as store:` or call open()/close().
+    connect_kwargs are passed to every connection (e.g. options).
+    """
+
+    def __init__(self, conninfo="", min_size=1, max_size=4, timeout=30.0,
+                 cache_size=1024, cache_ttl=300.0, **connect_kwargs):
+        if not ASYNC_AVAILABLE:
+            raise RuntimeError("psycopg[pool] is not installed; the async feature store is unavailable")
+        self.conninfo = conninfo
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self.cache = LookupCache(cache_size, cache_ttl)
+        self.pool = None
+        self._inflight = {}
+
+    @classmethod
+    def from_config(cls, conf, db_config):
+        return cls(conninfo_from_config(db_config),
+                   min_size=int(conf.get('async_pool_min', 1)),
+                   max_size=int(conf.get('async_pool_max', 4)),
+                   timeout=float(conf.get('db_pool_timeout', 30)),
+                   cache_size=int(conf.get('feature_cache_size', 1024)),
+                   cache_ttl=float(conf.get('feature_cache_ttl', 300)))
+
+    async def open(self, timeout=None):
+        """Open the pool, waiting up to timeout (default: the checkout timeout) for min_size connections."""
+        if self.pool is None:
+            pool = AsyncConnectionPool(self.conninfo, min_size=self.min_size, max_size=self.max_size,
+                                       timeout=self.timeout, kwargs=self.connect_kwargs or None,
+                                       open=False, name="feature_store")
+            try:
+                await pool.open(wait=True, timeout=timeout or self.timeout)
+            except Exception:
+                await pool.close()
+                raise
+            self.pool = pool
+            logger.info("✅ Async database pool ready (%d-%d connections)", self.min_size, self.max_size)
+        return self
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _query(self, sql, params):
+        async with self.pool.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchall()
+
+    async def _cached(self, key, load):
+        value = self.cache.lookup(key)
+        if value is not MISSING:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(load())
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded for every caller: one cancelled request must not cancel the shared query
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.cache.put(key, task.result())
+
+    async def _distinct_tests(self, column, value):
+        async def load():
+            return [row[0] for row in await self._query(tests_sql(column), (value,))]
+        return await self._cached((column, value), load)
+
+    async def tests_for_story(self, user_story_id):
+        """Test case ids linked to a user story, in first-seen order."""
+        return await self._distinct_tests('user_story_id', user_story_id)
+
+    async def tests_for_file(self, file_changed):
+        return await self._distinct_tests('file_changed', file_changed)
+
+    async def tests_for_function(self, changed_function):
+        return await self._distinct_tests('changed_function', changed_function)
+
+    async def dependents_for_function(self, changed_function, file_changed=None):
+        async def load():
+            return split_dependents(await self._query(*dependents_query(changed_function, file_changed)))
+        return await self._cached(('dependents', changed_function, file_changed), load)
+
+    async def test_mappings(self, test_case_ids):
+        """Same result as FeatureStore.test_mappings."""
+        ids = tuple(sorted(set(test_case_ids)))
+
+        async def load():
+            return build_mappings(ids, await self._query(MAPPINGS_SQL, (list(ids),)))
+        return await self._cached(('mappings', ids), load)
+
+    async def test_mappings_chunked(self, test_case_ids, chunk_size=500):
+        """test_mappings for many tests as concurrent chunked queries over the pool."""
+        ids = sorted(set(test_case_ids))
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        mappings = {}
+        for part in await asyncio.gather(*(self.test_mappings(chunk) for chunk in chunks)):
+            mappings.update(part)
+        return mappings
+
+    def stats(self):
+        """Pool counters (psycopg_pool get_stats) plus cache hits/misses."""
+        stats = dict(self.pool.get_stats()) if self.pool is not None else {}
+        stats.update(cache_hits=self.cache.hits, cache_misses=self.cache.misses)
+        return stats
+
+
+class LoopThread:
+    """
+    An event loop on a daemon thread, so synchronous code (Flask handlers)
+    can run coroutines on one shared loop and pool. Uses a selector loop:
+    psycopg's async connections do not support Windows' default proactor loop.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.SelectorEventLoop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-feature-store", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """Run coro on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
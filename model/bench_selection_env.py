@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: environment steps/sec for PPO training (model_train.py).
+
+Compares the previous pandas-backed TestSelectionEnv (one .loc lookup per
+reset/step) with the array-backed env under DummyVecEnv / SubprocVecEnv and
+with the native TestSelectionVecEnv, on a synthetic encoded report.
+--ppo-steps also times PPO.learn end to end on the legacy env and the
+native vec env.
+
+    python model/bench_selection_env.py --rows 300000 --n-envs 8 --ppo-steps 16384
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+import gymnasium as gym
+from gymnasium import spaces
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.selection_env import STATE_COLS, compute_rewards, encode_states, make_vec_env
+
+
+class LegacyTestSelectionEnv(gym.Env):
+    """model_train.TestSelectionEnv before the array rewrite."""
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, data, state_cols, action_col, reward_col):
+        super().__init__()
+        self.data = data.reset_index(drop=True)
+        self.state_cols = state_cols
+        self.reward_col = reward_col.values
+        self.action_space = spaces.Discrete(len(self.data[action_col].unique()))
+        self.observation_space = spaces.Box(low=0.0, high=1.0, shape=(len(state_cols),), dtype=np.float32)
+        self.current_index = 0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.current_index = np.random.randint(0, len(self.data))
+        state = self.data.loc[self.current_index, self.state_cols].values / len(self.data)
+        return state.astype(np.float32), {}
+
+    def step(self, action):
+        row = self.data.loc[self.current_index]  # noqa: F841  (kept: part of the measured cost)
+        reward = self.reward_col[self.current_index]
+        self.current_index = np.random.randint(0, len(self.data))
+        next_state = self.data.loc[self.current_index, self.state_cols].values / len(self.data)
+        return next_state.astype(np.float32), float(reward), True, False, {}
+
+
+def synthetic_report(rows, tests=500, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({col: rng.integers(0, max(rows // 10, 1), rows) for col in STATE_COLS})
+    data['language'] = rng.integers(0, 9, rows)
+    data['test_case_id'] = rng.integers(0, tests, rows)
+    data['total_no_of_Passed'] = rng.integers(0, 20, rows)
+    data['total_no_of_Failed'] = rng.integers(0, 3, rows) * rng.integers(0, 2, rows)
+    return data
+
+
+def rate(steps, seconds):
+    return f"{steps / seconds:>12,.0f} steps/sec"
+
+
+def bench_single(env, steps):
+    env.reset(seed=0)
+    action = env.action_space.sample()
+    started = time.perf_counter()
+    for _ in range(steps):
+        env.step(action)  # every step ends the episode; the next observation is already a fresh row
+    return time.perf_counter() - started
+
+
+def bench_vec(venv, steps):
+    venv.reset()
+    actions = np.zeros(venv.num_envs, dtype=np.int64)
+    rounds = max(steps // venv.num_envs, 1)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        venv.step(actions)
+    elapsed = time.perf_counter() - started
+    venv.close()
+    return rounds * venv.num_envs, elapsed
+
+
+def bench_ppo(env, steps):
+    from stable_baselines3 import PPO
+
+    model = PPO("MlpPolicy", env, verbose=0, seed=0, device="cpu")
+    started = time.perf_counter()
+    model.learn(total_timesteps=steps)
+    return model.num_timesteps, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--steps", type=int, default=50_000, help="environment steps per measurement")
+    parser.add_argument("--n-envs", type=int, default=8)
+    parser.add_argument("--ppo-steps", type=int, default=0, help="also time PPO.learn for this many timesteps")
+    args = parser.parse_args(argv)
+
+    data = synthetic_report(args.rows)
+    n_actions = data['test_case_id'].nunique()
+    reward_col = pd.Series(compute_rewards(data['total_no_of_Passed'], data['total_no_of_Failed']))
+    states, rewards = encode_states(data), reward_col.to_numpy()
+    print(f"{args.rows:,} rows, {n_actions} test cases, {args.n_envs} envs\n")
+
+    legacy = LegacyTestSelectionEnv(data, STATE_COLS, 'test_case_id', reward_col)
+    legacy_steps = min(args.steps, 20_000)  # the legacy env is slow; keep its run short
+    legacy_rate = legacy_steps / bench_single(legacy, legacy_steps)
+    print(f"legacy pandas env        {rate(legacy_steps, legacy_steps / legacy_rate)}")
+    for kind in ("dummy", "subproc", "native"):
+        steps, elapsed = bench_vec(make_vec_env(states, rewards, n_actions, args.n_envs, kind, seed=0), args.steps)
+        print(f"{kind:<8} x{args.n_envs:<3} array env  {rate(steps, elapsed)}  ({steps / elapsed / legacy_rate:.0f}x)")
+
+    if args.ppo_steps:
+        print()
+        steps, elapsed = bench_ppo(legacy, args.ppo_steps)
+        print(f"PPO.learn legacy env     {rate(steps, elapsed)}")
+        steps, elapsed = bench_ppo(make_vec_env(states, rewards, n_actions, args.n_envs, "native", seed=0), args.ppo_steps)
+        print(f"PPO.learn native x{args.n_envs:<3}    {rate(steps, elapsed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,26 @@
 # db_connection.py
-import psycopg2
+"""
+PostgreSQL access for the pipeline.
+
+connection() checks a connection out of a process-wide bounded pool, commits
+when the block succeeds and rolls back when it raises; pool_stats() reports
+pool wait times and checkout latency. get_connection() still returns a new,
+unpooled connection (or None) for one-off scripts.
+"""
+import os
+import sys
+import time
 import logging
+import weakref
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
 # Try to get DB config from central config_loader if available
 try:
@@ -21,6 +41,14 @@ DB_CONFIG = {
     "password": _conf.get('password', '1976')
 }
 
+# psycopg2 keeps up to POOL_MIN idle connections open; connections above that are closed on return
+POOL_MIN = int(_conf.get('db_pool_min', 2))
+POOL_MAX = int(_conf.get('db_pool_max', 8))
+# Seconds to wait for a free connection before PoolTimeout (None: wait indefinitely)
+POOL_TIMEOUT = _conf.get('db_pool_timeout', 30)
+# Connections idle longer than this are pinged before being handed out
+HEALTH_CHECK_IDLE_SECONDS = float(_conf.get('db_health_check_idle_seconds', 30))
+
 
 def get_connection():
     """Return a new PostgreSQL connection using DB_CONFIG.
@@ -29,15 +57,186 @@ def get_connection():
     """
     try:
         conn = psycopg2.connect(**DB_CONFIG)
-        logger.info("✅ Database connection established to %s:%s/%s", DB_CONFIG.get('host'), DB_CONFIG.get('port'), DB_CONFIG.get('database'))
+        logger.debug("✅ Database connection established to %s:%s/%s", DB_CONFIG.get('host'), DB_CONFIG.get('port'), DB_CONFIG.get('database'))
         return conn
     except Exception as e:
         logger.exception("❌ Database connection failed: %s", e)
         return None
 
 
-def create_tables():
-    command = """
+class PoolTimeout(psycopg2.OperationalError):
+    """No pooled connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool over psycopg2's ThreadedConnectionPool.
+
+    At most maxconn connections are checked out at once; further checkouts
+    wait (up to timeout) instead of failing; up to minconn idle connections
+    stay open between checkouts. A connection that sat idle for
+    health_check_idle seconds is pinged with SELECT 1 on checkout and
+    replaced if it is dead. Checkout waits and latencies are recorded for
+    stats().
+    """
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, health_check_idle=HEALTH_CHECK_IDLE_SECONDS,
+                 dsn=None, **db_config):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn, **db_config)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        # Keyed by the connection itself, weakly: an entry goes away with a connection the
+        # psycopg2 pool closed or discarded, so a new connection never inherits its timestamp
+        self._idle_since = weakref.WeakKeyDictionary()  # conn -> time.monotonic() when it was returned
+        self._checked_out = weakref.WeakKeyDictionary()  # conn -> time.perf_counter() at checkout
+        self.maxconn = maxconn
+        self.health_check_idle = health_check_idle
+        self._stats = {'checkouts': 0, 'timeouts': 0, 'discarded': 0,
+                       'wait_total': 0.0, 'wait_max': 0.0,
+                       'checkout_total': 0.0, 'checkout_max': 0.0, 'held_total': 0.0}
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection; return it with putconn()."""
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(f"no database connection free after {timeout}s ({self.maxconn} in use)")
+        waited = time.perf_counter() - started
+        try:
+            conn = self._healthy_conn()
+        except Exception:
+            self._slots.release()
+            raise
+        now = time.perf_counter()
+        with self._lock:
+            self._checked_out[conn] = now
+            st = self._stats
+            st['checkouts'] += 1
+            st['wait_total'] += waited
+            st['wait_max'] = max(st['wait_max'], waited)
+            st['checkout_total'] += now - started
+            st['checkout_max'] = max(st['checkout_max'], now - started)
+        return conn
+
+    def _healthy_conn(self):
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            with self._lock:
+                idle_since = self._idle_since.pop(conn, None)
+            stale = idle_since is not None and time.monotonic() - idle_since >= self.health_check_idle
+            if not conn.closed and (not stale or self._ping(conn)):
+                return conn
+            with self._lock:
+                self._stats['discarded'] += 1
+            logger.warning("Discarding dead pooled database connection")
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("no healthy database connection available")
+
+    @staticmethod
+    def _ping(conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def putconn(self, conn, close=False):
+        """Return a connection (psycopg2 rolls back an open transaction and drops a lost one)."""
+        with self._lock:
+            checked_out = self._checked_out.pop(conn, None)
+            if checked_out is not None:
+                self._stats['held_total'] += time.perf_counter() - checked_out
+            if close or conn.closed:
+                self._idle_since.pop(conn, None)
+            else:
+                self._idle_since[conn] = time.monotonic()
+        self._pool.putconn(conn, close=close or bool(conn.closed))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Pooled checkout: commits when the block succeeds, rolls back when it raises."""
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def stats(self):
+        """Checkout counters plus wait / checkout / hold times in milliseconds."""
+        with self._lock:
+            st = dict(self._stats)
+            in_use = len(self._checked_out)
+        n = st['checkouts'] or 1
+        return {
+            'max_connections': self.maxconn,
+            'in_use': in_use,
+            'checkouts': st['checkouts'],
+            'timeouts': st['timeouts'],
+            'discarded': st['discarded'],
+            'wait_ms_avg': round(1000 * st['wait_total'] / n, 3),
+            'wait_ms_max': round(1000 * st['wait_max'], 3),
+            'checkout_ms_avg': round(1000 * st['checkout_total'] / n, 3),
+            'checkout_ms_max': round(1000 * st['checkout_max'], 3),
+            'held_ms_avg': round(1000 * st['held_total'] / n, 3),
+        }
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide ConnectionPool, created from DB_CONFIG on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
+            logger.info("✅ Database pool ready for %s:%s/%s (%d-%d connections)", DB_CONFIG.get('host'),
+                        DB_CONFIG.get('port'), DB_CONFIG.get('database'), POOL_MIN, POOL_MAX)
+        return _pool
+
+
+@contextmanager
+def connection(timeout=POOL_TIMEOUT):
+    """
+    with connection() as conn: ...  — a warm pooled connection, committed on
+    success and rolled back on error. Raises instead of returning None when
+    the database is unreachable or the pool stays exhausted past timeout.
+    """
+    with get_pool().connection(timeout) as conn:
+        yield conn
+
+
+def pool_stats():
+    """stats() of the process-wide pool ({} before first use)."""
+    return _pool.stats() if _pool is not None else {}
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+# Version 1 of the schema; later changes are migrations in model/migrations.py
+REGRESSION_MATRIX_DDL = """
         CREATE TABLE IF NOT EXISTS regression_matrix (
             id SERIAL PRIMARY KEY,
             user_story_id VARCHAR(50) NOT NULL,
@@ -54,19 +253,22 @@ def create_tables():
             last_execution_date TIMESTAMP
         );
     """
-    conn = get_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute(command)
-            conn.commit()
-            cur.close()
-            logger.info("✅ Table created successfully")
-        except Exception as e:
-            logger.exception("❌ Failed to create table: %s", e)
-        finally:
-            conn.close()
+
+
+def create_tables(partition=None):
+    """Create or upgrade the schema through model/migrations.py."""
+    from model.migrations import migrate
+    if partition is None:
+        partition = _conf.get('db_partition_by_month', False)
+    try:
+        migrate(partition=partition)
+        logger.info("✅ Tables are up to date")
+    except Exception as e:
+        logger.exception("❌ Failed to create tables: %s", e)
 
 
 if __name__ == "__main__":
-    create_tables()
+    # Run through the package module: model.migrations imports model.db_connection, and a
+    # second copy of this file (as __main__) would hold a second pool
+    from model import db_connection
+    db_connection.create_tables()
@@ -0,0 +1,229 @@
+"""
+Training data and prediction lookups served from the regression_matrix table.
+
+Training batches stream through a server-side (named) cursor, so the client
+never holds more than one batch of raw rows; lookups are indexed queries
+(see model/migrations.py) whose results are kept in a small LRU cache with a
+TTL, so a long-running process does not re-query hot stories, files and
+functions. model_train.py and priority_prediction.py use it when the config
+sets "feature_source": "db".
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.db_connection import connection
+
+logger = logging.getLogger(__name__)
+
+# regression_matrix columns under the report CSV's names (Postgres folds the unquoted mixed case)
+TRAINING_COLUMNS = {
+    'user_story_id': 'user_story_id',
+    'commit_sha': 'commit_sha',
+    'author': 'author',
+    'file_changed': 'file_changed',
+    'changed_function': 'changed_function',
+    'dependent_function': 'dependent_function',
+    'test_case_id': 'test_case_id',
+    'test_name': 'test_name',
+    'total_no_of_passed': 'total_no_of_Passed',
+    'total_no_of_failed': 'total_no_of_Failed',
+    'last_status': 'last_status',
+    'last_execution_date': 'last_execution_date',
+}
+
+
+# ---------- QUERIES (shared with model/async_feature_store.py) ----------
+LOOKUP_COLUMNS = ('user_story_id', 'file_changed', 'changed_function')
+# test_case_id that report.py writes on rows without a mapped test
+NO_TEST_MAPPED = 'No Test Mapped'
+
+MAPPINGS_SQL = ("SELECT test_case_id, user_story_id, file_changed, changed_function"
+                " FROM regression_matrix WHERE test_case_id = ANY(%s) ORDER BY id")
+
+
+def tests_sql(column):
+    """Distinct test case ids for one value of column, in first-seen order."""
+    if column not in LOOKUP_COLUMNS:
+        raise ValueError(f"not a lookup column: {column}")
+    return (f"SELECT test_case_id FROM regression_matrix WHERE {column} = %s AND test_case_id IS NOT NULL"
+            f" AND test_case_id <> '{NO_TEST_MAPPED}' GROUP BY test_case_id ORDER BY min(id)")
+
+
+def dependents_query(changed_function, file_changed=None):
+    sql = ("SELECT DISTINCT dependent_function FROM regression_matrix"
+           " WHERE changed_function = %s AND dependent_function IS NOT NULL")
+    params = [changed_function]
+    if file_changed is not None:
+        sql += " AND file_changed = %s"
+        params.append(file_changed)
+    return sql, params
+
+
+def split_dependents(rows):
+    """Comma-separated dependent_function cells -> unique names."""
+    deps = {}
+    for (cell,) in rows:
+        for dep in cell.split(","):
+            if dep.strip():
+                deps[dep.strip()] = None
+    return list(deps)
+
+
+def build_mappings(test_case_ids, rows):
+    mappings = {tc: {"user_stories": set(), "files_functions": []} for tc in test_case_ids}
+    for tc, us, file_changed, function in rows:
+        entry = mappings[tc]
+        if us and us.strip():
+            entry["user_stories"].add(us.strip())
+        pair = ((file_changed or "").strip(), (function or "").strip())
+        if pair not in entry["files_functions"]:
+            entry["files_functions"].append(pair)
+    return mappings
+
+
+def mappings_to_json(mappings):
+    """build_mappings result as JSON-safe lists (webhook /lookup/mappings)."""
+    return {tc: {"user_stories": sorted(entry["user_stories"]),
+                 "files_functions": [list(pair) for pair in entry["files_functions"]]}
+            for tc, entry in mappings.items()}
+
+
+def mappings_from_json(body):
+    return {tc: {"user_stories": set(entry["user_stories"]),
+                 "files_functions": [tuple(pair) for pair in entry["files_functions"]]}
+            for tc, entry in body.items()}
+
+
+MISSING = object()
+
+
+class LookupCache:
+    """Thread-safe LRU cache with a time-to-live, counting hits and misses."""
+
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Cached value for key, or MISSING (counted as a miss)."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and now - item[0] < self.ttl:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            return MISSING
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get(self, key, load):
+        value = self.lookup(key)
+        if value is MISSING:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class FeatureStore:
+    """
+    Read access to regression_matrix for training and prediction.
+
+    connect: context manager factory yielding a connection (default: the
+    pooled model.db_connection.connection).
+    """
+
+    def __init__(self, connect=connection, cache_size=1024, cache_ttl=300.0, batch_size=10000):
+        self._connect = connect
+        self.batch_size = batch_size
+        self.cache = LookupCache(cache_size, cache_ttl)
+
+    @classmethod
+    def from_config(cls, conf):
+        return cls(cache_size=int(conf.get('feature_cache_size', 1024)),
+                   cache_ttl=float(conf.get('feature_cache_ttl', 300)),
+                   batch_size=int(conf.get('feature_batch_size', 10000)))
+
+    # ---------- TRAINING ----------
+    def iter_training_batches(self, batch_size=None):
+        """DataFrames of up to batch_size report rows (CSV column names), in id order."""
+        batch_size = batch_size or self.batch_size
+        columns = ", ".join(TRAINING_COLUMNS)
+        with self._connect() as conn:
+            # Named cursor: rows stay on the server until fetched
+            with conn.cursor(name="feature_store_training") as cur:
+                cur.itersize = batch_size
+                cur.execute(f"SELECT {columns} FROM regression_matrix ORDER BY id")
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield pd.DataFrame(rows, columns=list(TRAINING_COLUMNS.values()))
+
+    def training_frame(self):
+        """All report rows as one DataFrame, with the same columns as the report CSV."""
+        frames = list(self.iter_training_batches())
+        if not frames:
+            return pd.DataFrame(columns=list(TRAINING_COLUMNS.values()))
+        data = pd.concat(frames, ignore_index=True)
+        logger.info("Loaded %d training rows from regression_matrix in %d batches", len(data), len(frames))
+        return data
+
+    # ---------- LOOKUPS ----------
+    def _query(self, sql, params):
+        with self._connect() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def _distinct_tests(self, column, value):
+        return self.cache.get((column, value), lambda: [row[0] for row in self._query(tests_sql(column), (value,))])
+
+    def tests_for_story(self, user_story_id):
+        """Test case ids linked to a user story, in first-seen order."""
+        return self._distinct_tests('user_story_id', user_story_id)
+
+    def tests_for_file(self, file_changed):
+        return self._distinct_tests('file_changed', file_changed)
+
+    def tests_for_function(self, changed_function):
+        return self._distinct_tests('changed_function', changed_function)
+
+    def dependents_for_function(self, changed_function, file_changed=None):
+        """Dependent functions recorded for a changed function (optionally in one file)."""
+        return self.cache.get(('dependents', changed_function, file_changed),
+                              lambda: split_dependents(self._query(*dependents_query(changed_function, file_changed))))
+
+    def test_mappings(self, test_case_ids):
+        """
+        {test_case_id: {"user_stories": set, "files_functions": [(file, function), ...]}}
+        for the given tests, from one indexed query (pairs in first-seen order).
+        """
+        ids = tuple(sorted(set(test_case_ids)))
+        return self.cache.get(('mappings', ids), lambda: build_mappings(ids, self._query(MAPPINGS_SQL, (list(ids),))))
+
+    def clear_cache(self):
+        self.cache.clear()
@@ -0,0 +1,231 @@
+"""
+Versioned schema migrations for regression_matrix.
+
+Each migration runs once, in its own transaction, and is recorded in
+schema_migrations. Run `python model/migrations.py` (or db_connection.py,
+whose create_tables() calls migrate()) to bring a database up to date;
+`--partition` also applies the optional monthly range partitioning on
+last_execution_date.
+
+Natural key of a report row: (user_story_id, commit_sha, file_changed,
+changed_function, test_case_id), with missing values compared as ''. The
+bulk merge in report.insert_regression_matrix matches rows on exactly these
+expressions, so it can use the key index.
+"""
+import os
+import re
+import sys
+import argparse
+import logging
+from datetime import date
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from model.db_connection import connection, REGRESSION_MATRIX_DDL
+
+logger = logging.getLogger(__name__)
+
+# Serialises concurrent migrators (pg_advisory_xact_lock key)
+_LOCK_KEY = 0x7265676d  # "regm"
+
+NATURAL_KEY_SQL = ("user_story_id, (COALESCE(commit_sha, '')), (COALESCE(file_changed, '')), "
+                   "(COALESCE(changed_function, '')), (COALESCE(test_case_id, ''))")
+
+SECONDARY_INDEXES = {
+    # priority_prediction: test case -> user stories / files / functions
+    'regression_matrix_test_case_idx': "(test_case_id)",
+    'regression_matrix_user_story_idx': "(user_story_id)",
+    # "same file" / "same function" filters; also serves file_changed alone
+    'regression_matrix_file_function_idx': "(file_changed, changed_function)",
+    'regression_matrix_last_execution_idx': "(last_execution_date)",
+}
+
+
+def _baseline(cur):
+    cur.execute(REGRESSION_MATRIX_DDL)
+
+
+def _natural_key(cur):
+    # changed_function UNIQUE collapsed every (commit, test) pair touching a function into one row
+    cur.execute("ALTER TABLE regression_matrix DROP CONSTRAINT IF EXISTS regression_matrix_changed_function_key")
+    cur.execute("""
+        DELETE FROM regression_matrix a USING regression_matrix b
+        WHERE a.id < b.id
+          AND a.user_story_id = b.user_story_id
+          AND COALESCE(a.commit_sha, '') = COALESCE(b.commit_sha, '')
+          AND COALESCE(a.file_changed, '') = COALESCE(b.file_changed, '')
+          AND COALESCE(a.changed_function, '') = COALESCE(b.changed_function, '')
+          AND COALESCE(a.test_case_id, '') = COALESCE(b.test_case_id, '')
+    """)
+    if cur.rowcount:
+        logger.info("Removed %d duplicate regression_matrix rows", cur.rowcount)
+    cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS regression_matrix_natural_key ON regression_matrix ({NATURAL_KEY_SQL})")
+
+
+def _secondary_indexes(cur):
+    for name, columns in SECONDARY_INDEXES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON regression_matrix {columns}")
+
+
+def _changed_function_index(cur):
+    # feature_store: function -> tests / dependents
+    cur.execute("CREATE INDEX IF NOT EXISTS regression_matrix_changed_function_idx ON regression_matrix (changed_function)")
+
+
+def _month_start(d, months=0):
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_month_partitions(cur, oldest=None, months_ahead=3):
+    """Create monthly partitions from the oldest row's month to months_ahead past the current one."""
+    if oldest is None:
+        cur.execute("SELECT min(last_execution_date) FROM regression_matrix")
+        oldest = cur.fetchone()[0]
+    month = _month_start(oldest or date.today())
+    last = _month_start(date.today(), months_ahead)
+    while month <= last:
+        following = _month_start(month, 1)
+        _create_month_partition(cur, month, following)
+        month = following
+
+
+def _create_month_partition(cur, month, following):
+    """
+    Partition for [month, following). Rows of that month already in the
+    default partition (dated before the first or past the last partition
+    when they arrived) would block CREATE ... PARTITION OF, so they are moved
+    into the new table before it is attached.
+    """
+    name = f"regression_matrix_{month:%Y_%m}"
+    bounds = f"FOR VALUES FROM ('{month}') TO ('{following}')"
+    cur.execute("SELECT to_regclass(%s), to_regclass('regression_matrix_default')", (name,))
+    existing, default = cur.fetchone()
+    if existing is not None:
+        return
+    if default is not None:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM regression_matrix_default"
+                    " WHERE last_execution_date >= %s AND last_execution_date < %s)", (month, following))
+        if cur.fetchone()[0]:
+            cur.execute(f"CREATE TABLE {name} (LIKE regression_matrix INCLUDING DEFAULTS)")
+            cur.execute(f"""
+                WITH moved AS (
+                    DELETE FROM regression_matrix_default
+                    WHERE last_execution_date >= %s AND last_execution_date < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """, (month, following))
+            logger.info("Moved %d rows from regression_matrix_default into %s", cur.rowcount, name)
+            cur.execute(f"ALTER TABLE regression_matrix ATTACH PARTITION {name} {bounds}")
+            return
+    cur.execute(f"CREATE TABLE {name} PARTITION OF regression_matrix {bounds}")
+
+
+def _partition_by_month(cur):
+    """
+    Rebuild regression_matrix as RANGE-partitioned on last_execution_date:
+    one partition per month plus a default one for rows without a date.
+    Unique indexes on a partitioned table must contain the partition key, so
+    the natural key index becomes a plain one there (the merge still keeps
+    rows unique per key).
+    """
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'regression_matrix'::regclass")
+    if cur.fetchone()[0] == 'p':
+        return
+    cur.execute("ALTER TABLE regression_matrix RENAME TO regression_matrix_unpartitioned")
+    cur.execute("""
+        CREATE TABLE regression_matrix (LIKE regression_matrix_unpartitioned INCLUDING DEFAULTS)
+        PARTITION BY RANGE (last_execution_date)
+    """)
+    cur.execute("ALTER SEQUENCE regression_matrix_id_seq OWNED BY regression_matrix.id")
+    cur.execute("CREATE TABLE regression_matrix_default PARTITION OF regression_matrix DEFAULT")
+    cur.execute("SELECT min(last_execution_date) FROM regression_matrix_unpartitioned")
+    ensure_month_partitions(cur, cur.fetchone()[0])
+    cur.execute("INSERT INTO regression_matrix SELECT * FROM regression_matrix_unpartitioned")
+    # Carry over the secondary indexes (whichever migrations created them)
+    cur.execute("""
+        SELECT indexdef FROM pg_indexes
+        WHERE tablename = 'regression_matrix_unpartitioned' AND schemaname = current_schema()
+          AND indexname NOT IN ('regression_matrix_pkey', 'regression_matrix_natural_key')
+    """)
+    index_defs = [re.sub(r" ON \S*regression_matrix_unpartitioned ", " ON regression_matrix ", d)
+                  for (d,) in cur.fetchall()]
+    cur.execute("DROP TABLE regression_matrix_unpartitioned")
+    cur.execute(f"CREATE INDEX regression_matrix_natural_key ON regression_matrix ({NATURAL_KEY_SQL})")
+    for index_def in index_defs:
+        cur.execute(index_def)
+
+
+# (version, name, migration, optional); optional ones only run with partition=True
+MIGRATIONS = [
+    (1, "baseline regression_matrix", _baseline, False),
+    (2, "composite natural key instead of UNIQUE changed_function", _natural_key, False),
+    (3, "indexes for prediction lookups", _secondary_indexes, False),
+    (4, "monthly partitions on last_execution_date", _partition_by_month, True),
+    (5, "changed_function index for feature store lookups", _changed_function_index, False),
+]
+
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(conn=None, partition=False):
+    """Apply pending migrations, each in its own transaction; returns the versions applied."""
+    if conn is None:
+        with connection() as conn:
+            return migrate(conn, partition)
+    applied = []
+    for version, name, step, optional in MIGRATIONS:
+        if optional and not partition:
+            continue
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+                if version in applied_versions(cur):
+                    conn.commit()
+                    continue
+                logger.info("Applying migration %d: %s", version, name)
+                step(cur)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            logger.exception("❌ Migration %d (%s) failed; rolled back", version, name)
+            raise
+    if partition:
+        with conn.cursor() as cur:
+            ensure_month_partitions(cur)  # keep partitions ahead of the calendar on every run
+        conn.commit()
+    if applied:
+        logger.info("✅ Schema migrated: applied %s", applied)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply regression_matrix schema migrations")
+    parser.add_argument("--partition", action="store_true",
+                        help="Also partition regression_matrix by month of last_execution_date")
+    args = parser.parse_args(argv)
+    try:
+        import config_loader as cfg
+        partition = args.partition or cfg.load_config().get('db_partition_by_month', False)
+    except Exception:
+        partition = args.partition
+    migrate(partition=partition)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,8 @@ except Exception as e:
 # ------------------------------
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from table_io import read_table, table_exists, write_table
+
 try:
     import config_loader as cfg
     cfg.setup_logging()
@@ -85,8 +87,8 @@ try:
     logger.info("Encoders loaded")
 except:
     logger.warning("Encoders not found, rebuilding...")
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
+    if table_exists(CSV_PATH):
+        df = read_table(CSV_PATH)
         encoders = {}
         for col in ["file_changed", "changed_function", "dependent_function", "test_case_id", "user_story_id", "language"]:
             if col in df.columns:
@@ -131,6 +133,8 @@ parser.add_argument('--changed_function', type=str, default='unknown', help='Fun
 parser.add_argument('--dependent_function', type=str, default='unknown', help='Dependent function')
 parser.add_argument('--git_diff_file', type=str, default=None, help='Path to git_diff output CSV (alternative to manual args)')
 parser.add_argument('--output_file', type=str, default=None, help='Output CSV file for ranked test cases')
+parser.add_argument('--lookup_url', type=str, default=None,
+                    help='Webhook /lookup/mappings URL; with feature_source db, mappings come from its shared pool')
 
 args = parser.parse_args()
 
@@ -229,9 +233,36 @@ ranking = [(tc, round(score / max_prob, 4)) for tc, score in ranking]
 # ------------------------------
 tc_file_func_map = {}  # dict: TC -> list of (file, function)
 tc_to_us_mapping = {}
+mappings_loaded = False
+
+if _conf.get('feature_source', 'csv') == 'db':
+    # One indexed query for the ranked test cases instead of walking the whole history
+    try:
+        ranked_ids = [str(tc) for tc, _ in ranking]
+        if args.lookup_url:
+            import requests
+            from model.feature_store import mappings_from_json
+            resp = requests.post(args.lookup_url, json={"test_case_ids": ranked_ids},
+                                 timeout=float(_conf.get('db_pool_timeout', 30)) + 5)
+            resp.raise_for_status()
+            mappings = mappings_from_json(resp.json())
+        else:
+            from model.feature_store import FeatureStore
+            mappings = FeatureStore.from_config(_conf).test_mappings(ranked_ids)
+        for tc, entry in mappings.items():
+            if entry["user_stories"]:
+                tc_to_us_mapping[tc] = entry["user_stories"]
+            if entry["files_functions"]:
+                tc_file_func_map[tc] = entry["files_functions"]
+        # No row for any ranked test: the table was not loaded (see "load_regression_matrix")
+        mappings_loaded = bool(tc_file_func_map)
+        if not mappings_loaded:
+            logger.warning("regression_matrix has no rows for the ranked tests; reading %s", CSV_PATH)
+    except Exception as e:
+        logger.warning("Feature store unavailable (%s); reading %s", e, CSV_PATH)
 
-if os.path.exists(CSV_PATH):
-    train_data = pd.read_csv(CSV_PATH)
+if not mappings_loaded and table_exists(CSV_PATH):
+    train_data = read_table(CSV_PATH)
     for _, row in train_data.iterrows():
         tc = str(row.get('test_case_id', '')).strip()
         us = str(row.get('user_story_id', '')).strip()
@@ -360,7 +391,7 @@ cols = ["Rank", "Test_Case_ID", "Priority_Score", "Original_User_Story_ID", "Inp
 cols = [c for c in cols if c in out_df.columns]
 out_df = out_df[cols]
 
-out_df.to_csv(output_file, index=False)
+write_table(out_df, output_file, parquet=_conf.get('parquet_outputs', False))
 
 logger.info(f"[SAVE] Saved full NLP-enhanced results to: {output_file}")
 
@@ -381,5 +412,5 @@ filtered_df = out_df[
     ((out_df["Changed_Function"] == changed_function) & (changed_function != 'unknown'))
 ]
 
-filtered_df.to_csv(filtered_output_file, index=False)
+write_table(filtered_df, filtered_output_file, parquet=_conf.get('parquet_outputs', False))
 logger.info("[SAVE] Filtered (required only) test cases saved to: %s", filtered_output_file)
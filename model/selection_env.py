@@ -0,0 +1,133 @@
+"""
+Test-selection environments for PPO training (model_train.py).
+
+States and rewards are precomputed once as contiguous NumPy arrays, so a
+step is an array lookup instead of a pandas .loc on the report frame.
+TestSelectionEnv is the single gymnasium env (usable under DummyVecEnv /
+SubprocVecEnv); TestSelectionVecEnv is a native vectorized env that serves
+n_envs rows per step with one fancy-index. Every episode is one step: the
+observation is a random report row and the reward depends only on its
+pass/fail history.
+"""
+import numpy as np
+import gymnasium as gym
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv, DummyVecEnv, SubprocVecEnv
+
+STATE_COLS = ['user_story_id', 'file_changed', 'changed_function', 'dependent_function', 'language']
+
+
+def compute_rewards(passed, failed):
+    """
+    Reward per row: 1.0-1.5 with failures (by failure rate), 0.2 if only
+    passed, 0.1 if never run. NaN counts as 0.
+    """
+    passed = np.nan_to_num(np.asarray(passed, dtype=np.float64))
+    failed = np.nan_to_num(np.asarray(failed, dtype=np.float64))
+    total = passed + failed
+    failure_rate = np.divide(failed, total, out=np.zeros_like(total), where=total > 0)
+    return np.where(failed > 0, 1.0 + failure_rate * 0.5,
+                    np.where(passed > 0, 0.2, 0.1)).astype(np.float32)
+
+
+def encode_states(data, state_cols=STATE_COLS):
+    """Label-encoded state columns scaled by the row count, as a C-contiguous float32 array."""
+    return np.ascontiguousarray(data[state_cols].to_numpy(dtype=np.float32) / len(data))
+
+
+def _spaces(states, n_actions):
+    return (spaces.Box(low=0.0, high=1.0, shape=(states.shape[1],), dtype=np.float32),
+            spaces.Discrete(n_actions))
+
+
+class TestSelectionEnv(gym.Env):
+    metadata = {"render_modes": []}
+
+    def __init__(self, states, rewards, n_actions):
+        super().__init__()
+        self.states = states
+        self.rewards = rewards
+        self.observation_space, self.action_space = _spaces(states, n_actions)
+        self.current_index = 0
+
+    def reset(self, seed=None, options=None):
+        """Start a new episode"""
+        super().reset(seed=seed)
+        self.current_index = self.np_random.integers(len(self.states))
+        return self.states[self.current_index].copy(), {}
+
+    def step(self, action):
+        """Perform one action"""
+        reward = float(self.rewards[self.current_index])
+        self.current_index = self.np_random.integers(len(self.states))
+        return self.states[self.current_index].copy(), reward, True, False, {}
+
+
+class TestSelectionVecEnv(VecEnv):
+    """n_envs copies of TestSelectionEnv stepped together in NumPy."""
+
+    render_mode = None
+
+    def __init__(self, states, rewards, n_actions, n_envs=8, seed=None):
+        self.states = states
+        self.rewards = rewards
+        self._rng = np.random.default_rng(seed)
+        self._index = np.zeros(n_envs, dtype=np.intp)
+        observation_space, action_space = _spaces(states, n_actions)
+        super().__init__(n_envs, observation_space, action_space)
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._index = self._rng.integers(len(self.states), size=self.num_envs)
+        return self.states[self._index]
+
+    def step_async(self, actions):
+        pass  # rewards do not depend on the action
+
+    def step_wait(self):
+        rewards = self.rewards[self._index]
+        terminal = self.states[self._index]
+        self._index = self._rng.integers(len(self.states), size=self.num_envs)
+        dones = np.ones(self.num_envs, dtype=bool)
+        infos = [{"terminal_observation": obs} for obs in terminal]
+        return self.states[self._index], rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        return [indices] if isinstance(indices, int) else indices
+
+
+def make_vec_env(states, rewards, n_actions, n_envs=8, kind="native", seed=None):
+    """
+    n_envs parallel environments: "native" (TestSelectionVecEnv), "dummy"
+    (DummyVecEnv) or "subproc" (SubprocVecEnv, one process per env).
+    """
+    if kind == "native":
+        return TestSelectionVecEnv(states, rewards, n_actions, n_envs, seed)
+    factories = [lambda: TestSelectionEnv(states, rewards, n_actions) for _ in range(n_envs)]
+    if kind == "dummy":
+        venv = DummyVecEnv(factories)
+    elif kind == "subproc":
+        venv = SubprocVecEnv(factories)
+    else:
+        raise ValueError(f"unknown vec env kind: {kind}")
+    venv.seed(seed)
+    return venv
@@ -1,8 +1,10 @@
 import os
+import sys
 import time
+import tempfile
 import subprocess
-from threading import Thread
-from flask import Flask, request
+from threading import Thread, Lock
+from flask import Flask, request, jsonify
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import re
@@ -14,6 +16,11 @@ import json
 # CONFIG LOADING
 # ---------------------------
 
+# Project root, so config_loader and model.db_connection resolve when run as model/webhook.py
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
 try:
     import config_loader as cfg_loader
 except Exception as e:
@@ -67,6 +74,8 @@ GIT_DIFF_PATH = config.get('git_diff_path')
 pipeline_script = config.get('pipeline_script')
 report_path = config.get('report_path')
 EXCEL_SCRIPT = os.path.normpath(config.get('todo_path'))
+WEBHOOK_HOST = config.get('webhook_host') or '0.0.0.0'
+WEBHOOK_PORT = int(config.get('webhook_port') or 5000)
 
 logger.info("Webhook configuration:")
 logger.info("  VENV_PYTHON: %s", VENV_PYTHON)
@@ -76,6 +85,31 @@ logger.info("  EXCEL_SCRIPT: %s", EXCEL_SCRIPT)
 
 app = Flask(__name__)
 
+# ---------------------------
+# REPORT
+# ---------------------------
+
+def run_report():
+    """
+    Build the regression report. Runs report.py in this process when it is
+    importable here (no interpreter start-up or module re-import per webhook);
+    otherwise falls back to running report_path under VENV_PYTHON. Like
+    report.py main(), "report_incremental" selects the incremental build.
+    """
+    report_dir = os.path.dirname(report_path) if report_path else None
+    try:
+        if report_dir and report_dir not in sys.path:
+            sys.path.insert(0, report_dir)
+        import report
+    except Exception as e:
+        logger.info("report.py not importable in-process (%s); running it as a script", e)
+        subprocess.run([VENV_PYTHON, report_path], check=True)
+        return None
+    if config.get('report_incremental'):
+        return report.run_report_incremental(config)
+    return report.run_report(config)
+
+
 # ---------------------------
 # TRAINING FUNCTION
 # ---------------------------
@@ -86,9 +120,9 @@ def run_training():
 
     try:
         subprocess.run([VENV_PYTHON, pipeline_script], check=True)
-        subprocess.run([VENV_PYTHON, report_path], check=True)
+        run_report()
         subprocess.run([VENV_PYTHON, MODEL_TRAINING_PATH], check=True)
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         logger.exception("Training error: %s", e)
 
     logger.info("=== Training Completed ===")
@@ -98,23 +132,102 @@ def run_training():
 # PREDICTION FUNCTION
 # ---------------------------
 
-def run_prediction():
+def changed_files_from_payload(payload):
+    """Collect added/modified/removed paths from a GitHub push payload."""
+    files = []
+    if isinstance(payload, dict):
+        for c in payload.get("commits", []) or []:
+            for key in ("added", "modified", "removed"):
+                files.extend(c.get(key, []) or [])
+    return list(dict.fromkeys(files))
+
+
+def run_prediction(changed_files=None):
     """Run prediction when GitHub webhook triggers."""
     logger.info("=== Running Prediction (GitHub Trigger) ===")
 
     try:
-        subprocess.run([VENV_PYTHON, pipeline_script], check=True)
-        subprocess.run([VENV_PYTHON, report_path], check=True)
+        if changed_files:
+            # Only re-parse the files touched by this push and patch the existing dependency artifact
+            with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as tmp:
+                tmp.write("\n".join(changed_files))
+            try:
+                subprocess.run([VENV_PYTHON, pipeline_script, "--changed-files", tmp.name], check=True)
+            finally:
+                os.remove(tmp.name)
+        else:
+            subprocess.run([VENV_PYTHON, pipeline_script], check=True)
+        run_report()
         # Pass git_diff output CSV to priority_prediction so it gets real commit data
         git_diff_output = config.get('output_file')
         print("Git diff output file for prediction:", git_diff_output)
-        subprocess.run([VENV_PYTHON, priority_prediction_path, '--git_diff_file', git_diff_output], check=True)
-    except subprocess.CalledProcessError as e:
+        command = [VENV_PYTHON, priority_prediction_path, '--git_diff_file', git_diff_output]
+        if config.get('feature_source', 'csv') == 'db':
+            # The prediction reads its mappings through this process's shared async pool
+            command += ['--lookup_url', f"http://127.0.0.1:{WEBHOOK_PORT}/lookup/mappings"]
+        subprocess.run(command, check=True)
+    except Exception as e:
         logger.exception("Prediction error: %s", e)
 
     logger.info("=== Prediction Completed ===")
 
 
+# ---------------------------
+# ASYNC LOOKUPS
+# ---------------------------
+
+_lookup_runner = None
+_lookup_store = None
+_lookup_failed_at = None
+_lookup_lock = Lock()
+LOOKUP_TIMEOUT = float(config.get('db_pool_timeout', 30))
+# Opening the pool waits at most this long; after a failure, lookups fail fast for the retry interval
+LOOKUP_OPEN_TIMEOUT = float(config.get('async_pool_open_timeout', 5))
+LOOKUP_RETRY_SECONDS = float(config.get('async_pool_retry_seconds', 60))
+LOOKUP_CHUNK_SIZE = int(config.get('feature_chunk_size', 500))
+
+
+def lookup_store():
+    """
+    (LoopThread, AsyncFeatureStore) shared by all request threads, started on
+    first use; concurrent deliveries share its small async pool.
+    """
+    global _lookup_runner, _lookup_store, _lookup_failed_at
+    with _lookup_lock:
+        if _lookup_store is None:
+            if _lookup_failed_at is not None and time.monotonic() - _lookup_failed_at < LOOKUP_RETRY_SECONDS:
+                raise ConnectionError("database unavailable; retrying in %.0fs"
+                                      % (LOOKUP_RETRY_SECONDS - (time.monotonic() - _lookup_failed_at)))
+            from model.db_connection import DB_CONFIG
+            from model.async_feature_store import AsyncFeatureStore, LoopThread
+            store = AsyncFeatureStore.from_config(config, DB_CONFIG)
+            runner = LoopThread()
+            try:
+                runner.run(store.open(timeout=LOOKUP_OPEN_TIMEOUT), timeout=LOOKUP_OPEN_TIMEOUT + 1)
+            except Exception:
+                _lookup_failed_at = time.monotonic()
+                runner.stop()
+                raise
+            _lookup_runner, _lookup_store, _lookup_failed_at = runner, store, None
+        return _lookup_runner, _lookup_store
+
+
+def lookup(method, *args):
+    """Run an AsyncFeatureStore lookup from a request thread."""
+    runner, store = lookup_store()
+    return runner.run(getattr(store, method)(*args), timeout=LOOKUP_TIMEOUT)
+
+
+def lookup_response(**lookups):
+    """JSON of {key: lookup(method, *args)}; 503 while the database is unavailable."""
+    try:
+        return jsonify({key: lookup(*call) if isinstance(call, tuple) else call
+                        for key, call in lookups.items()}), 200
+    except Exception as e:
+        logger.warning("Lookup failed: %s", e)
+        return jsonify({"error": str(e)}), 503
+
+
 # ---------------------------
 # ROUTES
 # ---------------------------
@@ -124,6 +237,56 @@ def index():
     return "Webhook server is running.", 200
 
 
+@app.route('/metrics')
+def metrics():
+    """
+    Database pool metrics (checkout wait and latency) of this process. In-process
+    report runs load regression_matrix through this pool ("load_regression_matrix").
+    """
+    from model.db_connection import pool_stats
+    body = {"db_pool": pool_stats()}
+    if _lookup_store is not None:
+        body["async_pool"] = _lookup_store.stats()
+    return jsonify(body), 200
+
+
+@app.route('/lookup/story/<user_story_id>')
+def story_tests(user_story_id):
+    return lookup_response(user_story_id=user_story_id, tests=("tests_for_story", user_story_id))
+
+
+@app.route('/lookup/file')
+def file_tests():
+    path = request.args.get("path")
+    if not path:
+        return "Missing ?path=", 400
+    return lookup_response(file_changed=path, tests=("tests_for_file", path))
+
+
+@app.route('/lookup/function/<changed_function>')
+def function_lookup(changed_function):
+    return lookup_response(changed_function=changed_function,
+                           tests=("tests_for_function", changed_function),
+                           dependents=("dependents_for_function", changed_function, request.args.get("file")))
+
+
+@app.route('/lookup/mappings', methods=['POST'])
+def test_mappings():
+    """
+    Stories and file/function pairs of the posted {"test_case_ids": [...]};
+    priority_prediction.py calls this (--lookup_url) from each delivery.
+    """
+    from model.feature_store import mappings_to_json
+    body = request.get_json(force=True, silent=True) or {}
+    test_case_ids = [str(tc) for tc in body.get("test_case_ids") or []]
+    try:
+        mappings = lookup("test_mappings_chunked", test_case_ids, LOOKUP_CHUNK_SIZE)
+    except Exception as e:
+        logger.warning("Lookup failed: %s", e)
+        return jsonify({"error": str(e)}), 503
+    return jsonify(mappings_to_json(mappings)), 200
+
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     logger.info("=== Webhook Received ===")
@@ -162,7 +325,7 @@ def webhook():
                 logger.exception("git_diff error: %s", e)
 
         # Run prediction ONLY (NO TRAINING HERE)
-        run_prediction()
+        run_prediction(changed_files_from_payload(payload))
 
         return "Webhook processed", 200
 
@@ -212,4 +375,5 @@ def start_excel_watchdog():
 
 if __name__ == '__main__':
     Thread(target=start_excel_watchdog, daemon=True).start()
-    app.run(host='0.0.0.0', port=5000)
+    # threaded (the default): /lookup/mappings is served while a delivery runs the prediction
+    app.run(host=WEBHOOK_HOST, port=WEBHOOK_PORT, threaded=True)
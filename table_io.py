@@ -0,0 +1,162 @@
+"""
+Columnar (Parquet) copies of the CSV artifacts handed between stages:
+the commit report, the regression matrix and the priority files.
+
+Every artifact stays a CSV (the export other tools open); when parquet
+output is enabled a <name>.parquet sibling is written next to it, with id,
+file and function columns stored as dictionary-encoded categoricals.
+read_table() loads the sibling instead of parsing the CSV whenever it is at
+least as new as the CSV, so readers never see a stale copy. Parquet needs
+pyarrow; without it everything falls back to CSV.
+"""
+import os
+import logging
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (pandas' parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PARQUET_EXT = ".parquet"
+
+# Low-cardinality columns of the pipeline artifacts, stored dictionary-encoded
+CATEGORY_COLUMNS = (
+    # userstory_commit_report.csv
+    'UserStoryID', 'CommitSHA', 'Author', 'FileChanged', 'ChangedFunctions', 'Language',
+    # regression matrix
+    'user_story_id', 'commit_sha', 'author', 'file_changed', 'changed_function',
+    'dependent_function', 'language', 'test_case_id', 'test_name', 'last_status',
+    # priority files
+    'Test_Case_ID', 'Original_User_Story_ID', 'Input_User_Story_ID', 'File_Changed', 'Changed_Function',
+)
+
+
+def parquet_path_for(path):
+    """final_report.csv -> final_report.parquet"""
+    return os.path.splitext(path)[0] + PARQUET_EXT
+
+
+def parquet_is_current(path):
+    """True if path's parquet sibling exists and is at least as new as the CSV."""
+    if not PARQUET_AVAILABLE:
+        return False
+    pq = parquet_path_for(path)
+    if not os.path.exists(pq):
+        return False
+    return not os.path.exists(path) or os.path.getmtime(pq) >= os.path.getmtime(path)
+
+
+def table_exists(path):
+    return os.path.exists(path) or parquet_is_current(path)
+
+
+def _encode(df, category_columns):
+    df = df.copy()
+    for col in category_columns:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _decode(df):
+    """Categoricals back to object columns, missing values as NaN like read_csv."""
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            values = df[col].astype(object)
+            df[col] = values.where(values.notna(), float('nan'))
+    return df
+
+
+def write_parquet(df, path, category_columns=CATEGORY_COLUMNS):
+    """Write df to path's parquet sibling (atomically); returns its path, or None without pyarrow."""
+    if not PARQUET_AVAILABLE:
+        logger.warning("pyarrow is not installed; skipping parquet output for %s", path)
+        return None
+    pq = parquet_path_for(path)
+    tmp = pq + ".tmp"
+    _encode(df, category_columns).to_parquet(tmp, index=False)
+    os.replace(tmp, pq)
+    logger.info("Saved parquet copy: %s (%d rows)", pq, len(df))
+    return pq
+
+
+def write_table(df, path, parquet=False, **csv_kwargs):
+    """df.to_csv(path, index=False, **csv_kwargs), plus the parquet sibling when parquet is set."""
+    df.to_csv(path, index=False, **csv_kwargs)
+    if parquet:
+        write_parquet(df, path)
+    elif parquet_is_current(path):
+        os.remove(parquet_path_for(path))  # would otherwise shadow the new CSV until its mtime catches up
+
+
+def append_table(df, path, **csv_kwargs):
+    """Append rows to the CSV and, when it was current, rewrite the parquet sibling with them."""
+    refresh = parquet_is_current(path)
+    df.to_csv(path, mode='a', header=False, index=False, **csv_kwargs)
+    if refresh:
+        existing = pd.read_parquet(parquet_path_for(path))
+        write_parquet(pd.concat([_decode(existing), df], ignore_index=True), path)
+
+
+def mirror_csv(path, **csv_kwargs):
+    """Rewrite the parquet sibling of an existing CSV (for CSVs written row by row)."""
+    if not PARQUET_AVAILABLE or not os.path.exists(path):
+        return None
+    return write_parquet(pd.read_csv(path, **csv_kwargs), path)
+
+
+# read_csv options that only affect parsing the CSV text; the parquet copy was mirrored from a parsed CSV
+PARSE_ONLY_KWARGS = {'on_bad_lines', 'engine', 'encoding', 'low_memory', 'sep'}
+
+
+def _as_dtype(values, dtype):
+    if dtype in (str, 'str', object, 'object'):
+        # Like read_csv(dtype=str): values as their text, missing values stay NaN. An
+        # integer column with missing values comes back from parquet as float; the CSV
+        # holds it as "1", not "1.0"
+        present = values.dropna()
+        if values.dtype.kind == 'f' and (present == present.round()).all():
+            values = values.astype('Int64')
+        return values.astype(str).astype(object).where(values.notna(), float('nan'))
+    return values.astype(dtype)
+
+
+def _apply_csv_options(df, dtype=None, keep_default_na=True, na_values=None, **unsupported):
+    """The dtype / NA options of read_csv, applied to a decoded parquet frame."""
+    unsupported = set(unsupported) - PARSE_ONLY_KWARGS
+    if unsupported:
+        raise TypeError("read_table: %s not supported for parquet copies" % ", ".join(sorted(unsupported)))
+    if dtype is not None:
+        for col in df.columns:
+            col_dtype = dtype.get(col) if isinstance(dtype, dict) else dtype
+            if col_dtype is not None:
+                df[col] = _as_dtype(df[col], col_dtype)
+    if na_values is not None:
+        na_values = [na_values] if isinstance(na_values, str) else list(na_values)
+        markers = [v for v in na_values if v != ""]
+        if markers:
+            df = df.replace(markers, float('nan'))
+    if not keep_default_na and (na_values is None or "" not in na_values):
+        # read_csv(keep_default_na=False) reads empty cells as ""
+        df = df.fillna("")
+    return df
+
+
+def read_table(path, columns=None, categorical=False, **csv_kwargs):
+    """
+    Load an artifact: its parquet sibling when current, else pd.read_csv(path, **csv_kwargs).
+    dtype, keep_default_na and na_values are applied to the parquet copy too, so both
+    give the same frame; other non-parsing read_csv options raise TypeError.
+    With categorical=True, dictionary-encoded columns stay pandas categoricals.
+    """
+    if parquet_is_current(path):
+        df = pd.read_parquet(parquet_path_for(path), columns=columns)
+        if categorical:
+            return df
+        return _apply_csv_options(_decode(df), **csv_kwargs)
+    return pd.read_csv(path, usecols=columns, **csv_kwargs)